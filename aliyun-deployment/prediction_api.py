@@ -5,19 +5,24 @@
 提供HTTP接口调用预测算法
 """
 
+import io
 import os
 import sys
 import json
+import zipfile
 import tempfile
 import uuid
+import threading
 import traceback
 import logging
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Iterator
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
+import numpy as np
 import pandas as pd
 
 # 添加function目录到Python路径
@@ -29,6 +34,13 @@ except ImportError as e:
     print(f"错误：无法导入预测模块: {e}")
     sys.exit(1)
 
+# 流式(NDJSON)输出的公共函数，与 robust_api_server 共用；缺失时只影响 NDJSON 输出
+try:
+    from ndjson_stream import ndjson_line, json_safe_records
+except ImportError as e:
+    print(f"警告：无法导入 function/ndjson_stream.py，NDJSON 流式输出不可用: {e}")
+    ndjson_line = json_safe_records = None
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -55,9 +67,22 @@ DEFAULT_CONFIG = {
     'model_dir': os.path.join(os.path.dirname(__file__), 'function', 'Model_Params', 'Task3_CatBoost_Model'),
     'min_grade': 60,
     'max_grade': 90,
-    'with_uniform_inverse': 1
+    'with_uniform_inverse': 1,
+    'grade_step': 1,
+    'probability_curves': 0,
+    'allocation': 0,
+    'allocation_time_budget': 5.0,
+    'monte_carlo': 0,
+    'mc_samples': 2000,
+    'mc_seed': 0,
+    'mc_time_budget': 1.0
 }
 
+# 概率曲线缓存：最近的任务保留在内存中，滑块查询按 (任务, 专业, 学号, 分数) 直接取值
+CURVE_STORE_SIZE = 32
+_curve_store = OrderedDict()
+_curve_lock = threading.Lock()
+
 # 专业映射
 MAJORS_MAPPING = {
     '物联网工程': {
@@ -78,6 +103,164 @@ MAJORS_MAPPING = {
     }
 }
 
+def preload_resources():
+    """启动时预加载模型与培养方案，请求路径上不再反序列化"""
+    try:
+        opt.MODEL_REGISTRY.preload([DEFAULT_CONFIG['model_dir']])
+        for major_info in MAJORS_MAPPING.values():
+            course_path = os.path.join(os.path.dirname(__file__), 'function', major_info['course_file'])
+            if os.path.exists(course_path):
+                opt.load_course_catalog(course_path)
+        logger.info("模型与培养方案预加载完成")
+    except Exception as e:
+        logger.error(f"预加载失败，将在首次请求时加载: {e}")
+
+def compact_curves(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    ProbabilityCurves 长表 -> {'grades': [...], 'classes': [...], 'curves': {学号: [[p1,p2,p3], ...]}}
+    curves[学号][i] 对应 grades[i]，前端滑块按下标取值即可
+    """
+    grades = df['grade'].drop_duplicates().tolist()
+    prob_cols = [c for c in df.columns if c.startswith('prob')]
+    if not grades:
+        return {'grades': [], 'classes': [int(c[4:]) for c in prob_cols], 'curves': {}}
+    probs = df[prob_cols].to_numpy(dtype=float).reshape(-1, len(grades), len(prob_cols))
+    snhs = df['SNH'].iloc[::len(grades)].astype(str).tolist()
+    return {
+        'grades': grades,
+        'classes': [int(c[4:]) for c in prob_cols],
+        'curves': {snh: probs[i].tolist() for i, snh in enumerate(snhs)}
+    }
+
+def tables_to_records(tables: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+    """结果表直接转换为JSON兼容格式（不经过Excel文件中转）；概率曲线使用紧凑格式"""
+    return {sheet_name: compact_curves(df) if sheet_name == 'ProbabilityCurves' else df.to_dict('records')
+            for sheet_name, df in tables.items()}
+
+def remember_curves(task_id: str, major: str, tables: Dict[str, pd.DataFrame]):
+    """保存任务的概率曲线，供 /api/predict/curves 查询"""
+    if 'ProbabilityCurves' not in tables:
+        return
+    curves = compact_curves(tables['ProbabilityCurves'])
+    curves['index'] = {float(g): i for i, g in enumerate(curves['grades'])}
+    with _curve_lock:
+        _curve_store.setdefault(task_id, {})[major] = curves
+        _curve_store.move_to_end(task_id)
+        while len(_curve_store) > CURVE_STORE_SIZE:
+            _curve_store.popitem(last=False)
+
+def tables_to_excel_bytes(tables: Dict[str, pd.DataFrame]) -> io.BytesIO:
+    """仅在调用方要求Excel时才生成工作簿"""
+    buf = io.BytesIO()
+    opt.write_result_tables(tables, buf)
+    buf.seek(0)
+    return buf
+
+def wants_excel() -> bool:
+    return request.form.get('output_format', 'json').lower() in ('excel', 'xlsx')
+
+def wants_ndjson() -> bool:
+    return (request.form.get('output_format', 'json').lower() == 'ndjson'
+            or 'application/x-ndjson' in request.headers.get('Accept', ''))
+
+def ndjson_unavailable():
+    return jsonify({
+        'success': False,
+        'error': 'NDJSON 流式输出不可用：服务器缺少 ndjson_stream.py',
+        'code': 'NDJSON_UNAVAILABLE'
+    }), 503
+
+def ndjson_table_lines(major: str, tables: Dict[str, pd.DataFrame]) -> Iterator[str]:
+    """
+    结果表 -> NDJSON 行：普通工作表每行一个 {"type": "row", "major", "sheet", "data"}；
+    概率曲线为一行 curve_grid (grades/classes) 加每名学生一行 {"type": "curve", "SNH", "probs"}
+    """
+    for sheet_name, df in tables.items():
+        if sheet_name == 'ProbabilityCurves':
+            curves = compact_curves(df)
+            yield ndjson_line({'type': 'curve_grid', 'major': major,
+                               'grades': curves['grades'], 'classes': curves['classes']})
+            for snh, probs in curves['curves'].items():
+                yield ndjson_line({'type': 'curve', 'major': major, 'SNH': snh, 'probs': probs})
+            continue
+        for record in json_safe_records(df):
+            yield ndjson_line({'type': 'row', 'major': major, 'sheet': sheet_name, 'data': record})
+
+def run_major_prediction(scores, course_path: str, major: str, config: Dict[str, Any]):
+    """按配置调用 predict_students（scores 为成绩文件路径或已解析的成绩矩阵），返回 (pred_df, uni_df, tables)"""
+    return opt.predict_students(
+        scores_file=scores,
+        course_file=course_path,
+        major_name=major,
+        out_path=None,
+        model_dir=config['model_dir'],
+        with_uniform_inverse=config['with_uniform_inverse'],
+        min_grade=config['min_grade'],
+        max_grade=config['max_grade'],
+        grade_step=config['grade_step'],
+        probability_curves=config['probability_curves'],
+        allocation=config['allocation'],
+        allocation_time_budget=config['allocation_time_budget'],
+        monte_carlo=config['monte_carlo'],
+        mc_samples=config['mc_samples'],
+        mc_seed=config['mc_seed'],
+        mc_time_budget=config['mc_time_budget'],
+        return_tables=True
+    )
+
+def prediction_statistics(pred_df: pd.DataFrame, uni_df: pd.DataFrame) -> Dict[str, int]:
+    if uni_df.empty:
+        return {}
+    return {
+        'total_students': len(pred_df),
+        'grad_school_achievable_60': int((uni_df['s_min_for_1'] == 60).sum()),
+        'abroad_achievable_60': int((uni_df['s_min_for_2'] == 60).sum()),
+        'dominated_by_target1': int(uni_df['DominatedBy1'].sum()),
+        'multiple_intervals_target1': int(uni_df['MultipleIntervalsFlag_1'].sum()),
+        'multiple_intervals_target2': int(uni_df['MultipleIntervalsFlag_2'].sum())
+    }
+
+def stream_predictions(task_id: str, grade_matrix, majors: Dict[str, str], config: Dict[str, Any]) -> Response:
+    """
+    逐专业预测并立即输出该专业的结果行。首行 meta 在预测开始前发送；
+    某专业预测或结果输出失败时输出 error 行并继续下一个专业（输出中途失败时，
+    该专业此前已发送的 row 行不完整）；末行 end 汇总成功/失败的专业
+    """
+    def generate():
+        yield ndjson_line({'type': 'meta', 'task_id': task_id, 'majors': list(majors),
+                           'config_used': config, 'timestamp': datetime.now().isoformat()})
+        processed, failed = [], []
+        for major, course_path in majors.items():
+            try:
+                pred_df, uni_df, tables = run_major_prediction(grade_matrix, course_path, major, config)
+                remember_curves(task_id, major, tables)
+                logger.info(f"任务 {task_id} 专业 {major} 预测完成，处理了 {len(pred_df)} 名学生")
+            except Exception as e:
+                logger.error(f"任务 {task_id} 专业 {major} 预测失败: {e}")
+                logger.error(traceback.format_exc())
+                failed.append(major)
+                yield ndjson_line({'type': 'error', 'major': major, 'error': f"预测算法执行失败: {str(e)}",
+                                   'code': 'PREDICTION_FAILED'})
+                continue
+            try:
+                yield from ndjson_table_lines(major, tables)
+                yield ndjson_line({'type': 'statistics', 'major': major,
+                                   'statistics': prediction_statistics(pred_df, uni_df)})
+            except Exception as e:
+                # 已输出的部分行无法撤回：以 error 行标记该专业结果不完整
+                logger.error(f"任务 {task_id} 专业 {major} 结果输出失败: {e}")
+                logger.error(traceback.format_exc())
+                failed.append(major)
+                yield ndjson_line({'type': 'error', 'major': major, 'error': f"结果输出失败: {str(e)}",
+                                   'code': 'SERIALIZATION_FAILED'})
+                continue
+            processed.append(major)
+        yield ndjson_line({'type': 'end', 'success': not failed, 'processed_majors': processed,
+                           'failed_majors': failed, 'timestamp': datetime.now().isoformat()})
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 def allowed_file(filename):
     """检查文件扩展名是否允许"""
     return any(filename.lower().endswith(ext) for ext in ALLOWED_EXTENSIONS)
@@ -101,7 +284,9 @@ def health_check():
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
         'service': 'prediction-api',
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'models_loaded': list(opt.MODEL_REGISTRY.info().keys()),
+        'inference_cache': opt.inference_cache_info()
     })
 
 @app.route('/api/majors', methods=['GET'])
@@ -125,7 +310,13 @@ def predict_students():
     - multipart/form-data
     - scores_file: Excel成绩文件
     - major: 专业名称
-    - config: 可选配置参数(JSON字符串)
+    - config: 可选配置参数(JSON字符串)，probability_curves=1 时结果附带概率曲线
+      (ProbabilityCurves)，并可通过 /api/predict/curves/<task_id> 查询；
+      allocation=1 时附带按学分加权的最省力非均匀分配方案 (OptimalAllocation)
+      monte_carlo=1 时附带蒙特卡洛达成概率 (mc_attain_prob1/2，mc_samples/mc_seed/mc_time_budget)
+    - output_format: 可选，json(默认)、excel（直接下载结果工作簿）或
+      ndjson（流式输出，每行一个JSON：meta、各工作表的 row、概率曲线的 curve、statistics、end；
+      NaN 输出为 null；也可用请求头 Accept: application/x-ndjson）
     """
     try:
         # 检查文件上传
@@ -208,9 +399,6 @@ def predict_students():
                     'code': 'COURSE_FILE_MISSING'
                 }), 500
             
-            # 设置输出文件路径
-            output_path = os.path.join(temp_dir, f"prediction_result_{task_id}.xlsx")
-            
             # 验证模型目录
             if not os.path.exists(config['model_dir']):
                 return jsonify({
@@ -219,62 +407,45 @@ def predict_students():
                     'code': 'MODEL_DIR_MISSING'
                 }), 500
             
+            if wants_ndjson():
+                if ndjson_line is None:
+                    return ndjson_unavailable()
+                # 成绩先解析到内存，临时目录随请求结束删除，预测在流式响应中进行
+                logger.info(f"任务 {task_id} 以NDJSON流式输出")
+                grade_matrix = opt.load_student_grade_matrix(scores_path)
+                return stream_predictions(task_id, grade_matrix, {major: course_path}, config)
+            
             # 调用预测算法
             try:
                 logger.info(f"任务 {task_id} 开始执行预测算法")
                 
-                pred_df, uni_df = opt.predict_students(
-                    scores_file=scores_path,
-                    course_file=course_path,
-                    major_name=major,
-                    out_path=output_path,
-                    model_dir=config['model_dir'],
-                    with_uniform_inverse=config['with_uniform_inverse'],
-                    min_grade=config['min_grade'],
-                    max_grade=config['max_grade']
-                )
+                pred_df, uni_df, tables = run_major_prediction(scores_path, course_path, major, config)
+                remember_curves(task_id, major, tables)
                 
                 logger.info(f"任务 {task_id} 预测完成，处理了 {len(pred_df)} 名学生")
                 
-                # 读取结果文件
-                if os.path.exists(output_path):
-                    # 读取Excel文件的所有工作表
-                    excel_data = {}
-                    with pd.ExcelFile(output_path) as xls:
-                        for sheet_name in xls.sheet_names:
-                            df = pd.read_excel(xls, sheet_name=sheet_name)
-                            # 转换为JSON兼容格式
-                            excel_data[sheet_name] = df.to_dict('records')
-                    
-                    # 计算统计信息
-                    stats = {}
-                    if not uni_df.empty:
-                        stats = {
-                            'total_students': len(pred_df),
-                            'grad_school_achievable_60': int((uni_df['s_min_for_1'] == 60).sum()),
-                            'abroad_achievable_60': int((uni_df['s_min_for_2'] == 60).sum()),
-                            'dominated_by_target1': int(uni_df['DominatedBy1'].sum()),
-                            'multiple_intervals_target1': int(uni_df['MultipleIntervalsFlag_1'].sum()),
-                            'multiple_intervals_target2': int(uni_df['MultipleIntervalsFlag_2'].sum())
-                        }
-                    
-                    return jsonify({
-                        'success': True,
-                        'data': {
-                            'task_id': task_id,
-                            'major': major,
-                            'results': excel_data,
-                            'statistics': stats,
-                            'config_used': config,
-                            'timestamp': datetime.now().isoformat()
-                        }
-                    })
-                else:
-                    return jsonify({
-                        'success': False,
-                        'error': '预测算法执行完成但未生成结果文件',
-                        'code': 'NO_OUTPUT_FILE'
-                    }), 500
+                if wants_excel():
+                    return send_file(
+                        tables_to_excel_bytes(tables),
+                        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                        as_attachment=True,
+                        download_name=f"prediction_result_{task_id}.xlsx"
+                    )
+                
+                # 计算统计信息
+                stats = prediction_statistics(pred_df, uni_df)
+                
+                return jsonify({
+                    'success': True,
+                    'data': {
+                        'task_id': task_id,
+                        'major': major,
+                        'results': tables_to_records(tables),
+                        'statistics': stats,
+                        'config_used': config,
+                        'timestamp': datetime.now().isoformat()
+                    }
+                })
                     
             except Exception as e:
                 error_msg = f"预测算法执行失败: {str(e)}"
@@ -309,6 +480,8 @@ def predict_batch():
     - scores_file: Excel成绩文件
     - majors: 专业名称列表 (JSON数组字符串)
     - config: 可选配置参数(JSON字符串)
+    - output_format: 可选，json(默认)、excel（各专业工作簿打包为zip下载）或
+      ndjson（逐专业流式输出，格式同 /api/predict）
     """
     try:
         # 检查文件上传
@@ -376,6 +549,22 @@ def predict_batch():
             scores_filename = secure_filename(scores_file.filename)
             scores_path = os.path.join(temp_dir, f"scores_{batch_id}_{scores_filename}")
             scores_file.save(scores_path)
+            # 成绩文件只解析一次，各专业共享
+            grade_matrix = opt.load_student_grade_matrix(scores_path)
+            
+            if wants_ndjson():
+                if ndjson_line is None:
+                    return ndjson_unavailable()
+                course_paths = {}
+                for major in majors:
+                    course_path = os.path.join(os.path.dirname(__file__), 'function',
+                                               MAJORS_MAPPING[major]['course_file'])
+                    if os.path.exists(course_path):
+                        course_paths[major] = course_path
+                    else:
+                        logger.error(f"专业 {major} 课程文件不存在: {MAJORS_MAPPING[major]['course_file']}")
+                logger.info(f"批量任务 {batch_id} 以NDJSON流式输出")
+                return stream_predictions(batch_id, grade_matrix, course_paths, config)
             
             # 逐个处理专业
             for major in majors:
@@ -391,50 +580,34 @@ def predict_batch():
                         errors[major] = f'课程文件不存在: {major_info["course_file"]}'
                         continue
                     
-                    output_path = os.path.join(temp_dir, f"prediction_{major}_{batch_id}.xlsx")
+                    pred_df, uni_df, tables = run_major_prediction(grade_matrix, course_path, major, config)
+                    remember_curves(batch_id, major, tables)
                     
-                    pred_df, uni_df = opt.predict_students(
-                        scores_file=scores_path,
-                        course_file=course_path,
-                        major_name=major,
-                        out_path=output_path,
-                        model_dir=config['model_dir'],
-                        with_uniform_inverse=config['with_uniform_inverse'],
-                        min_grade=config['min_grade'],
-                        max_grade=config['max_grade']
-                    )
+                    results[major] = {
+                        'tables': tables,
+                        'statistics': prediction_statistics(pred_df, uni_df)
+                    }
                     
-                    # 读取结果
-                    if os.path.exists(output_path):
-                        excel_data = {}
-                        with pd.ExcelFile(output_path) as xls:
-                            for sheet_name in xls.sheet_names:
-                                df = pd.read_excel(xls, sheet_name=sheet_name)
-                                excel_data[sheet_name] = df.to_dict('records')
-                        
-                        # 统计信息
-                        stats = {}
-                        if not uni_df.empty:
-                            stats = {
-                                'total_students': len(pred_df),
-                                'grad_school_achievable_60': int((uni_df['s_min_for_1'] == 60).sum()),
-                                'abroad_achievable_60': int((uni_df['s_min_for_2'] == 60).sum())
-                            }
-                        
-                        results[major] = {
-                            'results': excel_data,
-                            'statistics': stats
-                        }
-                        
-                        logger.info(f"专业 {major} 预测完成，处理了 {len(pred_df)} 名学生")
-                    else:
-                        errors[major] = '未生成结果文件'
+                    logger.info(f"专业 {major} 预测完成，处理了 {len(pred_df)} 名学生")
                         
                 except Exception as e:
                     error_msg = f"专业 {major} 预测失败: {str(e)}"
                     errors[major] = error_msg
                     logger.error(error_msg)
         
+        if wants_excel() and results:
+            buf = io.BytesIO()
+            with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+                for major, res in results.items():
+                    zf.writestr(f"prediction_{MAJORS_MAPPING[major]['code']}_{batch_id}.xlsx",
+                                tables_to_excel_bytes(res['tables']).getvalue())
+            buf.seek(0)
+            return send_file(buf, mimetype='application/zip', as_attachment=True,
+                             download_name=f"prediction_batch_{batch_id}.zip")
+        
+        for res in results.values():
+            res['results'] = tables_to_records(res.pop('tables'))
+        
         return jsonify({
             'success': True,
             'data': {
@@ -459,6 +632,69 @@ def predict_batch():
             'code': 'BATCH_FAILED'
         }), 500
 
+@app.route('/api/predict/curves/<task_id>', methods=['GET'])
+def get_probability_curves(task_id):
+    """
+    查询预测任务的概率曲线（预测时需设置 config.probability_curves=1）
+    
+    查询参数：
+    - major: 专业名称（任务只含一个专业时可省略）
+    - snh: 学号
+    - grade: 可选，统一分数；省略时返回该学生的整条曲线
+    
+    曲线只在处理该任务的服务进程内保留最近 CURVE_STORE_SIZE 个任务；
+    多进程部署时请直接使用预测结果中的 ProbabilityCurves。
+    """
+    with _curve_lock:
+        task_curves = _curve_store.get(task_id)
+    if task_curves is None:
+        return jsonify({
+            'success': False,
+            'error': f'未找到任务的概率曲线: {task_id}',
+            'code': 'CURVES_NOT_FOUND'
+        }), 404
+    
+    major = request.args.get('major')
+    if major is None and len(task_curves) == 1:
+        major = next(iter(task_curves))
+    if major not in task_curves:
+        return jsonify({
+            'success': False,
+            'error': f'任务中没有该专业的概率曲线: {major}',
+            'code': 'MAJOR_NOT_FOUND',
+            'available_majors': list(task_curves.keys())
+        }), 404
+    curves = task_curves[major]
+    
+    snh = request.args.get('snh', '')
+    if snh not in curves['curves']:
+        return jsonify({
+            'success': False,
+            'error': f'未找到学生: {snh}',
+            'code': 'STUDENT_NOT_FOUND'
+        }), 404
+    curve = curves['curves'][snh]
+    
+    data = {'task_id': task_id, 'major': major, 'snh': snh, 'classes': curves['classes']}
+    grade = request.args.get('grade')
+    if grade is None:
+        data.update(grades=curves['grades'], probabilities=curve)
+    else:
+        try:
+            i = curves['index'][float(grade)]
+        except (ValueError, KeyError):
+            return jsonify({
+                'success': False,
+                'error': f'分数不在预测网格上: {grade}',
+                'code': 'GRADE_NOT_ON_GRID',
+                'grades': curves['grades']
+            }), 400
+        data.update(grade=curves['grades'][i], probabilities=curve[i])
+    return jsonify({'success': True, 'data': data})
+
+# gunicorn 等以导入方式启动时同样在每个worker内预加载
+preload_resources()
+
 @app.errorhandler(413)
 def file_too_large(error):
     """文件过大错误处理"""
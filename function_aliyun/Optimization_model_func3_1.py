@@ -17,16 +17,24 @@ Key fixes in this version:
 Only the necessary parts are modified; other logic remains unchanged.
 """
 
-import os, sys, json, pickle, argparse, math
+import os, sys, json, pickle, argparse, math, re, time
+import itertools
+import hashlib
+import threading
+import multiprocessing as mp
 import warnings
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Tuple
-from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict
+from collections.abc import Mapping
 warnings.filterwarnings('ignore', category=UserWarning, module='sklearn')
 
-from catboost import CatBoostClassifier
 from sklearn.preprocessing import StandardScaler
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+from catboost_numpy import NUMPY_MODEL_FILE, load_numpy_model
 
 # ---- CN -> EN feature names ----
 COURSE_CATEGORIES_CN2EN = {
@@ -46,6 +54,8 @@ COURSE_CATEGORIES_CN2EN = {
 }
 BASE_FEATURES = list(COURSE_CATEGORIES_CN2EN.values())
 FINAL_FEATURES = BASE_FEATURES + ['AcademicStrength']
+# Distinct categories in BASE_FEATURES order; column order of CourseCatalog.weights
+CATEGORY_KEYS = list(dict.fromkeys(BASE_FEATURES))
 
 MAJOR_MAPPING = {
     '物联网工程': 'iot',
@@ -110,7 +120,323 @@ def load_course_info_from_file(path: str)->Dict[str, Dict[str, List]]:
     print(f"课程类型分布: {dict(pd.Series(result['Course_Type']).value_counts())}")
     return result
 
-def load_student_scores(scores_path: str)->Tuple[Dict[str, Dict[str, float]], Dict[str,str]]:
+class CourseCatalog:
+    """
+    Compiled required-course list of one education plan.
+      - columns / index: distinct course names and name -> column index
+      - category_ids:    per plan row, index into CATEGORY_KEYS (-1 = unknown)
+      - credits:         per plan row credit
+      - weights:         (n_columns x n_categories) credit matrix, so category
+                         scores of a students-by-courses grade matrix are one product
+    Still indexable like the course_info dict ('Course_Name', 'Course_Type', 'Credit').
+    The matrix product sums in a different order than the per-course loop it
+    replaced, so category scores match the old loop within float tolerance
+    (differences around 1e-14), not bit for bit.
+    """
+    def __init__(self, course_info: Dict[str, List], category_ids: np.ndarray=None):
+        self.info = course_info
+        self.columns = list(dict.fromkeys(course_info['Course_Name']))
+        self.index = {c: j for j, c in enumerate(self.columns)}
+        if category_ids is None:
+            cat_pos = {c: i for i, c in enumerate(CATEGORY_KEYS)}
+            category_ids = [cat_pos.get(map_course_category(t), -1) for t in course_info['Course_Type']]
+        self.category_ids = np.asarray(category_ids, dtype=int)
+        self.credits = np.array([float(c) for c in course_info['Credit']], dtype=float)
+        self.weights = np.zeros((len(self.columns), len(CATEGORY_KEYS)))
+        for cname, cat, cr in zip(course_info['Course_Name'], self.category_ids, self.credits):
+            if cat >= 0:
+                self.weights[self.index[cname], cat] += cr
+
+    def __getitem__(self, key):
+        return self.info[key]
+
+    def __len__(self):
+        return len(self.columns)
+
+    def grade_matrix(self, students_scores: List[Dict[str,float]])->np.ndarray:
+        """(n_students x n_columns) grades, NaN where the course is not taken."""
+        G = np.full((len(students_scores), len(self.columns)), np.nan)
+        for i, sc in enumerate(students_scores):
+            for cname, g in sc.items():
+                j = self.index.get(cname)
+                if j is not None:
+                    G[i, j] = safe_float(g)
+        return G
+
+    def category_sums(self, G: np.ndarray)->Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Credit-weighted sums per category for a grade matrix:
+        (grade*credit of valid taken courses, credit of valid taken courses,
+         credit of un-taken courses), each (n_students x n_categories).
+        """
+        taken = ~np.isnan(G)
+        valid = taken & (G >= 0) & (G <= 100)
+        tot  = np.where(valid, G, 0.0) @ self.weights
+        cred = valid.astype(float) @ self.weights
+        miss = (~taken).astype(float) @ self.weights
+        return tot, cred, miss
+
+    def category_scores(self, G: np.ndarray)->np.ndarray:
+        """(n_students x n_categories) credit-weighted averages, NaN without credits."""
+        tot, cred, _ = self.category_sums(G)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(cred > 0, tot/cred, np.nan)
+
+class MissingCourseGroups:
+    """
+    Students of one plan grouped by missing-course signature: which plan courses are
+    un-taken, and which taken grades are valid (0..100). Within a group the un-taken
+    course list, its credit and the per-category credit sums are identical, so they
+    are computed once per group; only the taken-grade sums differ per student.
+      - group_of:          (n_students,) group index of each student
+      - courses / credits: per group, un-taken plan rows (plan order) and their credit
+      - cred / miss:       (n_groups x n_categories) credit of valid taken / un-taken courses
+    `taken` overrides the taken mask (default: non-NaN grades), e.g. for dict scores
+    that list a course whose grade does not parse.
+    """
+    def __init__(self, catalog: CourseCatalog, G: np.ndarray, taken: np.ndarray=None):
+        self.catalog = catalog
+        taken = ~np.isnan(G) if taken is None else np.asarray(taken, dtype=bool)
+        valid = ~np.isnan(G) & (G >= 0) & (G <= 100) & taken
+        key = np.packbits(np.concatenate([taken, valid], axis=1), axis=1)
+        _, first, group_of = np.unique(key, axis=0, return_index=True, return_inverse=True)
+        self.group_of = group_of.reshape(-1)
+        self.taken = taken[first]
+        self.cred = valid[first].astype(float) @ catalog.weights
+        self.miss = (~self.taken).astype(float) @ catalog.weights
+
+        names, creds = catalog['Course_Name'], catalog['Credit']
+        col_of_row = [catalog.index[c] for c in names]
+        self.courses, self.credits = [], []
+        for t in self.taken:
+            rows = [k for k, j in enumerate(col_of_row) if not t[j]]
+            total = 0.0
+            for k in rows:
+                total += float(creds[k])
+            self.courses.append([names[k] for k in rows])
+            self.credits.append(total)
+
+    def __len__(self):
+        return len(self.courses)
+
+    def missing(self, i: int)->Tuple[List[str], float]:
+        """(un-taken plan courses, their credit) of student i."""
+        g = self.group_of[i]
+        return self.courses[g], self.credits[g]
+
+    def category_sums(self, G: np.ndarray, rows=None)->Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        CourseCatalog.category_sums of G (one row per grouped student, or the `rows`
+        subset of them); only the grade*credit sums are computed per student.
+        """
+        gid = self.group_of if rows is None else self.group_of[rows]
+        G = G if rows is None else G[rows]
+        valid = ~np.isnan(G) & (G >= 0) & (G <= 100) & self.taken[gid]
+        tot = np.where(valid, G, 0.0) @ self.catalog.weights
+        return tot, self.cred[gid], self.miss[gid]
+
+# ---- compiled education-plan cache ----
+# Each plan workbook compiles to <stem>-<key>.npz, where key hashes the workbook
+# bytes together with the category mapping, so an edited workbook (or a changed
+# COURSE_CATEGORIES_CN2EN) simply misses and is recompiled.
+PLAN_CACHE_VERSION = 1
+PLAN_CACHE_DIR = os.environ.get(
+    'BUTP_PLAN_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.plan_cache'))
+
+def plan_cache_key(path: str)->str:
+    h = hashlib.sha256()
+    h.update(f"v{PLAN_CACHE_VERSION}".encode())
+    h.update(json.dumps(COURSE_CATEGORIES_CN2EN, ensure_ascii=False, sort_keys=True).encode('utf-8'))
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()[:20]
+
+def plan_cache_path(path: str, key: str, cache_dir: str=None)->str:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir or PLAN_CACHE_DIR, f"{stem}-{key}.npz")
+
+def compile_course_plan(path: str, cache_dir: str=None)->str:
+    """Compile one plan workbook into the binary cache; returns the artifact path."""
+    cache_dir = cache_dir or PLAN_CACHE_DIR
+    key = plan_cache_key(path)
+    out = plan_cache_path(path, key, cache_dir)
+    if os.path.exists(out):
+        return out
+    catalog = CourseCatalog(load_course_info_from_file(path))
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = f"{out}.{os.getpid()}.tmp.npz"
+    np.savez(tmp,
+             names=np.array(catalog['Course_Name'], dtype=str),
+             types=np.array(catalog['Course_Type'], dtype=str),
+             credits=catalog.credits,
+             category_ids=catalog.category_ids)
+    os.replace(tmp, out)
+    # drop artifacts of older versions of the same workbook
+    stem = os.path.splitext(os.path.basename(path))[0]
+    pattern = re.compile(re.escape(stem) + r'-[0-9a-f]{20}\.npz')
+    for f in os.listdir(cache_dir):
+        if pattern.fullmatch(f) and f != os.path.basename(out):
+            try:
+                os.remove(os.path.join(cache_dir, f))
+            except OSError:
+                pass
+    return out
+
+def load_compiled_plan(artifact: str)->CourseCatalog:
+    with np.load(artifact, allow_pickle=False) as z:
+        info = {
+            'Course_Name': z['names'].tolist(),
+            'Course_Type': z['types'].tolist(),
+            'Credit':      z['credits'].tolist()
+        }
+        return CourseCatalog(info, category_ids=z['category_ids'])
+
+def compile_education_plans(base_dir: str, years: List[str]=None, cache_dir: str=None)->Dict[str, str]:
+    """Compile every education-plan{year}/*.xlsx under base_dir; returns {workbook: artifact}."""
+    out = {}
+    for d in sorted(os.listdir(base_dir)):
+        if not d.startswith('education-plan') or (years and d[len('education-plan'):] not in years):
+            continue
+        plan_dir = os.path.join(base_dir, d)
+        for f in sorted(os.listdir(plan_dir)):
+            if f.endswith('.xlsx') and not f.startswith('~$'):
+                src = os.path.join(plan_dir, f)
+                out[src] = compile_course_plan(src, cache_dir)
+    return out
+
+_CATALOG_CACHE: Dict[str, Tuple[float, CourseCatalog]] = {}
+_CATALOG_LOCK = threading.Lock()
+
+def load_course_catalog(path: str, use_plan_cache: bool=True)->CourseCatalog:
+    """
+    CourseCatalog for an education-plan file, cached in memory per path and mtime.
+    On a memory miss the compiled binary artifact is used (built on first use)
+    instead of re-reading the workbook.
+    """
+    key = os.path.abspath(path)
+    if not os.path.exists(key):
+        raise FileNotFoundError(path)
+    mtime = os.path.getmtime(key)
+    with _CATALOG_LOCK:
+        hit = _CATALOG_CACHE.get(key)
+        if hit is not None and hit[0] == mtime:
+            return hit[1]
+    catalog = None
+    if use_plan_cache:
+        try:
+            catalog = load_compiled_plan(compile_course_plan(key))
+            print(f"使用培养方案编译缓存: {os.path.basename(key)} ({len(catalog['Course_Name'])} 门必修课程)")
+        except OSError as e:
+            print(f"警告: 培养方案缓存不可用，直接读取Excel: {e}")
+    if catalog is None:
+        catalog = CourseCatalog(load_course_info_from_file(key))
+    with _CATALOG_LOCK:
+        _CATALOG_CACHE[key] = (mtime, catalog)
+    return catalog
+
+def plan_fingerprint(course_file)->str:
+    """Content key of an education plan: plan_cache_key for a workbook path, else of the course lists."""
+    if isinstance(course_file, str):
+        return plan_cache_key(course_file)
+    info = as_course_catalog(course_file).info
+    payload = repr([list(map(str, info[k])) for k in ('Course_Name', 'Course_Type', 'Credit')])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+_DICT_CATALOG_CACHE: 'OrderedDict[tuple, CourseCatalog]' = OrderedDict()
+_DICT_CATALOG_CACHE_SIZE = 32
+
+def as_course_catalog(course_info)->CourseCatalog:
+    """
+    CourseCatalog for course_info. Plain course_info dicts (legacy callers) are
+    compiled once per content (course names, types, credits) and kept in a small
+    LRU, so repeated calls with the same plan do not rebuild the credit matrix.
+    """
+    if isinstance(course_info, CourseCatalog):
+        return course_info
+    fields = ('Course_Name', 'Course_Type', 'Credit')
+    key = tuple(tuple(course_info[f]) for f in fields)
+    with _CATALOG_LOCK:
+        catalog = _DICT_CATALOG_CACHE.get(key)
+        if catalog is not None:
+            _DICT_CATALOG_CACHE.move_to_end(key)
+            return catalog
+    # 缓存的目录持有列表副本，调用方之后修改自己的 dict 不会影响它
+    catalog = CourseCatalog({**course_info, **{f: list(course_info[f]) for f in fields}})
+    with _CATALOG_LOCK:
+        _DICT_CATALOG_CACHE[key] = catalog
+        while len(_DICT_CATALOG_CACHE) > _DICT_CATALOG_CACHE_SIZE:
+            _DICT_CATALOG_CACHE.popitem(last=False)
+    return catalog
+
+class StudentGradeMatrix:
+    """
+    Columnar grades of one scores workbook.
+      - snh:       (n_students,) SNH strings, in order of first appearance
+      - courses:   course names, one per grade column
+      - grades:    (n_students x n_courses) float64 (grades exactly as parsed), NaN = not taken
+      - major_ids: (n_students,) index into `majors`, -1 when unknown
+    """
+    def __init__(self, snh, courses, grades, major_ids, majors):
+        self.snh = np.asarray(snh, dtype=object)
+        self.courses = list(courses)
+        self.course_index = {c: j for j, c in enumerate(self.courses)}
+        self.grades = grades
+        self.major_ids = np.asarray(major_ids, dtype=int)
+        self.majors = list(majors)
+        self.row_index = {sid: i for i, sid in enumerate(self.snh)}
+
+    def __len__(self):
+        return len(self.snh)
+
+    def __repr__(self):
+        return f"StudentGradeMatrix({len(self.snh)} 名学生 x {len(self.courses)} 门课程)"
+
+    def scores(self, i: int)->Dict[str, float]:
+        row = self.grades[i]
+        return {self.courses[j]: float(row[j]) for j in np.flatnonzero(~np.isnan(row))}
+
+    def rows_for_major(self, major_name: str)->np.ndarray:
+        if major_name not in self.majors:
+            return np.array([], dtype=int)
+        return np.flatnonzero(self.major_ids == self.majors.index(major_name))
+
+    def aligned(self, columns: List[str], rows=None)->np.ndarray:
+        """float64 grades of `rows` re-indexed to `columns` (e.g. CourseCatalog.columns)."""
+        G = self.grades if rows is None else self.grades[rows]
+        idx = np.array([self.course_index.get(c, -1) for c in columns], dtype=int)
+        out = G[:, np.clip(idx, 0, None)].astype(float) if len(self.courses) else \
+              np.full((G.shape[0], len(columns)), np.nan)
+        out[:, idx < 0] = np.nan
+        return out
+
+    def majors_by_snh(self)->Dict[str, str]:
+        return {sid: self.majors[m] for sid, m in zip(self.snh, self.major_ids) if m >= 0}
+
+    def input_digest(self, i: int, salt: str='')->str:
+        """Hash of student i's (course, grade) pairs, independent of column order."""
+        row = self.grades[i]
+        items = sorted((self.courses[j], float(row[j])) for j in np.flatnonzero(~np.isnan(row)))
+        return hashlib.sha256((salt + repr(items)).encode('utf-8')).hexdigest()
+
+class StudentScoresView(Mapping):
+    """Read-only {SNH: {course: grade}} view over a StudentGradeMatrix."""
+    def __init__(self, matrix: StudentGradeMatrix):
+        self.matrix = matrix
+
+    def __getitem__(self, sid):
+        return self.matrix.scores(self.matrix.row_index[sid])
+
+    def __contains__(self, sid):
+        return sid in self.matrix.row_index
+
+    def __iter__(self):
+        return iter(self.matrix.snh)
+
+    def __len__(self):
+        return len(self.matrix)
+
+def load_student_grade_matrix(scores_path: str)->StudentGradeMatrix:
     if not os.path.exists(scores_path):
         raise FileNotFoundError(scores_path)
     df = pd.read_excel(scores_path)
@@ -138,60 +464,56 @@ def load_student_scores(scores_path: str)->Tuple[Dict[str, Dict[str, float]], Di
 
     print(f"识别列: 学号={s_col}, 课程名={name_col}, 成绩={grade_col}, 专业={major_col}")
 
-    student_scores = defaultdict(dict)
-    student_majors = {}
-    for _, row in df.iterrows():
-        sid = str(row[s_col]).strip()
-        cname = str(row[name_col]).strip()
-        if not sid or not cname or pd.isna(row.get(grade_col, np.nan)):
-            continue
-
-        if attr_col is not None:
-            try:
-                ca = str(row[attr_col]).strip()
-                if '任选课' in ca:
-                    continue
-            except Exception:
-                pass
+    # map(str) mirrors str(cell) exactly, NaN included ('nan')
+    sid   = df[s_col].map(str).str.strip()
+    cname = df[name_col].map(str).str.strip()
+    raw   = df[grade_col] if grade_col is not None else pd.Series(np.nan, index=df.index)
+    keep  = (sid != '') & (cname != '') & raw.notna()
+    if attr_col is not None:
+        keep &= ~df[attr_col].map(str).str.contains('任选课', regex=False)
+
+    # CN grades map only for exact string matches; everything else goes through safe_float
+    is_str = raw.map(lambda x: isinstance(x, str))
+    g = pd.to_numeric(raw.where(~is_str), errors='coerce').astype(float)
+    g[is_str] = raw[is_str].map(lambda x: CN_GRADE_MAP[x] if is_cn_grade(x) else safe_float(x)).astype(float)
+    keep &= g.notna() & (g >= 0) & (g <= 100)
+
+    valid = pd.DataFrame({'sid': sid[keep], 'cname': cname[keep], 'g': g[keep]})
+    if major_col is not None:
+        valid['major'] = df.loc[keep, major_col].map(str).str.strip()
+
+    rows, snh = pd.factorize(valid['sid'], sort=False)
+    cols_idx, courses = pd.factorize(valid['cname'], sort=False)
+    grades = np.full((len(snh), len(courses)), np.nan, dtype=np.float64)
+    # the last row of a (SNH, course) pair wins (retakes), as in the original row loop
+    cell = rows.astype(np.int64)*max(len(courses), 1) + cols_idx
+    last = ~pd.Series(cell).duplicated(keep='last').to_numpy()
+    grades[rows[last], cols_idx[last]] = valid['g'].to_numpy(dtype=np.float64)[last]
+
+    if major_col is not None:
+        first = valid.drop_duplicates('sid', keep='first')
+        major_ids, majors = pd.factorize(first['major'], sort=False)
+    else:
+        major_ids, majors = np.full(len(snh), -1), []
 
-        raw = row[grade_col]
-        if isinstance(raw, str) and is_cn_grade(raw):
-            g = CN_GRADE_MAP[raw]
-        else:
-            g = safe_float(raw)
-        if np.isnan(g) or not (0<=g<=100):
-            continue
+    matrix = StudentGradeMatrix(list(snh), list(courses), grades, major_ids, list(majors))
+    print(f"成功处理 {len(matrix)} 名学生的成绩数据")
+    return matrix
 
-        student_scores[sid][cname] = g
-        if major_col is not None and sid not in student_majors:
-            student_majors[sid] = str(row[major_col]).strip()
+def as_student_grade_matrix(scores)->StudentGradeMatrix:
+    return scores if isinstance(scores, StudentGradeMatrix) else load_student_grade_matrix(scores)
 
-    print(f"成功处理 {len(student_scores)} 名学生的成绩数据")
-    return dict(student_scores), student_majors
+def load_student_scores(scores_path: str)->Tuple[Dict[str, Dict[str, float]], Dict[str,str]]:
+    """Dict API ({SNH: {course: grade}}, {SNH: major}) as a view over load_student_grade_matrix."""
+    matrix = load_student_grade_matrix(scores_path)
+    return StudentScoresView(matrix), matrix.majors_by_snh()
 
 def calculate_category_score(student_scores: Dict[str,float],
                              course_info: Dict[str, Dict[str,List]],
                              major_code: str)->Dict[str, float]:
-    names = course_info['Course_Name']
-    types = course_info['Course_Type']
-    creds = course_info['Credit']
-    agg = {k:{'tot':0.0,'cred':0.0} for k in BASE_FEATURES}
-
-    for i, cname in enumerate(names):
-        cat = map_course_category(types[i])
-        if cat == 'unknown':
-            continue
-        if cname in student_scores:
-            g = student_scores[cname]
-            if 0<=g<=100:
-                cr = float(creds[i])
-                agg[cat]['tot']  += g*cr
-                agg[cat]['cred'] += cr
-
-    out={}
-    for k,v in agg.items():
-        out[k] = (v['tot']/v['cred']) if v['cred']>0 else np.nan
-    return out
+    catalog = as_course_catalog(course_info)
+    scores = catalog.category_scores(catalog.grade_matrix([student_scores]))[0]
+    return {k: float(v) for k, v in zip(CATEGORY_KEYS, scores)}
 
 def rule_impute(cat_scores: Dict[str,float])->Dict[str,float]:
     d = dict(cat_scores)
@@ -218,9 +540,29 @@ def compute_academic_strength(cat_scores: Dict[str,float], strength_stats: Dict)
             z.append((v-m)/s)
     return float(np.mean(z)) if z else 0.0
 
+MODEL_FILES = ['feature_columns.json', 'model_params.json', 'scaler.pkl', 'catboost_model.cbm']
+OPTIONAL_MODEL_FILES = [NUMPY_MODEL_FILE]
+# auto: 优先使用导出的NumPy模型(catboost_model.npz)，缺失或过期时回退catboost库
+MODEL_BACKEND = os.environ.get('BUTP_MODEL_BACKEND', 'auto')
+
+def load_catboost_model(model_dir: str, backend: str=None):
+    backend = backend or MODEL_BACKEND
+    if backend != 'catboost':
+        model = load_numpy_model(model_dir)
+        if model is not None:
+            print(f"CatBoost模型加载完成 (NumPy推理)")
+            return model
+        if backend == 'numpy':
+            raise FileNotFoundError(f"NumPy模型不存在或已过期: {os.path.join(model_dir, NUMPY_MODEL_FILE)}")
+    from catboost import CatBoostClassifier
+    model = CatBoostClassifier()
+    model.load_model(os.path.join(model_dir, 'catboost_model.cbm'))
+    print(f"CatBoost模型加载完成")
+    return model
+
 def load_artifacts(model_dir: str):
     print(f"正在加载模型文件，目录: {model_dir}")
-    req = ['feature_columns.json', 'model_params.json', 'scaler.pkl', 'catboost_model.cbm']
+    req = MODEL_FILES
     for f in req:
         p=os.path.join(model_dir, f)
         if not os.path.exists(p):
@@ -235,11 +577,184 @@ def load_artifacts(model_dir: str):
     with open(os.path.join(model_dir, 'scaler.pkl'), 'rb') as f:
         scaler = pickle.load(f)
         print(f"标准化器加载完成")
-    model = CatBoostClassifier()
-    model.load_model(os.path.join(model_dir, 'catboost_model.cbm'))
-    print(f"CatBoost模型加载完成")
+    model = load_catboost_model(model_dir)
     return model, scaler, feature_cols, model_params
 
+class ModelRegistry:
+    """
+    Process-wide cache of load_artifacts results keyed by model directory.
+    Each get() stats the model files; when an mtime/size changes the files are
+    hashed, and only a changed content hash triggers a reload. The new artifacts
+    replace the old tuple in one assignment, so callers never see a mix.
+    """
+    def __init__(self):
+        self._entries = {}   # model_dir -> {'stat':..., 'hash':..., 'artifacts':...}
+        self._lock = threading.Lock()
+        self._dir_locks = {}
+
+    @staticmethod
+    def _stat(model_dir: str)->Tuple:
+        out = []
+        for f in MODEL_FILES:
+            p = os.path.join(model_dir, f)
+            if not os.path.exists(p):
+                raise FileNotFoundError(f"模型文件不存在: {p}")
+            st = os.stat(p)
+            out.append((f, st.st_mtime_ns, st.st_size))
+        for f in OPTIONAL_MODEL_FILES:
+            p = os.path.join(model_dir, f)
+            st = os.stat(p) if os.path.exists(p) else None
+            out.append((f, st and st.st_mtime_ns, st and st.st_size))
+        return tuple(out)
+
+    @staticmethod
+    def _hash(model_dir: str)->str:
+        h = hashlib.sha256()
+        for f in MODEL_FILES + [f for f in OPTIONAL_MODEL_FILES
+                                if os.path.exists(os.path.join(model_dir, f))]:
+            with open(os.path.join(model_dir, f), 'rb') as fh:
+                for chunk in iter(lambda: fh.read(1 << 20), b''):
+                    h.update(chunk)
+        return h.hexdigest()
+
+    def _dir_lock(self, key: str)->threading.Lock:
+        with self._lock:
+            return self._dir_locks.setdefault(key, threading.Lock())
+
+    def get(self, model_dir: str):
+        """(model, scaler, feature_cols, model_params) for model_dir, loading or reloading as needed."""
+        key = os.path.abspath(model_dir)
+        stat = self._stat(key)
+        entry = self._entries.get(key)
+        if entry is not None and entry['stat'] == stat:
+            return entry['artifacts']
+        with self._dir_lock(key):
+            entry = self._entries.get(key)
+            stat = self._stat(key)
+            if entry is not None and entry['stat'] == stat:
+                return entry['artifacts']
+            digest = self._hash(key)
+            if entry is not None and entry['hash'] == digest:
+                # touched but identical content: keep the loaded model
+                self._entries[key] = {**entry, 'stat': stat}
+                return entry['artifacts']
+            if entry is not None:
+                print(f"检测到模型文件变更，重新加载: {key}")
+            artifacts = load_artifacts(key)
+            self._entries[key] = {'stat': stat, 'hash': digest, 'artifacts': artifacts}
+            return artifacts
+
+    def preload(self, model_dirs: List[str], warmup: bool=True):
+        """Load (and optionally warm up) models at server start."""
+        for d in model_dirs:
+            self.get(d)
+            if warmup:
+                self.warmup(d)
+
+    def warmup(self, model_dir: str):
+        """One throwaway prediction so the first request does not pay CatBoost's lazy init."""
+        model, scaler, feature_cols, model_params = self.get(model_dir)
+        X = np.zeros((1, len(feature_cols)))
+        postprocess_proba(model.predict_proba(scaler.transform(X)), model_params)
+
+    def info(self)->Dict[str, Dict]:
+        return {k: {'hash': v['hash'][:12]} for k, v in self._entries.items()}
+
+    def version(self, model_dir: str)->str:
+        """Content hash of the model files currently loaded for model_dir."""
+        self.get(model_dir)
+        return self._entries[os.path.abspath(model_dir)]['hash']
+
+MODEL_REGISTRY = ModelRegistry()
+
+def get_artifacts(model_dir: str):
+    """Cached load_artifacts; see ModelRegistry."""
+    return MODEL_REGISTRY.get(model_dir)
+
+class InferenceCache:
+    """
+    Bounded LRU of post-processed class probabilities keyed by the clipped feature
+    vector rounded to `decimals`, so repeated candidates (saturated or clipped
+    categories, students with identical grids) skip the scaler and the model.
+    A cached row is scored on its rounded features, so the result depends only on
+    the key; choose `decimals` finer than the model split borders to keep outputs
+    identical to uncached scoring. Entries are keyed per loaded model object.
+    """
+    def __init__(self, maxsize: int=200000, decimals: int=6):
+        self.maxsize = int(maxsize)
+        self.decimals = int(decimals)
+        self.hits = 0
+        self.misses = 0
+        self._store = OrderedDict()
+        self._lock = threading.Lock()
+        self._tokens = itertools.count()
+
+    def _model_token(self, model)->int:
+        token = getattr(model, '_inference_cache_token', None)
+        if token is None:
+            token = next(self._tokens)
+            try:
+                model._inference_cache_token = token
+            except AttributeError:
+                token = ('id', id(model))
+        return token
+
+    def predict_proba(self, X: np.ndarray, model, compute)->np.ndarray:
+        """Rows of `compute(rows)` for X, computing each distinct uncached key once."""
+        Xq = np.round(np.asarray(X, dtype=float), self.decimals) + 0.0  # -0.0 -> 0.0
+        token = self._model_token(model)
+        keys = [(token, row.tobytes()) for row in Xq]
+        values = [None]*len(keys)
+        pending = {}
+        with self._lock:
+            for i, k in enumerate(keys):
+                v = self._store.get(k)
+                if v is None:
+                    pending.setdefault(k, []).append(i)
+                else:
+                    self._store.move_to_end(k)
+                    values[i] = v
+        if pending:
+            P = compute(Xq[[rows[0] for rows in pending.values()]])
+            with self._lock:
+                for (k, rows), p in zip(pending.items(), P):
+                    for i in rows:
+                        values[i] = p
+                    self._store[k] = p
+                while len(self._store) > self.maxsize:
+                    self._store.popitem(last=False)
+        with self._lock:
+            self.misses += len(pending)
+            self.hits += len(keys) - len(pending)
+        return np.stack(values) if values else compute(Xq)
+
+    def clear(self):
+        with self._lock:
+            self._store.clear()
+            self.hits = self.misses = 0
+
+    def info(self)->Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {'size': len(self._store), 'maxsize': self.maxsize, 'decimals': self.decimals,
+                    'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits/total if total else 0.0}
+
+# BUTP_INFERENCE_CACHE_SIZE>0 enables the cache (off by default)
+INFERENCE_CACHE = None
+
+def configure_inference_cache(maxsize: int=0, decimals: int=6)->InferenceCache:
+    """Install (maxsize>0) or remove (maxsize=0) the process-wide inference cache."""
+    global INFERENCE_CACHE
+    INFERENCE_CACHE = InferenceCache(maxsize, decimals) if maxsize and int(maxsize) > 0 else None
+    return INFERENCE_CACHE
+
+def inference_cache_info()->Dict:
+    return INFERENCE_CACHE.info() if INFERENCE_CACHE is not None else {'enabled': False}
+
+configure_inference_cache(int(os.environ.get('BUTP_INFERENCE_CACHE_SIZE', '0') or 0),
+                          int(os.environ.get('BUTP_INFERENCE_CACHE_DECIMALS', '6') or 6))
+
 def strength_stats_for_major(model_params:Dict, major_name:str)->Dict:
     stats_all = model_params.get('strength_stats', {})
     return stats_all.get(major_name, stats_all.get('_global_', {}))
@@ -290,39 +805,289 @@ def assemble_features(current_scores: Dict[str,float],
     return X
 
 def predict_argmax(X: pd.DataFrame, model, scaler, model_params: Dict)->int:
-    X_local = X.copy()
-    if hasattr(scaler, 'feature_names_in_'):
-        X_local.columns = scaler.feature_names_in_
-    Xs = scaler.transform(X_local.values)
-    proba = model.predict_proba(Xs)
-    proba = postprocess_proba(proba, model_params)
+    proba = predict_proba_batch(X.values, model, scaler, model_params)
     pred = int(np.argmax(proba, axis=1)[0])+1
     return pred
 
+# ------------------ batched feature assembly for the uniform inverse search ------------------
+def features_from_category_arrays(cat_scores: Dict[str, np.ndarray],
+                                  major_name: str,
+                                  model_params: Dict,
+                                  feature_cols: List[str])->np.ndarray:
+    """
+    Array form of rule_impute + compute_academic_strength + clip_features.
+    `cat_scores` maps every CATEGORY_KEYS entry to an array of one common shape;
+    returns that shape + (len(feature_cols),).
+    """
+    d = dict(cat_scores)
+    shape = next(iter(d.values())).shape
+
+    # rule_impute, same order: innovation may borrow from an imputed major
+    for target, rule in (('major', 'major_from'), ('innovation', 'innovation_from')):
+        num = np.zeros(shape); den = np.zeros(shape)
+        for src, a in IMPUTE_RULES[rule].items():
+            v = d.get(src, np.full(shape, np.nan))
+            has = ~np.isnan(v)
+            num += np.where(has, a*v, 0.0)
+            den += np.where(has, a, 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            imputed = np.where(den>0, num/den, np.nan)
+        cur = d.get(target, np.full(shape, np.nan))
+        d[target] = np.where(np.isnan(cur), imputed, cur)
+
+    # compute_academic_strength: mean of z over BASE_FEATURES (duplicates included)
+    sstats = strength_stats_for_major(model_params, major_name)
+    kept = []
+    for c in BASE_FEATURES:
+        m, s = sstats.get(c, [np.nan, np.nan])
+        if s and s>0:
+            kept.append((d[c], m, s))
+    size = int(np.prod(shape))
+    academic = np.zeros(size)
+    if kept:
+        V = np.stack([v for v,_,_ in kept], axis=-1).reshape(size, len(kept))
+        Z = np.stack([(v-m)/s for v,m,s in kept], axis=-1).reshape(size, len(kept))
+        has = ~np.isnan(V)
+        # rows sharing a validity pattern reduce the same compact vector as np.mean(list)
+        for pattern in np.unique(has, axis=0):
+            if not pattern.any():
+                continue
+            rows = (has == pattern).all(axis=1)
+            academic[rows] = np.mean(np.ascontiguousarray(Z[rows][:, pattern]), axis=1)
+    feat = {**d, 'AcademicStrength': academic.reshape(shape)}
+
+    X = np.stack([feat.get(col, np.full(shape, np.nan)) for col in feature_cols], axis=-1)
+    clips = model_params.get('clip_ranges', {})
+    for j, col in enumerate(feature_cols):
+        if col in clips:
+            X[..., j] = np.clip(X[..., j], clips[col].get('min', None), clips[col].get('max', None))
+    return X
+
+def uniform_plan_features(tot: np.ndarray, cred: np.ndarray, miss: np.ndarray,
+                          grades: np.ndarray,
+                          major_name: str,
+                          model_params: Dict,
+                          feature_cols: List[str])->np.ndarray:
+    """
+    Features when every un-taken course is set to a uniform score s: each category
+    is (tot + s*miss) / (cred + miss), from CourseCatalog.category_sums.
+    `grades` is (k,) shared by all students or (n_students, k) per student;
+    returns (n_students, k, len(feature_cols)).
+    """
+    grades = np.asarray(grades, dtype=float)
+    if grades.ndim == 1:
+        grades = np.broadcast_to(grades, (tot.shape[0], len(grades)))
+    return category_plan_features(tot, cred, miss, grades[..., None], major_name, model_params, feature_cols)
+
+def category_plan_features(tot: np.ndarray, cred: np.ndarray, miss: np.ndarray,
+                           targets: np.ndarray,
+                           major_name: str,
+                           model_params: Dict,
+                           feature_cols: List[str])->np.ndarray:
+    """
+    Features when the un-taken courses of category j average targets[..., j]: each
+    category is (tot + a_j*miss) / (cred + miss). Only the credit-weighted average per
+    category enters the features, so any per-course split with that average is equivalent.
+    `targets` is (n_students, m, n_categories) (or broadcastable, e.g. (n, m, 1) for one
+    uniform score); returns (n_students, m, len(feature_cols)).
+    """
+    a = np.asarray(targets, dtype=float)
+    ok = (a >= 0) & (a <= 100)
+    num = tot[:, None, :] + np.where(ok, a*miss[:, None, :], 0.0)
+    den = cred[:, None, :] + np.where(ok, miss[:, None, :], 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scores = np.where(den > 0, num/den, np.nan)
+    cat_scores = {c: scores[..., i] for i, c in enumerate(CATEGORY_KEYS)}
+    return features_from_category_arrays(cat_scores, major_name, model_params, feature_cols)
+
+def assemble_features_grid(students_scores: List[Dict[str,float]],
+                           grades: np.ndarray,
+                           course_info: Dict[str, Dict[str,List]],
+                           major_name: str,
+                           model_params: Dict,
+                           feature_cols: List[str],
+                           grade_matrix: np.ndarray=None)->np.ndarray:
+    """
+    Vectorized assemble_features for many students at once: every un-taken required
+    course of each student is set to each uniform score in `grades`.
+    `grade_matrix` may pass the catalog-aligned grades of `students_scores` directly.
+    Returns an array of shape (n_students, len(grades), len(feature_cols)).
+    """
+    catalog = as_course_catalog(course_info)
+    if grade_matrix is None:
+        grade_matrix = catalog.grade_matrix(students_scores)
+    tot, cred, miss = catalog.category_sums(grade_matrix)
+    return uniform_plan_features(tot, cred, miss, grades, major_name, model_params, feature_cols)
+
+def predict_proba_batch(X: np.ndarray, model, scaler, model_params: Dict)->np.ndarray:
+    """
+    Post-processed class probabilities for a 2-D feature array, one row per input row.
+    Served through INFERENCE_CACHE when it is configured.
+    """
+    compute = lambda rows: postprocess_proba(model.predict_proba(scaler.transform(rows)), model_params)
+    if INFERENCE_CACHE is not None:
+        return INFERENCE_CACHE.predict_proba(X, model, compute)
+    return compute(X)
+
+def predict_argmax_batch(X: np.ndarray, model, scaler, model_params: Dict)->np.ndarray:
+    """Row-wise predict_argmax over a 2-D feature array; returns 1-based classes."""
+    return np.argmax(predict_proba_batch(X, model, scaler, model_params), axis=1)+1
+
+def classes_of_rows(X: np.ndarray, model, scaler, model_params: Dict)->np.ndarray:
+    """1-based classes of a (..., n_features) feature array, flattened."""
+    return predict_argmax_batch(X.reshape(-1, X.shape[-1]), model, scaler, model_params)
+
+def grade_grid(min_grade, max_grade, step=1)->List:
+    """Uniform scores searched by the inverse search; ints for the default step of 1."""
+    if step == 1 and float(min_grade).is_integer() and float(max_grade).is_integer():
+        return list(range(int(min_grade), int(max_grade) + 1))
+    n = int(math.floor((max_grade - min_grade)/step + 1e-9))
+    return [round(min_grade + i*step, 6) for i in range(n + 1)]
+
+def uniform_probability_curves(grade_matrix: np.ndarray,
+                               grades: List,
+                               course_info: Dict[str, Dict[str,List]],
+                               major_name: str,
+                               model, scaler, model_params: Dict,
+                               feature_cols: List[str],
+                               sums: Tuple[np.ndarray, np.ndarray, np.ndarray]=None)->np.ndarray:
+    """
+    Post-processed probabilities when every missing course gets the uniform score
+    grades[j]: (n_students, len(grades), n_classes). Argmax+1 equals the grid search.
+    `sums` may pass precomputed category_sums of grade_matrix (e.g. MissingCourseGroups).
+    """
+    if sums is None:
+        sums = as_course_catalog(course_info).category_sums(grade_matrix)
+    X = uniform_plan_features(*sums, grades, major_name, model_params, feature_cols)
+    n, k, f = X.shape
+    return predict_proba_batch(X.reshape(-1, f), model, scaler, model_params).reshape(n, k, -1)
+
+def probability_curves_table(curves: Dict[str, np.ndarray], grades: List,
+                             class_order: List=None)->pd.DataFrame:
+    """Long (SNH, grade, prob1..probC) table of per-student probability curves."""
+    class_order = class_order or [1, 2, 3]
+    sids = list(curves.keys())
+    if not sids:
+        return pd.DataFrame(columns=['SNH', 'grade'] + [f'prob{c}' for c in class_order])
+    P = np.stack([curves[sid] for sid in sids])
+    out = {'SNH': np.repeat(np.array(sids, dtype=object), len(grades)),
+           'grade': np.tile(np.asarray(grades), len(sids))}
+    for j, c in enumerate(class_order[:P.shape[2]]):
+        out[f'prob{c}'] = P[:, :, j].ravel()
+    return pd.DataFrame(out)
+
+def model_split_borders(model, n_features: int)->List[np.ndarray]:
+    """Split borders of a CatBoost model per (scaled) input column."""
+    borders = model.get_borders()
+    return [np.asarray(borders.get(j, []), dtype=np.float32) for j in range(n_features)]
+
+def uniform_predictions_by_breakpoints(grade_matrix: np.ndarray,
+                                       grades: List,
+                                       course_info: Dict[str, Dict[str,List]],
+                                       major_name: str,
+                                       model, scaler, model_params: Dict,
+                                       feature_cols: List[str],
+                                       borders: List[np.ndarray]=None,
+                                       sums: Tuple[np.ndarray, np.ndarray, np.ndarray]=None)->np.ndarray:
+    """
+    Classes on the uniform-score grid without scoring every grid point.
+    Before clipping every feature is affine in the uniform score s, so after
+    scaling it crosses each CatBoost split border at one computable s and the
+    model output is constant between crossings. Per student, grid points close
+    to a crossing (within the float32 rounding band of the border) are scored
+    directly and every other gap between crossings is scored once at its first
+    grid point, so the result equals scoring the full grid.
+    `sums` may pass precomputed category_sums of grade_matrix.
+    Returns (n_students, len(grades)) classes.
+    """
+    tot, cred, miss = as_course_catalog(course_info).category_sums(grade_matrix) if sums is None else sums
+    n, g = tot.shape[0], np.asarray(grades, dtype=float)
+    if borders is None:
+        borders = model_split_borders(model, len(feature_cols))
+
+    # Affine coefficients of the scaled, unclipped features between the grid ends
+    lo, hi = float(g[0]), float(g[-1])
+    if n == 0 or hi <= lo:
+        X = uniform_plan_features(tot, cred, miss, g, major_name, model_params, feature_cols)
+        return predict_argmax_batch(X.reshape(-1, X.shape[-1]), model, scaler, model_params).reshape(n, len(g))
+    raw = uniform_plan_features(tot, cred, miss, np.array([lo, hi]), major_name,
+                                {**model_params, 'clip_ranges': {}}, feature_cols)
+    ends = scaler.transform(raw.reshape(-1, raw.shape[-1])).reshape(n, 2, -1)
+    x0 = ends[:, 0, :]
+    slope = (ends[:, 1, :] - x0)/(hi - lo)
+
+    # Per feature: s where the scaled value meets a border and where it meets the
+    # next float32 value above it (CatBoost compares float32 features), padded by tol
+    tol = 1e-6*(1 + max(abs(lo), abs(hi)))
+    lows, highs = [], []
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for j, b in enumerate(borders):
+            if len(b) == 0:
+                continue
+            b_lo = b.astype(float)
+            b_hi = np.nextafter(b, np.float32(np.inf)).astype(float)
+            sl = slope[:, j:j+1]
+            s_a = lo + (b_lo[None, :] - x0[:, j:j+1])/sl
+            s_b = lo + (b_hi[None, :] - x0[:, j:j+1])/sl
+            live = np.isfinite(s_a) & np.isfinite(s_b) & (sl != 0)
+            lows.append(np.where(live, np.minimum(s_a, s_b) - tol, np.nan))
+            highs.append(np.where(live, np.maximum(s_a, s_b) + tol, np.nan))
+    L = np.concatenate(lows, axis=1) if lows else np.full((n, 0), np.nan)
+    H = np.concatenate(highs, axis=1) if highs else np.full((n, 0), np.nan)
+
+    # Grid points to score: near-crossing points and the first point of every gap
+    rows, cols, rep_of = [], [], []
+    for i in range(n):
+        keep = (H[i] >= lo) & (L[i] <= hi)
+        Ls, Hs = np.sort(L[i][keep]), np.sort(H[i][keep])
+        inside = np.searchsorted(Ls, g, 'right') - np.searchsorted(Hs, g, 'left')
+        gap = np.searchsorted(Hs, g, 'left')
+        first = {}
+        rep = np.empty(len(g), dtype=int)
+        for k in range(len(g)):
+            if inside[k] > 0:
+                rep[k] = len(rows); rows.append(i); cols.append(k)
+            elif gap[k] in first:
+                rep[k] = first[gap[k]]
+            else:
+                first[gap[k]] = rep[k] = len(rows); rows.append(i); cols.append(k)
+        rep_of.append(rep)
+
+    rows = np.asarray(rows, dtype=int); cols = np.asarray(cols, dtype=int)
+    X = uniform_plan_features(tot[rows], cred[rows], miss[rows], g[cols][:, None],
+                              major_name, model_params, feature_cols)
+    scored = predict_argmax_batch(X.reshape(-1, X.shape[-1]), model, scaler, model_params)
+    return np.stack([scored[rep] for rep in rep_of]) if rep_of else np.zeros((0, len(g)), dtype=int)
+
 # ------------------ MODIFIED: uniform score inverse search with policies ------------------
 def uniform_threshold_search(current_scores: Dict[str,float],
                              course_info: Dict[str, Dict[str,List]],
                              major_name: str,
                              model, scaler, model_params: Dict,
                              feature_cols: List[str],
-                             min_grade:int=60, max_grade:int=90)->Dict:
+                             min_grade:int=60, max_grade:int=90,
+                             predictions: List[Tuple[int,int]]=None,
+                             grade_step: float=1,
+                             missing: Tuple[List[str], float]=None)->Dict:
     """
-    Search the uniform target score over [min_grade, max_grade] for all un-taken required courses.
+    Search the uniform target score over [min_grade, max_grade] (every `grade_step`)
+    for all un-taken required courses.
     Implements:
       - Case 1 policy for Target=2 multi-interval selection.
       - Case 2 consistency: enforce s_min_for_1 > s_min_for_2 with safe fallbacks.
+    `predictions` may carry a precomputed [(score, class), ...] grid and `missing`
+    the (un-taken courses, credit) of the student's MissingCourseGroups group (see
+    uniform_threshold_search_batch); otherwise both are derived from current_scores.
     Returns diagnostics for downstream stats printing.
     """
-    names = course_info['Course_Name']
-    creds = course_info['Credit']
-
-    taken = set(current_scores.keys())
-    missing_courses = []
-    missing_credits = 0.0
-    for i, cname in enumerate(names):
-        if cname not in taken:
-            missing_courses.append(cname)
-            missing_credits += float(creds[i])
+    catalog = as_course_catalog(course_info)
+    if missing is None or predictions is None:
+        G = catalog.grade_matrix([current_scores])
+        taken = np.array([[c in current_scores for c in catalog.columns]], dtype=bool)
+        groups = MissingCourseGroups(catalog, G, taken)
+        if missing is None:
+            missing = groups.missing(0)
+    missing_courses, missing_credits = missing
 
     # 静默统计课程信息
 
@@ -347,28 +1112,28 @@ def uniform_threshold_search(current_scores: Dict[str,float],
             'DominatedBy1': 0
         }
 
-    predictions = []
-    for score in range(min_grade, max_grade + 1):
-        plan = {c: score for c in missing_courses}
-        X = assemble_features(current_scores, plan, course_info, major_name, model_params, feature_cols)
-        pred = predict_argmax(X, model, scaler, model_params)
-        predictions.append((score, pred))
-
-    pred_map = {s:p for s,p in predictions}
+    if predictions is None:
+        # 所有未修课程取同一分数：特征由类别学分和向量化计算，不再逐分数构建字典
+        grades = grade_grid(min_grade, max_grade, grade_step)
+        X = uniform_plan_features(*groups.category_sums(G), grades,
+                                  major_name, model_params, feature_cols)[0]
+        predictions = list(zip(grades, [int(p) for p in predict_argmax_batch(X, model, scaler, model_params)]))
 
     def find_ranges(target_class: int) -> List[Tuple[int, int]]:
         ranges = []
         start = None
+        prev = None
         for score, pred in predictions:
             if pred == target_class:
                 if start is None:
                     start = score
             else:
                 if start is not None:
-                    ranges.append((start, score - 1))
+                    ranges.append((start, prev))
                     start = None
+            prev = score
         if start is not None:
-            ranges.append((start, max_grade))
+            ranges.append((start, prev))
         return ranges
 
     ranges_1 = find_ranges(1)
@@ -405,12 +1170,12 @@ def uniform_threshold_search(current_scores: Dict[str,float],
     if s1 <= s2:
         # 1) Choose the widest class-1 interval and try to find the minimal s > s2 in that interval.
         if ranges_1:
-            widths = [(r[1]-r[0]+1, r) for r in ranges_1]
+            widths = [(int(round((r[1]-r[0])/grade_step))+1, r) for r in ranges_1]
             _, rstar = max(widths, key=lambda x: x[0])
             found = None
-            # Scan from s2+1 upward to the right boundary of the widest interval
-            for ss in range(max(s2+1, rstar[0]), rstar[1]+1):
-                if pred_map.get(ss) == 1:
+            # Scan grid scores above s2 upward to the right boundary of the widest interval
+            for ss, p in predictions:
+                if ss > s2 and rstar[0] <= ss <= rstar[1] and p == 1:
                     found = ss
                     break
             if found is not None:
@@ -456,38 +1221,521 @@ def uniform_threshold_search(current_scores: Dict[str,float],
         'DominatedBy1': dominated_by_1
     }
 
-# ------------------ main prediction pipeline (unchanged except using the updated function) ------------------
-def predict_students(scores_file: str, course_file: str, major_name: str, out_path: str,
-                     model_dir: str, with_uniform_inverse:int=1,
-                     min_grade:int=60, max_grade:int=90):
-    print(f"\n=== predict_students 开始 ===")
-    print(f"scores_file={scores_file}")
-    print(f"course_file={course_file}")
-    print(f"major_name={major_name}")
-    print(f"out_path={out_path}")
-    print(f"model_dir={model_dir}")
+def uniform_threshold_search_batch(students_scores: Dict[str, Dict[str,float]],
+                                   course_info: Dict[str, Dict[str,List]],
+                                   major_name: str,
+                                   model, scaler, model_params: Dict,
+                                   feature_cols: List[str],
+                                   min_grade:int=60, max_grade:int=90,
+                                   grade_matrix: np.ndarray=None,
+                                   search: str='grid',
+                                   grade_step: float=1,
+                                   return_curves: bool=False):
+    """
+    Cohort-wide uniform_threshold_search: builds the (students x grades x features)
+    candidate matrix once, scores it with a single scaler.transform / predict_proba,
+    then applies the interval policies per student on the prediction grid.
+    search='breakpoints' scores once per CatBoost decision segment instead of once
+    per grid point (same result, see uniform_predictions_by_breakpoints).
+    `grade_matrix` optionally holds the catalog-aligned grades, one row per student.
+    Students are grouped by missing-course signature (MissingCourseGroups), so the
+    un-taken course lists and credit sums are built once per group.
+    Returns {SNH: result} with the same fields as uniform_threshold_search; with
+    return_curves=True also {SNH: (len(grades), n_classes) probabilities} for every
+    student (scored on the full grid, see uniform_probability_curves).
+    """
+    if search not in ('grid', 'breakpoints'):
+        raise ValueError(f"未知的逆推搜索模式: {search}")
+    catalog = as_course_catalog(course_info)
+    grades = grade_grid(min_grade, max_grade, grade_step)
+    sids = list(students_scores.keys())
+    taken = None
+    if grade_matrix is None:
+        grade_matrix = catalog.grade_matrix([students_scores[sid] for sid in sids])
+        taken = np.array([[c in students_scores[sid] for c in catalog.columns] for sid in sids],
+                         dtype=bool).reshape(len(sids), len(catalog))
+    # 未修课程集合相同的学生共享未修课程清单与学分和，只按学生计算已修成绩部分
+    groups = MissingCourseGroups(catalog, grade_matrix, taken)
+    todo = [i for i in range(len(sids)) if groups.missing(i)[0]]
+    # the breakpoint geometry assumes every grid score counts as a valid grade
+    if search == 'breakpoints' and not (0 <= min_grade and max_grade <= 100):
+        search = 'grid'
+
+    grid = {}
+    curves = {}
+    if return_curves:
+        P = uniform_probability_curves(grade_matrix, grades, catalog, major_name,
+                                       model, scaler, model_params, feature_cols,
+                                       sums=groups.category_sums(grade_matrix))
+        preds = np.argmax(P, axis=2) + 1
+        for i in todo:
+            grid[sids[i]] = list(zip(grades, [int(p) for p in preds[i]]))
+        curves = dict(zip(sids, P))
+    elif todo:
+        sums = groups.category_sums(grade_matrix, todo)
+        if search == 'breakpoints':
+            preds = uniform_predictions_by_breakpoints(None, grades, catalog, major_name,
+                                                       model, scaler, model_params, feature_cols,
+                                                       sums=sums)
+        else:
+            X = uniform_plan_features(*sums, grades, major_name, model_params, feature_cols)
+            preds = predict_argmax_batch(X.reshape(-1, X.shape[-1]), model, scaler, model_params)
+            preds = preds.reshape(len(todo), len(grades))
+        for r, i in enumerate(todo):
+            grid[sids[i]] = list(zip(grades, [int(p) for p in preds[r]]))
+
+    results = {
+        sid: uniform_threshold_search(
+            students_scores[sid], catalog, major_name, model, scaler, model_params, feature_cols,
+            min_grade=min_grade, max_grade=max_grade, predictions=grid.get(sid, []),
+            grade_step=grade_step, missing=groups.missing(i)
+        )
+        for i, sid in enumerate(sids)
+    }
+    return (results, curves) if return_curves else results
+
+# ------------------ credit-weighted non-uniform target allocation ------------------
+def _allocation_moves(n_categories: int, steps=(8, 4, 2, 1), pair_steps=(4, 2, 1))->np.ndarray:
+    """Grid-index deltas tried per iteration: lower one category, or lower one and raise another."""
+    moves = []
+    for k in range(n_categories):
+        for d in steps:
+            m = np.zeros(n_categories, dtype=int); m[k] = -d; moves.append(m)
+    for k, j in itertools.permutations(range(n_categories), 2):
+        for dk in pair_steps:
+            for dj in pair_steps:
+                m = np.zeros(n_categories, dtype=int); m[k] = -dk; m[j] = dj; moves.append(m)
+    return np.array(moves)
+
+def credit_allocation_search(grade_matrix: np.ndarray,
+                             course_info: Dict[str, Dict[str,List]],
+                             major_name: str,
+                             model, scaler, model_params: Dict,
+                             feature_cols: List[str],
+                             targets=(1, 2),
+                             min_grade:int=60, max_grade:int=90,
+                             grade_step: float=1,
+                             time_budget: float=5.0,
+                             chunk_states: int=64)->List[Dict[int, Dict]]:
+    """
+    Cheapest per-course score plan reaching each target class, per student.
+    Effort is credit-weighted, sum(credit*(score-min_grade)) over un-taken courses,
+    each course counted once (a course in several categories scores the highest of
+    their targets, as in the filled-in plan).
+    The features only see credit-weighted category averages, so the search runs over
+    one target average per category (all un-taken courses of a category get it;
+    courses outside every category stay at min_grade) instead of per course.
+    Start: the cheapest uniform grid score of the target class (else the cheapest
+    feasible one-category-high/low seed); then greedy descent, each iteration
+    scoring every student's single-category decreases and credit trades (lower one
+    category, raise another with a net saving), until no move helps. The best plan
+    found is re-checked on the filled-in grades before it is returned.
+    `time_budget` seconds bound everything after the uniform scoring: seeds and
+    descent steps are scored `chunk_states` (student, target) pairs at a time and
+    the deadline is checked between chunks. Pairs cut off by the deadline are
+    returned with complete=False (and feasible=False when no plan was found yet).
+    Returns one {target: result} per grade_matrix row.
+    """
+    started = time.monotonic()
+    deadline = started + max(float(time_budget), 0.0)
+    out_of_time = lambda: time.monotonic() >= deadline
+    catalog = as_course_catalog(course_info)
+    tot, cred, miss = catalog.category_sums(grade_matrix)
+    n, K = miss.shape
+    grades = np.asarray(grade_grid(min_grade, max_grade, grade_step), dtype=float)
+    top = len(grades) - 1
+    active = miss > 0
+    chunk_states = max(int(chunk_states), 1)
+    classes_of = lambda X: classes_of_rows(X, model, scaler, model_params)
+
+    # effort per course, not per (course, category): un-taken credit grouped by the
+    # set of categories a course belongs to; the course scores the max of their targets
+    course_cats = [np.flatnonzero(catalog.weights[j] > 0) for j in range(len(catalog))]
+    signatures = sorted({tuple(c) for c in course_cats if len(c)})
+    sig_pos = {sig: q for q, sig in enumerate(signatures)}
+    credit_by_sig = np.zeros((len(catalog), len(signatures)))
+    for j, cats in enumerate(course_cats):
+        if len(cats):
+            credit_by_sig[j, sig_pos[tuple(cats)]] = catalog.weights[j].max()
+    miss_sig = np.isnan(grade_matrix).astype(float) @ credit_by_sig
+
+    def effort_of(idx, who):
+        """Credit-weighted effort of category grid-index plans idx (R x K) for students `who` (R,)."""
+        P = grades[idx] - min_grade
+        if not signatures:
+            return np.zeros(P.shape[:-1])
+        per_sig = np.stack([P[..., list(sig)].max(axis=-1) for sig in signatures], axis=-1)
+        return (per_sig*miss_sig[who]).sum(axis=-1)
+
+    def score(idx, who):
+        """Classes of category grid-index plans idx (R x K) owned by students `who` (R,)."""
+        if len(who) == 0:
+            return np.zeros(0, dtype=int)
+        X = category_plan_features(tot[who], cred[who], miss[who], grades[idx][:, None, :],
+                                   major_name, model_params, feature_cols)
+        return classes_of(X)
+
+    uniform = classes_of(uniform_plan_features(tot, cred, miss, grades, major_name,
+                                               model_params, feature_cols)).reshape(n, len(grades))
+
+    # one search state per (student, target)
+    states = [(i, t) for t in targets for i in range(n) if active[i].any()]
+    idx = np.zeros((len(states), K), dtype=int)
+    found = np.zeros(len(states), dtype=bool)
+    uniform_score = np.full(len(states), np.nan)
+    seeds, seed_owner = [], []
+    for s_, (i, t) in enumerate(states):
+        hit = np.flatnonzero(uniform[i] == t)
+        if len(hit):
+            idx[s_] = hit[0]; found[s_] = True; uniform_score[s_] = grades[hit[0]]
+        else:
+            for k in np.flatnonzero(active[i]):
+                hi = np.zeros(K, dtype=int); hi[k] = top
+                lo = np.full(K, top); lo[k] = 0
+                seeds += [hi, lo]; seed_owner += [s_, s_]
+    # states still to seed, or still descending; cleared when finished, kept when cut off
+    pending = np.zeros(len(states), dtype=bool)
+    if seeds:
+        seeds = np.array(seeds); seed_owner = np.array(seed_owner)
+        pending[np.unique(seed_owner)] = True
+        owners = np.unique(seed_owner)
+        for c in range(0, len(owners), chunk_states):
+            if out_of_time():
+                break
+            r_all = np.flatnonzero(np.isin(seed_owner, owners[c:c + chunk_states]))
+            owner_student = np.array([states[s_][0] for s_ in seed_owner[r_all]])
+            ok = score(seeds[r_all], owner_student) == np.array([states[s_][1] for s_ in seed_owner[r_all]])
+            cost = np.where(ok, effort_of(seeds[r_all], owner_student), np.inf)
+            for s_ in owners[c:c + chunk_states]:
+                pending[s_] = False
+                r = np.flatnonzero(seed_owner[r_all] == s_)
+                if np.isfinite(cost[r]).any():
+                    best = r_all[r[np.argmin(cost[r])]]
+                    idx[s_] = seeds[best]; found[s_] = True
+
+    start_idx = idx.copy()
+    student_of = np.array([i for i, _ in states], dtype=int)
+    target_of = np.array([t for _, t in states], dtype=int)
+    moves = _allocation_moves(K)
+    touched = moves != 0
+    open_ = found.copy()
+    iterations = 0
+    while open_.any() and not out_of_time():
+        iterations += 1
+        live_all = np.flatnonzero(open_)
+        for c in range(0, len(live_all), chunk_states):
+            if out_of_time():
+                break
+            live = live_all[c:c + chunk_states]
+            cand = idx[live][:, None, :] + moves[None, :, :]
+            who = student_of[live]
+            valid = ((cand >= 0) & (cand <= top)).all(axis=2)
+            valid &= ~(touched[None, :, :] & ~active[who][:, None, :]).any(axis=2)
+            gain = effort_of(np.clip(cand, 0, top), who[:, None]) - effort_of(idx[live], who)[:, None]
+            valid &= gain < -1e-9
+            rs, ms = np.nonzero(valid)
+            ok = score(cand[rs, ms], who[rs]) == target_of[live][rs]
+            cost = np.where(ok, gain[rs, ms], np.inf)
+            improved = np.zeros(len(live), dtype=bool)
+            order = np.lexsort((cost, rs))
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = rs[order][1:] != rs[order][:-1]
+            for o in order[first]:
+                if np.isfinite(cost[o]):
+                    idx[live[rs[o]]] = cand[rs[o], ms[o]]
+                    improved[rs[o]] = True
+            open_[live[~improved]] = False
+    pending |= open_
+
+    # 将类别目标均分落到具体课程，并在填入后的成绩上复核
+    print(f"非均匀分配搜索: {len(states)} 个(学生, 目标), {iterations} 轮, 用时 {time.monotonic()-started:.1f}s"
+          + (f"，已达时间预算（{int(pending.sum())} 个未完成）" if pending.any() else ""))
+    G_filled = grade_matrix[student_of].copy() if len(states) else np.zeros((0, len(catalog)))
+    for s_ in range(len(states)):
+        row = G_filled[s_]
+        for j in np.flatnonzero(np.isnan(row)):
+            cats = course_cats[j]
+            row[j] = grades[idx[s_][cats]].max() if len(cats) else min_grade
+    if len(states):
+        f_tot, f_cred, f_miss = catalog.category_sums(G_filled)
+        checked = classes_of(uniform_plan_features(f_tot, f_cred, f_miss, np.array([min_grade]),
+                                                   major_name, model_params, feature_cols)) == target_of
+    else:
+        checked = np.zeros(0, dtype=bool)
+
+    out = [{} for _ in range(n)]
+    for s_, (i, t) in enumerate(states):
+        if found[s_] and not checked[s_]:
+            # 课程同时计入多个类别时类别均分无法精确落地：退回统一分数起点，没有则视为不可达
+            if np.isnan(uniform_score[s_]):
+                found[s_] = False
+            else:
+                idx[s_] = start_idx[s_]
+        plan = grades[idx[s_]]
+        missing_cols = np.flatnonzero(np.isnan(grade_matrix[i]))
+        course_scores = {catalog.columns[j]: (float(plan[course_cats[j]].max()) if len(course_cats[j])
+                                              else float(min_grade)) for j in missing_cols}
+        uni = uniform_score[s_]
+        uni_idx = np.full(K, np.searchsorted(grades, uni)) if not np.isnan(uni) else None
+        out[i][t] = {
+            'feasible': bool(found[s_]),
+            'complete': not pending[s_],
+            'uniform_score': uni,
+            'uniform_effort': float(effort_of(uni_idx, i)) if found[s_] and uni_idx is not None else np.nan,
+            'effort': float(effort_of(idx[s_], i)) if found[s_] else np.nan,
+            'category_targets': {CATEGORY_KEYS[k]: float(plan[k]) for k in np.flatnonzero(active[i])} if found[s_] else {},
+            'course_scores': course_scores if found[s_] else {},
+        }
+    return out
 
-    model, scaler, feature_cols, mparams = load_artifacts(model_dir)
-    course_info = load_course_info_from_file(course_file)
-    student_scores, student_majors = load_student_scores(scores_file)
+def allocation_table(sids: List[str], major_name: str, results: List[Dict[int, Dict]])->pd.DataFrame:
+    """OptimalAllocation sheet: one row per (student, target) with a search result."""
+    rows = []
+    for sid, res in zip(sids, results):
+        for t, r in sorted(res.items()):
+            rows.append({'SNH': sid, 'Major': major_name, 'target': t,
+                         'feasible': int(r['feasible']),
+                         'complete': int(r['complete']),
+                         'uniform_score': r['uniform_score'],
+                         'uniform_effort': r['uniform_effort'],
+                         'min_effort': r['effort'],
+                         'saving': r['uniform_effort'] - r['effort'],
+                         'category_targets': r['category_targets'],
+                         'course_scores': r['course_scores']})
+    return pd.DataFrame(rows, columns=['SNH', 'Major', 'target', 'feasible', 'complete', 'uniform_score', 'uniform_effort',
+                                       'min_effort', 'saving', 'category_targets', 'course_scores'])
+
+# ------------------ Monte Carlo attainment probability ------------------
+def student_grade_distribution(grade_matrix: np.ndarray, catalog: CourseCatalog,
+                               default_mean: float=75.0, default_std: float=10.0,
+                               min_std: float=1.0)->Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-student, per-category credit-weighted mean and spread of the taken grades,
+    each (n_students x n_categories). Categories with fewer than two valid grades
+    fall back to the student's overall mean/spread, then to the defaults.
+    """
+    W = catalog.weights
+    valid = ~np.isnan(grade_matrix) & (grade_matrix >= 0) & (grade_matrix <= 100)
+    g = np.where(valid, grade_matrix, 0.0)
+    cred, s1, s2 = valid.astype(float) @ W, g @ W, (g*g) @ W
+    count = valid.astype(float) @ (W > 0)
+    all_cred, all_s1, all_s2 = cred.sum(axis=1), s1.sum(axis=1), s2.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = s1/cred
+        std = np.sqrt(np.maximum(s2/cred - mean**2, 0.0))
+        all_mean = all_s1/all_cred
+        all_std = np.sqrt(np.maximum(all_s2/all_cred - all_mean**2, 0.0))
+    all_mean = np.where(all_cred > 0, all_mean, default_mean)
+    all_std = np.where((all_cred > 0) & (count.sum(axis=1) >= 2), all_std, default_std)
+    mean = np.where(cred > 0, mean, all_mean[:, None])
+    std = np.where(count >= 2, std, all_std[:, None])
+    return mean, np.maximum(std, min_std)
+
+def monte_carlo_attainment(grade_matrix: np.ndarray, sids: List[str],
+                           course_info: Dict[str, Dict[str,List]],
+                           major_name: str,
+                           model, scaler, model_params: Dict,
+                           feature_cols: List[str],
+                           n_samples: int=2000, seed: int=0,
+                           time_budget: float=1.0,
+                           chunk: int=1000)->Tuple[np.ndarray, np.ndarray]:
+    """
+    Probability of each predicted class when the un-taken courses are graded by a
+    draw from the student's own distribution: each missing course ~ Normal(mean, spread)
+    of its category (student_grade_distribution), clipped to 0..100. Samples only
+    enter the model through the credit-weighted category averages, so each chunk is
+    one category_plan_features + predict_proba_batch call.
+    The generator of every student is seeded from (seed, SNH), so results do not depend
+    on sharding or order; at most n_samples draws, stopping early (after at least one
+    chunk) when the student's time_budget seconds are used up.
+    Returns (class frequencies (n_students x n_classes), samples drawn (n_students,)).
+    Students without un-taken courses get their current class with 0 samples.
+    """
+    if int(n_samples) < 1:
+        raise ValueError(f"蒙特卡洛采样次数必须至少为 1: {n_samples}")
+    catalog = as_course_catalog(course_info)
+    tot, cred, miss = catalog.category_sums(grade_matrix)
+    mean, std = student_grade_distribution(grade_matrix, catalog)
+    n_classes = len(model_params.get('class_order', [1, 2, 3]))
+    P = np.zeros((len(sids), n_classes))
+    used = np.zeros(len(sids), dtype=int)
+    primary = np.argmax(catalog.weights, axis=1)
+
+    missing = np.isnan(grade_matrix)
+    if (~missing.any(axis=1)).any():
+        done = np.flatnonzero(~missing.any(axis=1))
+        X = uniform_plan_features(tot[done], cred[done], miss[done], np.array([0.0]),
+                                  major_name, model_params, feature_cols)
+        P[done, classes_of_rows(X, model, scaler, model_params) - 1] = 1.0
+
+    for i in np.flatnonzero(missing.any(axis=1)):
+        cols = np.flatnonzero(missing[i])
+        W = catalog.weights[cols]
+        mu, sd = mean[i, primary[cols]], std[i, primary[cols]]
+        rng = np.random.default_rng([int(seed), int(hashlib.sha256(str(sids[i]).encode()).hexdigest()[:12], 16)])
+        counts = np.zeros(n_classes)
+        deadline = time.monotonic() + max(float(time_budget), 0.0)
+        while used[i] < n_samples and (used[i] == 0 or time.monotonic() < deadline):
+            m = min(chunk, n_samples - used[i])
+            draw = np.clip(rng.normal(mu, sd, size=(m, len(cols))), 0, 100)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                a = np.where(miss[i] > 0, (draw @ W)/miss[i], 0.0)
+            X = category_plan_features(tot[i:i+1], cred[i:i+1], miss[i:i+1], a[None],
+                                       major_name, model_params, feature_cols)
+            counts += np.bincount(classes_of_rows(X, model, scaler, model_params) - 1, minlength=n_classes)[:n_classes]
+            used[i] += m
+        P[i] = counts/used[i]
+    return P, used
 
-    if student_majors:
-        sids = [sid for sid,maj in student_majors.items() if maj==major_name]
-        if not sids:
-            print(f"警告: 未在成绩表中找到专业“{major_name}”的学生，改为处理全部学生")
-            sids = list(student_scores.keys())
-    else:
-        print("警告: 成绩表缺少专业列，改为处理全部学生")
-        sids = list(student_scores.keys())
+# ------------------ main prediction pipeline (unchanged except using the updated function) ------------------
+def missing_courses_table(uni_df: pd.DataFrame)->pd.DataFrame:
+    """
+    Long (SNH, Course_Name, target1_score, target2_score) table, one row per missing
+    course. Built by repeating/flattening the per-student columns instead of a
+    per-course record loop.
+    """
+    miss = uni_df['missing_courses'] if 'missing_courses' in uni_df else pd.Series([[]] * len(uni_df))
+    lens = np.fromiter((len(m) for m in miss), dtype=int, count=len(miss))
+    owner = np.repeat(np.arange(len(miss)), lens)
+    courses = list(itertools.chain.from_iterable(miss))
+
+    def lookup(col):
+        maps = uni_df[col].tolist() if col in uni_df else [{}] * len(miss)
+        return [maps[i].get(c, np.nan) for i, c in zip(owner.tolist(), courses)]
+
+    return pd.DataFrame({
+        'SNH': uni_df['SNH'].to_numpy()[owner],
+        'Course_Name': courses,
+        'target1_score': lookup('target1_scores'),
+        'target2_score': lookup('target2_scores'),
+    })
+
+def build_result_tables(pred_df: pd.DataFrame, uni_df: pd.DataFrame,
+                        with_uniform_inverse:int=1)->Dict[str, pd.DataFrame]:
+    """Result sheets in workbook order: Predictions, UniformThresholds, MissingCoursesScores."""
+    tables = {'Predictions': pred_df}
+    if with_uniform_inverse:
+        tables['UniformThresholds'] = uni_df
+
+        if not uni_df.empty:
+            miss_df = missing_courses_table(uni_df)
+            if len(miss_df):
+                tables['MissingCoursesScores'] = miss_df
+    return tables
+
+# 与 pandas.DataFrame.to_excel 相同的表头样式
+_HEADER_FONT = Font(bold=True)
+_HEADER_BORDER = Border(left=Side(style='thin'), right=Side(style='thin'),
+                        top=Side(style='thin'), bottom=Side(style='thin'))
+_HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='top')
+
+def _excel_value(v):
+    if v is None:
+        return None
+    if isinstance(v, (bool, int, str)):
+        return v
+    if isinstance(v, float):
+        if math.isnan(v):
+            return None
+        return v if math.isfinite(v) else ('inf' if v > 0 else '-inf')
+    if isinstance(v, np.generic):
+        return _excel_value(v.item())
+    if v is pd.NaT or v is pd.NA:
+        return None
+    return str(v)
 
-    print(f"{major_name} 专业将处理 {len(sids)} 名学生")
+def write_result_tables(tables: Dict[str, pd.DataFrame], out_path, chunk_rows:int=5000):
+    """
+    Streaming serialization: openpyxl write-only workbook, rows appended chunk by
+    chunk, so no per-cell objects are kept for the whole sheet as to_excel does.
+    The tables themselves are complete in-memory DataFrames built by the caller;
+    only the workbook serialization is streamed. Reads back identically to
+    DataFrame.to_excel(index=False).
+    """
+    wb = Workbook(write_only=True)
+    for sheet_name, df in tables.items():
+        ws = wb.create_sheet(title=sheet_name)
+        header = []
+        for col in df.columns:
+            cell = WriteOnlyCell(ws, value=_excel_value(col))
+            cell.font, cell.border, cell.alignment = _HEADER_FONT, _HEADER_BORDER, _HEADER_ALIGNMENT
+            header.append(cell)
+        ws.append(header)
+        for start in range(0, len(df), chunk_rows):
+            chunk = df.iloc[start:start + chunk_rows]
+            cols = [[_excel_value(v) for v in chunk.iloc[:, j].tolist()] for j in range(chunk.shape[1])]
+            for row in zip(*cols):
+                ws.append(row)
+    wb.save(out_path)
+
+# Bump when a code change alters per-student results, so incremental runs recompute
+RESULT_STORE_VERSION = 2
+
+_SHARD_CONTEXT = {}
+
+def report_progress(progress: Optional[Callable[[Dict], None]], major_name: str, stage: str,
+                    done: int=0, total: int=0):
+    """
+    Send {'major', 'stage', 'done', 'total'} to a predict_students progress callback.
+    Stages in order: load, inverse, students (done/total students), allocation, write, done.
+    A failing callback is reported and ignored so it cannot abort the prediction.
+    """
+    if progress is None:
+        return
+    try:
+        progress({'major': major_name, 'stage': stage, 'done': int(done), 'total': int(total)})
+    except Exception as e:
+        print(f"警告: 进度回调失败: {e}")
+
+def _predict_shard(sids: List[str], ctx: Dict=None)->Tuple[List[Dict], List[Dict], Dict[str, np.ndarray]]:
+    """
+    Prediction rows and uniform-threshold rows for `sids`, in input order, plus
+    {SNH: probability curve} when ctx['probability_curves'] is set (else {}).
+    """
+    ctx = _SHARD_CONTEXT if ctx is None else ctx
+    grade_matrix = ctx['grade_matrix']
+    student_scores = StudentScoresView(grade_matrix)
+    course_info = ctx['course_info']
+    major_name = ctx['major_name']
+    model, scaler, mparams, feature_cols = ctx['model'], ctx['scaler'], ctx['mparams'], ctx['feature_cols']
+    with_uniform_inverse, batched = ctx['with_uniform_inverse'], ctx['batched']
+    min_grade, max_grade, grade_step = ctx['min_grade'], ctx['max_grade'], ctx['grade_step']
+    verbose = ctx.get('verbose', True)
+    on_student = ctx.get('on_student')
+    with_curves = bool(ctx.get('probability_curves'))
+    aligned = lambda: grade_matrix.aligned(course_info.columns,
+                                          [grade_matrix.row_index[sid] for sid in sids])
+
+    batch_results = {}
+    curves = {}
+    if with_uniform_inverse and batched:
+        if verbose:
+            print("批量逆推: 一次性构建候选特征矩阵")
+        batch_results = uniform_threshold_search_batch(
+            {sid: student_scores.get(sid, {}) for sid in sids}, course_info, major_name,
+            model, scaler, mparams, feature_cols,
+            min_grade=min_grade, max_grade=max_grade, grade_matrix=aligned(),
+            search=ctx['search'], grade_step=grade_step, return_curves=with_curves
+        )
+        if with_curves:
+            batch_results, curves = batch_results
+    elif with_curves:
+        P = uniform_probability_curves(aligned(), grade_grid(min_grade, max_grade, grade_step),
+                                       course_info, major_name, model, scaler, mparams, feature_cols)
+        curves = dict(zip(sids, P))
+
+    mc = None
+    if ctx.get('monte_carlo') and sids:
+        mc = monte_carlo_attainment(aligned(), sids, course_info, major_name, model, scaler, mparams,
+                                    feature_cols, n_samples=ctx['mc_samples'], seed=ctx['mc_seed'],
+                                    time_budget=ctx['mc_time_budget'])
 
     rows=[]
     uni_rows=[]
 
     for i, sid in enumerate(sids):
         # 每10个学生显示一次进度
-        if i % 10 == 0 or i == len(sids) - 1:
+        if verbose and (i % 10 == 0 or i == len(sids) - 1):
             print(f"  进度: {i+1}/{len(sids)} 名学生")
         
         stu_courses = student_scores.get(sid, {})
@@ -503,17 +1751,17 @@ def predict_students(scores_file: str, course_file: str, major_name: str, out_pa
         if hasattr(scaler, 'feature_names_in_'):
             X.columns = scaler.feature_names_in_
 
-        Xs = scaler.transform(X.values)
-        proba = model.predict_proba(Xs)
-        proba = postprocess_proba(proba, mparams)
+        proba = predict_proba_batch(X.values, model, scaler, mparams)
         pred = int(np.argmax(proba, axis=1)[0])+1
 
         uni_result = {}
-        if with_uniform_inverse:
+        if with_uniform_inverse and batched:
+            uni_result = batch_results[sid]
+        elif with_uniform_inverse:
             uni_result = uniform_threshold_search(
                 stu_courses, course_info, major_name,
                 model, scaler, mparams, feature_cols,
-                min_grade=min_grade, max_grade=max_grade
+                min_grade=min_grade, max_grade=max_grade, grade_step=grade_step
             )
 
         # 获取预测概率
@@ -554,11 +1802,147 @@ def predict_students(scores_file: str, course_file: str, major_name: str, out_pa
             'current_prob3': current_prob3,
             'target1_min_required_score': uni_result.get('s_min_for_1', np.nan),
             'target2_min_required_score': uni_result.get('s_min_for_2', np.nan),
+            # 可选：按学生自身成绩分布抽样未修课程成绩，达到各去向的概率
+            **({'mc_attain_prob1': float(mc[0][i][0]), 'mc_attain_prob2': float(mc[0][i][1]),
+                'mc_samples': int(mc[1][i])} if mc is not None else {}),
             **course_scores  # 添加所有课程的分数
         })
 
         if with_uniform_inverse:
             uni_rows.append({'SNH': sid, 'Major': major_name, **uni_result})
+        if on_student is not None:
+            on_student(i + 1)
+
+    return rows, uni_rows, curves
+
+def _predict_shard_worker(sids: List[str])->Tuple[List[Dict], List[Dict], Dict[str, np.ndarray]]:
+    # 子进程经 fork 继承 _SHARD_CONTEXT（模型、培养方案、成绩矩阵），写时复制共享
+    return _predict_shard(sids)
+
+def predict_students(scores_file, course_file: str, major_name: str, out_path: str,
+                     model_dir: str, with_uniform_inverse:int=1,
+                     min_grade:int=60, max_grade:int=90, batched:int=1,
+                     search:str='grid', grade_step:float=1, workers:int=1,
+                     return_tables:bool=False, probability_curves:int=0,
+                     result_store=None, cohort: str='',
+                     allocation:int=0, allocation_time_budget:float=5.0,
+                     monte_carlo:int=0, mc_samples:int=2000, mc_seed:int=0,
+                     mc_time_budget:float=1.0, progress: Callable[[Dict], None]=None):
+    """
+    out_path=None skips the Excel export. With return_tables=True the result
+    sheets are also returned in memory as a third value, {sheet_name: DataFrame}.
+    probability_curves=1 adds a ProbabilityCurves sheet: the post-processed class
+    probabilities of every student at each uniform score on the search grid, so a
+    slider over the uniform score is a table lookup instead of a model call.
+    result_store (result_store.ResultStore) makes the run incremental: students whose
+    grades and prediction settings hash the same as in the store for
+    (cohort, major, model version, plan hash) are merged from it, only the rest are
+    recomputed and written back.
+    allocation=1 adds an OptimalAllocation sheet from credit_allocation_search: the
+    cheapest credit-weighted per-course plan for targets 1 and 2, searched for at
+    most allocation_time_budget seconds.
+    monte_carlo=1 adds mc_attain_prob1/mc_attain_prob2/mc_samples to Predictions
+    (monte_carlo_attainment: up to mc_samples draws per student, seeded by mc_seed,
+    at most mc_time_budget seconds per student).
+    progress, if given, is called with stage events (see report_progress); in the
+    students stage `done` counts reused students too, and with workers>1 it advances
+    per completed shard.
+    """
+    if monte_carlo and int(mc_samples) < 1:
+        raise ValueError(f"蒙特卡洛采样次数必须至少为 1: {mc_samples}")
+    print(f"\n=== predict_students 开始 ===")
+    print(f"scores_file={scores_file}")
+    print(f"course_file={course_file}")
+    print(f"major_name={major_name}")
+    print(f"out_path={out_path}")
+    print(f"model_dir={model_dir}")
+    report_progress(progress, major_name, 'load')
+
+    model, scaler, feature_cols, mparams = get_artifacts(model_dir)
+    course_info = load_course_catalog(course_file)
+    grade_matrix = as_student_grade_matrix(scores_file)
+    student_scores = StudentScoresView(grade_matrix)
+    student_majors = grade_matrix.majors_by_snh()
+
+    if student_majors:
+        sids = [sid for sid,maj in student_majors.items() if maj==major_name]
+        if not sids:
+            print(f"警告: 未在成绩表中找到专业“{major_name}”的学生，改为处理全部学生")
+            sids = list(student_scores.keys())
+    else:
+        print("警告: 成绩表缺少专业列，改为处理全部学生")
+        sids = list(student_scores.keys())
+
+    print(f"{major_name} 专业将处理 {len(sids)} 名学生")
+
+    all_sids, stored = sids, {}
+    if result_store is not None:
+        model_version = MODEL_REGISTRY.version(model_dir)
+        plan_hash = plan_fingerprint(course_file)
+        # 影响结果的参数一并计入输入哈希，参数变化时不会复用旧结果
+        salt = repr((RESULT_STORE_VERSION, int(with_uniform_inverse), min_grade, max_grade, grade_step,
+                     int(bool(probability_curves)), INFERENCE_CACHE and INFERENCE_CACHE.decimals,
+                     (mc_samples, mc_seed, mc_time_budget) if monte_carlo else None))
+        input_hash = {sid: grade_matrix.input_digest(grade_matrix.row_index[sid], salt) for sid in sids}
+        previous = result_store.fetch(cohort, major_name, model_version, plan_hash)
+        stored = {sid: previous[sid][1] for sid in sids
+                  if sid in previous and previous[sid][0] == input_hash[sid]}
+        sids = [sid for sid in sids if sid not in stored]
+        print(f"增量预测: 复用结果库中 {len(stored)} 名学生, 重新计算 {len(sids)} 名学生")
+
+    ctx = {
+        'grade_matrix': grade_matrix, 'course_info': course_info, 'major_name': major_name,
+        'model': model, 'scaler': scaler, 'mparams': mparams, 'feature_cols': feature_cols,
+        'with_uniform_inverse': with_uniform_inverse, 'batched': batched, 'search': search,
+        'min_grade': min_grade, 'max_grade': max_grade, 'grade_step': grade_step,
+        'probability_curves': probability_curves,
+        'monte_carlo': monte_carlo, 'mc_samples': mc_samples, 'mc_seed': mc_seed,
+        'mc_time_budget': mc_time_budget,
+    }
+    total = len(all_sids)
+    report_progress(progress, major_name, 'inverse', len(stored), total)
+    workers = max(1, min(int(workers or 1), len(sids)))
+    if workers > 1 and 'fork' not in mp.get_all_start_methods():
+        print("警告: 当前平台不支持fork，workers参数无效，改为单进程处理")
+        workers = 1
+
+    if workers > 1:
+        # 按学生切分为连续分片，按原顺序合并，结果与单进程完全一致
+        # 需要报告进度时切得更细，每完成一个分片报告一次
+        n_shards = min(len(sids), workers*4) if progress is not None else workers
+        shards = [list(x) for x in np.array_split(np.array(sids, dtype=object), n_shards) if len(x)]
+        print(f"多进程处理: {workers} 个进程, 分片大小 {[len(x) for x in shards]}")
+        _SHARD_CONTEXT.clear()
+        _SHARD_CONTEXT.update(ctx, verbose=False)
+        try:
+            with mp.get_context('fork').Pool(workers) as pool:
+                parts, done = [], len(stored)
+                for part in pool.imap(_predict_shard_worker, shards):
+                    parts.append(part)
+                    done += len(part[0])
+                    report_progress(progress, major_name, 'students', done, total)
+        finally:
+            _SHARD_CONTEXT.clear()
+        rows = [r for part in parts for r in part[0]]
+        uni_rows = [r for part in parts for r in part[1]]
+        curves = {sid: c for part in parts for sid, c in part[2].items()}
+    elif sids:
+        if progress is not None:
+            ctx['on_student'] = lambda k: report_progress(progress, major_name, 'students', len(stored) + k, total)
+        rows, uni_rows, curves = _predict_shard(sids, ctx)
+    else:
+        rows, uni_rows, curves = [], [], {}
+
+    if result_store is not None:
+        computed = {row['SNH']: (row, uni_rows[i] if with_uniform_inverse else None, curves.get(row['SNH']))
+                    for i, row in enumerate(rows)}
+        result_store.save(cohort, major_name, model_version, plan_hash,
+                          [(sid, input_hash[sid], payload) for sid, payload in computed.items()])
+        # 按原学生顺序合并新结果与复用结果
+        merged = [computed[sid] if sid in computed else stored[sid] for sid in all_sids]
+        rows = [m[0] for m in merged]
+        uni_rows = [m[1] for m in merged if m[1] is not None]
+        curves = {m[0]['SNH']: m[2] for m in merged if m[2] is not None}
 
     pred_df = pd.DataFrame(rows)
     uni_df  = pd.DataFrame(uni_rows) if with_uniform_inverse else pd.DataFrame()
@@ -599,32 +1983,69 @@ def predict_students(scores_file: str, course_file: str, major_name: str, out_pa
     else:
         print("所有学生的目标一分数都 >= 目标二分数，一致性检查通过！")
 
-    print(f"\n保存结果到: {out_path}")
-    with pd.ExcelWriter(out_path, engine='openpyxl') as w:
-        pred_df.to_excel(w, index=False, sheet_name='Predictions')
-        if with_uniform_inverse:
-            uni_df.to_excel(w, index=False, sheet_name='UniformThresholds')
-
-            if not uni_df.empty:
-                recs=[]
-                for r in uni_rows:
-                    sid = r['SNH']
-                    miss = r.get('missing_courses', [])
-                    t1   = r.get('target1_scores', {})
-                    t2   = r.get('target2_scores', {})
-                    for c in miss:
-                        recs.append({
-                            'SNH': sid,
-                            'Course_Name': c,
-                            'target1_score': t1.get(c, np.nan),
-                            'target2_score': t2.get(c, np.nan)
-                        })
-                if recs:
-                    pd.DataFrame(recs).to_excel(w, index=False, sheet_name='MissingCoursesScores')
-
+    tables = build_result_tables(pred_df, uni_df, with_uniform_inverse)
+    if probability_curves:
+        tables['ProbabilityCurves'] = probability_curves_table(
+            curves, grade_grid(min_grade, max_grade, grade_step))
+    if allocation:
+        report_progress(progress, major_name, 'allocation', total, total)
+        G = grade_matrix.aligned(course_info.columns, [grade_matrix.row_index[sid] for sid in all_sids])
+        alloc = credit_allocation_search(G, course_info, major_name, model, scaler, mparams, feature_cols,
+                                         min_grade=min_grade, max_grade=max_grade, grade_step=grade_step,
+                                         time_budget=allocation_time_budget)
+        tables['OptimalAllocation'] = allocation_table(all_sids, major_name, alloc)
+    if out_path:
+        report_progress(progress, major_name, 'write', total, total)
+        print(f"\n保存结果到: {out_path}")
+        write_result_tables(tables, out_path)
+
+    if INFERENCE_CACHE is not None:
+        info = INFERENCE_CACHE.info()
+        print(f"推理缓存: 命中 {info['hits']}, 未命中 {info['misses']}, "
+              f"命中率 {info['hit_rate']:.1%}, 条目 {info['size']}/{info['maxsize']}")
     print(f"{major_name} 专业处理完成")
+    report_progress(progress, major_name, 'done', total, total)
+    if return_tables:
+        return pred_df, uni_df, tables
     return pred_df, uni_df
 
+def predict_majors(scores_file, majors: Dict[str, str], out_paths: Dict[str, str],
+                   model_dir: str, **kwargs)->Dict[str, Tuple[pd.DataFrame, pd.DataFrame]]:
+    """
+    Multi-major driver: parse the scores workbook and load the model once, then run
+    predict_students for every {major_name: course_file} against the shared data.
+    Failed majors are reported and skipped; returns {major_name: (pred_df, uni_df)}.
+    A `progress` callback in kwargs receives predict_students events extended with
+    major_index/major_total.
+    """
+    progress = kwargs.pop('progress', None)
+    grade_matrix = as_student_grade_matrix(scores_file)
+    get_artifacts(model_dir)
+    print(f"成绩数据已加载一次，供 {len(majors)} 个专业共享: {grade_matrix!r}")
+
+    results = {}
+    for k, (maj, cfile) in enumerate(majors.items()):
+        major_progress = None
+        if progress is not None:
+            major_progress = lambda ev, k=k: progress({**ev, 'major_index': k, 'major_total': len(majors)})
+        try:
+            results[maj] = predict_students(
+                scores_file=grade_matrix, course_file=cfile, major_name=maj,
+                out_path=out_paths[maj], model_dir=model_dir, progress=major_progress, **kwargs
+            )
+        except Exception as e:
+            print(f"专业 {maj} 处理失败: {e}")
+            import traceback; traceback.print_exc()
+    return results
+
+def positive_int(value: str) -> int:
+    """argparse type: an integer >= 1."""
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return n
+
+
 def main():
     print("=== Optimization_model_func3_1.py 开始执行 ===")
     ap = argparse.ArgumentParser()
@@ -636,7 +2057,27 @@ def main():
     ap.add_argument("--with_uniform_inverse", type=int, default=1)
     ap.add_argument("--min_grade", type=int, default=60)
     ap.add_argument("--max_grade", type=int, default=90)
+    ap.add_argument("--batched", type=int, default=1, help="1=cohort-wide batched inverse search, 0=per-student")
+    ap.add_argument("--search", choices=['grid', 'breakpoints'], default='grid',
+                    help="batched inverse search: score every grid point or once per CatBoost decision segment")
+    ap.add_argument("--grade_step", type=float, default=1, help="uniform score resolution, e.g. 0.1")
+    ap.add_argument("--workers", type=int, default=1, help="number of processes to shard students across")
+    ap.add_argument("--probability_curves", type=int, default=0,
+                    help="1=also export per-student class probabilities at every grid score")
+    ap.add_argument("--inference_cache", type=int, default=None,
+                    help="LRU size of the quantized-feature inference cache, 0=off (env BUTP_INFERENCE_CACHE_SIZE)")
+    ap.add_argument("--cache_decimals", type=int, default=6, help="feature rounding of the inference cache key")
+    ap.add_argument("--allocation", type=int, default=0,
+                    help="1=also search the cheapest credit-weighted per-course plan per target")
+    ap.add_argument("--allocation_time_budget", type=float, default=5.0, help="seconds for the allocation search")
+    ap.add_argument("--monte_carlo", type=int, default=0,
+                    help="1=add Monte Carlo attainment probabilities over the missing-course grades")
+    ap.add_argument("--mc_samples", type=positive_int, default=2000, help="draws per student")
+    ap.add_argument("--mc_seed", type=int, default=0)
+    ap.add_argument("--mc_time_budget", type=float, default=1.0, help="seconds per student")
     args = ap.parse_args()
+    if args.inference_cache is not None:
+        configure_inference_cache(args.inference_cache, args.cache_decimals)
 
     predict_students(
         scores_file=args.scores,
@@ -646,7 +2087,18 @@ def main():
         model_dir=args.model_dir,
         with_uniform_inverse=args.with_uniform_inverse,
         min_grade=args.min_grade,
-        max_grade=args.max_grade
+        max_grade=args.max_grade,
+        batched=args.batched,
+        search=args.search,
+        grade_step=args.grade_step,
+        workers=args.workers,
+        probability_curves=args.probability_curves,
+        allocation=args.allocation,
+        allocation_time_budget=args.allocation_time_budget,
+        monte_carlo=args.monte_carlo,
+        mc_samples=args.mc_samples,
+        mc_seed=args.mc_seed,
+        mc_time_budget=args.mc_time_budget
     )
 
 if __name__ == "__main__":
@@ -5,7 +5,7 @@
 提供与Next.js兼容的预测接口
 """
 
-import os, sys, json, tempfile, subprocess
+import os, sys, json, shutil, tempfile, subprocess
 from flask import Flask, request, jsonify
 import pandas as pd
 
@@ -32,6 +32,8 @@ def predict():
         with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
             scores_file.save(tmp_file.name)
             temp_scores_path = tmp_file.name
+        # 每个请求独立的输出目录，并发请求不会互相覆盖结果文件
+        out_dir = tempfile.mkdtemp(prefix='prediction_')
         
         try:
             # 构建命令
@@ -39,7 +41,9 @@ def predict():
             cmd = [
                 sys.executable, script_path,
                 '--year', str(year),
-                '--scores_file', temp_scores_path
+                '--scores_file', temp_scores_path,
+                '--out_dir', out_dir,
+                '--task_id', os.path.basename(out_dir)
             ]
             
             if major:
@@ -66,7 +70,6 @@ def predict():
                 }), 500
             
             # 构建返回结果
-            base_dir = os.path.dirname(__file__)
             results = []
             
             # 查找生成的文件
@@ -79,7 +82,7 @@ def predict():
                     "电子信息工程": "ee"
                 }
                 code = major_codes.get(major, 'unknown')
-                pred_file = os.path.join(base_dir, f"Cohort{year}_Predictions_{code}.xlsx")
+                pred_file = os.path.join(out_dir, f"Cohort{year}_Predictions_{code}.xlsx")
                 
                 if os.path.exists(pred_file):
                     try:
@@ -115,7 +118,7 @@ def predict():
                 
                 for major_name in majors:
                     code = major_codes[major_name]
-                    pred_file = os.path.join(base_dir, f"Cohort{year}_Predictions_{code}.xlsx")
+                    pred_file = os.path.join(out_dir, f"Cohort{year}_Predictions_{code}.xlsx")
                     
                     if os.path.exists(pred_file):
                         try:
@@ -156,6 +159,7 @@ def predict():
                 os.unlink(temp_scores_path)
             except:
                 pass
+            shutil.rmtree(out_dir, ignore_errors=True)
                 
     except Exception as e:
         return jsonify({
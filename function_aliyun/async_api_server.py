@@ -8,8 +8,8 @@
 import os
 import sys
 import json
+import sqlite3
 import tempfile
-import subprocess
 import traceback
 import threading
 import time
@@ -18,135 +18,289 @@ from datetime import datetime
 import argparse
 import shutil
 from pathlib import Path
+from contextlib import contextmanager
 
 # 导入依赖，如果缺少则提示
 try:
-    from flask import Flask, request, jsonify, send_file
+    from flask import Flask, request, jsonify, send_file, Response, stream_with_context
     import pandas as pd
 except ImportError as e:
     print(f"缺少依赖包: {e}")
     print("请运行: pip install flask pandas openpyxl")
     sys.exit(1)
 
+from worker_pool import PredictionWorkerPool
+
 app = Flask(__name__)
 
+# 配置
+class Config:
+    def __init__(self):
+        self.base_dir = os.path.dirname(os.path.abspath(__file__))
+        self.upload_dir = os.path.join(self.base_dir, 'uploads')
+        self.result_dir = os.path.join(self.base_dir, 'results')
+        self.task_db = os.environ.get('BUTP_TASK_DB', os.path.join(self.base_dir, 'tasks.sqlite'))
+        
+        # 确保目录存在
+        os.makedirs(self.upload_dir, exist_ok=True)
+        os.makedirs(self.result_dir, exist_ok=True)
+
+config = Config()
+
+class TaskWatch:
+    """单个任务的更新计数与条件变量，其他任务的更新不会唤醒等待者"""
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.version = 0
+        self.refs = 0
+
+    def notify(self):
+        with self.cond:
+            self.version += 1
+            self.cond.notify_all()
+
+    def wait(self, since, timeout):
+        """等待 version 超过 since；返回当前 version"""
+        with self.cond:
+            self.cond.wait_for(lambda: self.version > since, timeout)
+            return self.version
+
 # 全局任务管理
 class TaskManager:
-    def __init__(self):
-        self.tasks = {}  # taskId -> TaskInfo
+    """
+    任务状态持久化在 SQLite (WAL) 中，服务重启不丢失：
+    - 按 id 主键、按 (status, created_at) 索引查询，列表接口分页
+    - max_active 限制排队+运行中的任务数，超过时拒绝新任务
+    - purge_expired 删除超过保留期的已结束任务及其上传文件和结果文件
+    - interrupted_tasks 返回上次退出时仍在排队/运行的任务，供启动时恢复
+    - 每次更新递增该任务的 version 并只唤醒等待该任务的 watch，供 SSE 推送
+    """
+    ACTIVE = ('pending', 'running')
+    FIELDS = ['id', 'status', 'created_at', 'updated_at', 'file_path', 'year',
+              'progress', 'message', 'result_files', 'error']
+
+    def __init__(self, db_path, max_active=100):
+        self.db_path = os.path.abspath(db_path)
+        self.max_active = max_active
         self.lock = threading.Lock()
-    
+        self._watch_lock = threading.Lock()
+        self._watches = {}  # task_id -> TaskWatch，仅在有 SSE 客户端等待时存在
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS tasks (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,  -- pending, running, completed, failed
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                file_path TEXT,
+                year TEXT,
+                progress INTEGER NOT NULL DEFAULT 0,
+                message TEXT,
+                result_files TEXT NOT NULL DEFAULT '[]',
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, created_at);
+            CREATE INDEX IF NOT EXISTS idx_tasks_created ON tasks (created_at);
+        ''')
+        self.conn.commit()
+
+    def _row(self, row):
+        if row is None:
+            return None
+        task = dict(zip(self.FIELDS, row))
+        task['result_files'] = json.loads(task['result_files'])
+        return task
+
     def create_task(self, file_path, year):
+        """新建排队任务；排队+运行中的任务已达 max_active 时返回 None"""
         task_id = str(uuid.uuid4())
-        task_info = {
-            'id': task_id,
-            'status': 'pending',  # pending, running, completed, failed
-            'created_at': datetime.now().isoformat(),
-            'file_path': file_path,
-            'year': year,
-            'progress': 0,
-            'message': '任务已创建',
-            'result_files': [],
-            'error': None
-        }
-        
+        now = datetime.now().isoformat()
         with self.lock:
-            self.tasks[task_id] = task_info
-            
+            active = self.conn.execute(
+                'SELECT COUNT(*) FROM tasks WHERE status IN (?, ?)', self.ACTIVE).fetchone()[0]
+            if self.max_active and active >= self.max_active:
+                return None
+            self.conn.execute(
+                'INSERT INTO tasks (id, status, created_at, updated_at, file_path, year, progress, message) '
+                'VALUES (?, ?, ?, ?, ?, ?, 0, ?)',
+                (task_id, 'pending', now, now, file_path, year, '任务已创建'))
+            self.conn.commit()
         return task_id
     
     def update_task(self, task_id, status=None, progress=None, message=None, result_files=None, error=None):
+        sets, values = ['updated_at=?'], [datetime.now().isoformat()]
+        if status: sets.append('status=?'); values.append(status)
+        if progress is not None: sets.append('progress=?'); values.append(progress)
+        if message: sets.append('message=?'); values.append(message)
+        if result_files: sets.append('result_files=?'); values.append(json.dumps(result_files, ensure_ascii=False))
+        if error: sets.append('error=?'); values.append(error)
         with self.lock:
-            if task_id in self.tasks:
-                task = self.tasks[task_id]
-                if status: task['status'] = status
-                if progress is not None: task['progress'] = progress
-                if message: task['message'] = message
-                if result_files: task['result_files'] = result_files
-                if error: task['error'] = error
-                task['updated_at'] = datetime.now().isoformat()
+            self.conn.execute(f"UPDATE tasks SET {', '.join(sets)} WHERE id=?", values + [task_id])
+            self.conn.commit()
+        with self._watch_lock:
+            watch = self._watches.get(task_id)
+        if watch is not None:
+            watch.notify()
+
+    @contextmanager
+    def watch(self, task_id):
+        """在 with 块内跟踪单个任务的更新，多个客户端共享同一个 TaskWatch"""
+        with self._watch_lock:
+            watch = self._watches.setdefault(task_id, TaskWatch())
+            watch.refs += 1
+        try:
+            yield watch
+        finally:
+            with self._watch_lock:
+                watch.refs -= 1
+                if not watch.refs:
+                    del self._watches[task_id]
     
     def get_task(self, task_id):
         with self.lock:
-            return self.tasks.get(task_id, None)
+            row = self.conn.execute(
+                f"SELECT {', '.join(self.FIELDS)} FROM tasks WHERE id=?", (task_id,)).fetchone()
+        return self._row(row)
     
-    def list_tasks(self):
+    def list_tasks(self, status=None, limit=50, offset=0):
+        """(按创建时间倒序的一页任务, 总数)"""
+        where, args = ('WHERE status=?', [status]) if status else ('', [])
         with self.lock:
-            return list(self.tasks.values())
+            total = self.conn.execute(f'SELECT COUNT(*) FROM tasks {where}', args).fetchone()[0]
+            rows = self.conn.execute(
+                f"SELECT {', '.join(self.FIELDS)} FROM tasks {where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                args + [int(limit), int(offset)]).fetchall()
+        return [self._row(r) for r in rows], total
 
-# 全局任务管理器
-task_manager = TaskManager()
+    def count_by_status(self):
+        with self.lock:
+            rows = self.conn.execute('SELECT status, COUNT(*) FROM tasks GROUP BY status').fetchall()
+        return dict(rows)
 
-# 配置
-class Config:
-    def __init__(self):
-        self.base_dir = os.path.dirname(os.path.abspath(__file__))
-        self.upload_dir = os.path.join(self.base_dir, 'uploads')
-        self.result_dir = os.path.join(self.base_dir, 'results')
-        
-        # 确保目录存在
-        os.makedirs(self.upload_dir, exist_ok=True)
-        os.makedirs(self.result_dir, exist_ok=True)
+    def interrupted_tasks(self):
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {', '.join(self.FIELDS)} FROM tasks WHERE status IN (?, ?) ORDER BY created_at",
+                self.ACTIVE).fetchall()
+        return [self._row(r) for r in rows]
 
-config = Config()
+    def purge_expired(self, ttl_seconds, result_dir):
+        """删除 updated_at 早于保留期的已结束任务，连同上传文件与结果文件；返回删除的任务数"""
+        cutoff = datetime.fromtimestamp(time.time() - ttl_seconds).isoformat()
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {', '.join(self.FIELDS)} FROM tasks WHERE status NOT IN (?, ?) AND updated_at < ?",
+                self.ACTIVE + (cutoff,)).fetchall()
+        tasks = [self._row(r) for r in rows]
+        for task in tasks:
+            paths = [task['file_path']] + [os.path.join(result_dir, f) for f in task['result_files']]
+            for path in paths:
+                if path and os.path.exists(path):
+                    try:
+                        os.remove(path)
+                    except OSError as e:
+                        print(f"⚠️ 删除过期文件失败: {path}: {e}")
+            shutil.rmtree(os.path.join(result_dir, task['id']), ignore_errors=True)
+        if tasks:
+            with self.lock:
+                self.conn.executemany('DELETE FROM tasks WHERE id=?', [(t['id'],) for t in tasks])
+                self.conn.commit()
+        return len(tasks)
+
+# 全局任务管理器：首次使用时按 config.task_db 打开；__main__ 中按 --task_db 创建，
+# 导入本模块不会创建默认的任务状态库
+task_manager = None
+
+def get_task_manager():
+    global task_manager
+    if task_manager is None:
+        task_manager = TaskManager(config.task_db)
+    return task_manager
 
-def run_prediction_task(task_id, file_path, year):
-    """后台运行预测任务"""
+# 常驻预测进程池（模型与培养方案在工作进程中预加载），启动时按命令行参数创建
+worker_pool = None
+
+def get_worker_pool():
+    global worker_pool
+    if worker_pool is None:
+        worker_pool = PredictionWorkerPool(base_dir=config.base_dir).start()
+    return worker_pool
+
+def task_work_dir(task_id):
+    return os.path.join(config.result_dir, task_id)
+
+def submit_prediction_task(task_id, file_path, year):
+    """预测任务进入进程池队列，由空闲的工作进程执行"""
+    # 每个任务在 results/<task_id>/ 下独立输出，同一年级的任务可以并发执行
+    argv = ['--scores_file', file_path, '--year', year,
+            '--out_dir', task_work_dir(task_id), '--task_id', task_id]
+    print(f"📋 任务 {task_id} 进入队列: run_prediction_direct.py {' '.join(argv)}")
+    get_task_manager().update_task(task_id, message='排队等待空闲工作进程...')
+    get_worker_pool().submit(
+        task_id, argv,
+        on_start=lambda tid: get_task_manager().update_task(tid, status='running', progress=10, message='执行预测算法...'),
+        on_done=lambda tid, result: finish_prediction_task(tid, year, result),
+        on_progress=report_task_progress
+    )
+
+# predict_students 各阶段在单个专业内的进度位置
+STAGE_FRACTION = {'load': 0.0, 'inverse': 0.05, 'students': 0.1, 'allocation': 0.9, 'write': 0.95, 'done': 1.0}
+STAGE_LABELS = {'load': '加载数据', 'inverse': '逆推搜索', 'students': '预测学生',
+                'allocation': '搜索分配方案', 'write': '写出结果', 'done': '完成'}
+
+def report_task_progress(task_id, event):
+    """工作进程的进度事件 -> 任务进度 10%~70%（其后为整理结果文件）；百分比或阶段变化时才写库"""
+    stage = event.get('stage')
+    frac = STAGE_FRACTION.get(stage, 0.0)
+    if stage == 'students' and event.get('total'):
+        frac += 0.8 * event['done'] / event['total']
+    overall = (event.get('major_index', 0) + frac) / max(event.get('major_total', 1), 1)
+    progress = 10 + int(60 * overall)
+    message = f"{event.get('major', '')}: {STAGE_LABELS.get(stage, stage)}"
+    if event.get('total'):
+        message += f" {event['done']}/{event['total']}"
+    task = get_task_manager().get_task(task_id)
+    if task and (task['progress'] != progress or stage != 'students'):
+        get_task_manager().update_task(task_id, progress=progress, message=message)
+
+def finish_prediction_task(task_id, year, result):
+    """工作进程执行完成后整理预测结果"""
     try:
-        print(f"🚀 开始执行任务 {task_id}: {file_path}, {year}年级")
-        
-        # 更新状态为运行中
-        task_manager.update_task(task_id, status='running', progress=10, message='开始预测...')
-        
-        # 构建命令
-        cmd = [
-            'python3', 
-            os.path.join(config.base_dir, 'run_prediction_direct.py'),
-            '--scores_file', file_path,
-            '--year', year
-        ]
-        
-        print(f"📋 执行命令: {' '.join(cmd)}")
-        
-        # 执行预测算法
-        task_manager.update_task(task_id, progress=30, message='执行预测算法...')
-        
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            cwd=config.base_dir,
-            timeout=1800  # 30分钟超时
-        )
-        
-        if result.returncode != 0:
-            error_msg = f"预测算法执行失败: {result.stderr}"
+        if result['error'] or result['returncode'] != 0:
+            error_msg = f"预测算法执行失败: {result['error'] or 'returncode=%s' % result['returncode']}"
             print(f"❌ {error_msg}")
-            task_manager.update_task(task_id, status='failed', error=error_msg)
+            get_task_manager().update_task(task_id, status='failed', error=error_msg)
             return
             
-        task_manager.update_task(task_id, progress=70, message='算法执行完成，处理结果...')
+        print(f"🚀 任务 {task_id} 算法执行完成 (pid={result['pid']}, {result['elapsed']:.1f}s)")
+        get_task_manager().update_task(task_id, progress=70, message='算法执行完成，处理结果...')
         
-        # 查找生成的结果文件
+        # 查找本任务输出目录中的结果文件
+        work_dir = task_work_dir(task_id)
         result_files = []
-        for file in os.listdir(config.base_dir):
+        for file in sorted(os.listdir(work_dir)):
             if file.startswith(f'Cohort{year}_Predictions_') and file.endswith('.xlsx'):
                 # 将文件移动到结果目录
-                src_path = os.path.join(config.base_dir, file)
+                src_path = os.path.join(work_dir, file)
                 dst_path = os.path.join(config.result_dir, f"{task_id}_{file}")
                 shutil.move(src_path, dst_path)
                 result_files.append(f"{task_id}_{file}")
                 
-        task_manager.update_task(task_id, progress=90, message='整理结果文件...')
+        get_task_manager().update_task(task_id, progress=90, message='整理结果文件...')
+        if result_files:
+            # 失败任务保留输出目录（含预测日志）便于排查，由过期清理删除
+            shutil.rmtree(work_dir, ignore_errors=True)
         
         if not result_files:
             error_msg = "未找到预测结果文件"
             print(f"❌ {error_msg}")
-            task_manager.update_task(task_id, status='failed', error=error_msg)
+            get_task_manager().update_task(task_id, status='failed', error=error_msg)
             return
             
         # 任务完成
-        task_manager.update_task(
+        get_task_manager().update_task(
             task_id, 
             status='completed', 
             progress=100, 
@@ -160,7 +314,7 @@ def run_prediction_task(task_id, file_path, year):
         error_msg = f"任务执行异常: {str(e)}"
         print(f"❌ {error_msg}")
         print(traceback.format_exc())
-        task_manager.update_task(task_id, status='failed', error=error_msg)
+        get_task_manager().update_task(task_id, status='failed', error=error_msg)
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -168,7 +322,9 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'service': '异步预测API',
-        'timestamp': datetime.now().isoformat()
+        'timestamp': datetime.now().isoformat(),
+        'worker_pool': worker_pool.info() if worker_pool else None,
+        'tasks': get_task_manager().count_by_status()
     })
 
 @app.route('/api/majors', methods=['GET'])
@@ -213,15 +369,13 @@ def start_prediction_task():
         print(f"📁 文件已保存: {file_path}")
         
         # 创建任务
-        task_id = task_manager.create_task(file_path, year)
+        task_id = get_task_manager().create_task(file_path, year)
+        if task_id is None:
+            os.remove(file_path)
+            return jsonify({'success': False, 'error': '排队任务过多，请稍后重试'}), 429
         
-        # 启动后台线程执行预测
-        thread = threading.Thread(
-            target=run_prediction_task, 
-            args=(task_id, file_path, year),
-            daemon=True
-        )
-        thread.start()
+        # 交给常驻进程池执行预测
+        submit_prediction_task(task_id, file_path, year)
         
         return jsonify({
             'success': True,
@@ -238,7 +392,7 @@ def start_prediction_task():
 @app.route('/api/task/status/<task_id>', methods=['GET'])
 def get_task_status(task_id):
     """查询任务状态"""
-    task = task_manager.get_task(task_id)
+    task = get_task_manager().get_task(task_id)
     
     if not task:
         return jsonify({'success': False, 'error': '任务不存在'}), 404
@@ -248,10 +402,46 @@ def get_task_status(task_id):
         'data': task
     })
 
+@app.route('/api/task/events/<task_id>', methods=['GET'])
+def task_events(task_id):
+    """
+    任务进度的 Server-Sent Events 流，代替轮询 /api/task/status/<id>：
+    状态/进度/消息变化时发送 event: progress（data 与 status 接口的 data 相同），
+    任务结束时发送 event: end 并关闭；空闲时每 15 秒发送注释行保活
+    """
+    if not get_task_manager().get_task(task_id):
+        return jsonify({'success': False, 'error': '任务不存在'}), 404
+
+    manager = get_task_manager()
+
+    def stream():
+        # 先注册 watch 再读取状态，读取与等待之间的更新不会丢失
+        with manager.watch(task_id) as watch:
+            last, version = None, watch.version
+            while True:
+                task = manager.get_task(task_id)
+                if task is None:
+                    yield "event: end\ndata: {}\n\n"
+                    return
+                state = (task['status'], task['progress'], task['message'])
+                if state != last:
+                    last = state
+                    yield f"event: progress\ndata: {json.dumps(task, ensure_ascii=False)}\n\n"
+                if task['status'] in ('completed', 'failed'):
+                    yield f"event: end\ndata: {json.dumps({'status': task['status']})}\n\n"
+                    return
+                new_version = watch.wait(version, 15)
+                if new_version == version:
+                    yield ": keep-alive\n\n"
+                version = new_version
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/task/result/<task_id>/<filename>', methods=['GET'])
 def download_result_file(task_id, filename):
     """下载结果文件"""
-    task = task_manager.get_task(task_id)
+    task = get_task_manager().get_task(task_id)
     
     if not task:
         return jsonify({'success': False, 'error': '任务不存在'}), 404
@@ -271,13 +461,17 @@ def download_result_file(task_id, filename):
 
 @app.route('/api/tasks', methods=['GET'])
 def list_all_tasks():
-    """列出所有任务（调试用）"""
-    tasks = task_manager.list_tasks()
+    """分页列出任务（调试用）：?status=&limit=50&offset=0，按创建时间倒序"""
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    tasks, total = get_task_manager().list_tasks(request.args.get('status'), limit, offset)
     return jsonify({
         'success': True,
         'data': {
             'tasks': tasks,
-            'total': len(tasks)
+            'total': total,
+            'limit': limit,
+            'offset': offset
         }
     })
 
@@ -290,6 +484,30 @@ def handle_error(e):
         'error': str(e)
     }), 500
 
+def recover_interrupted_tasks():
+    """启动时恢复上次退出时仍在排队/运行的任务：上传文件仍在则重新排队，否则标记失败"""
+    recovered = 0
+    manager = get_task_manager()
+    for task in manager.interrupted_tasks():
+        if task['file_path'] and os.path.exists(task['file_path']):
+            manager.update_task(task['id'], status='pending', progress=0, message='服务重启，任务已恢复')
+            submit_prediction_task(task['id'], task['file_path'], task['year'])
+            recovered += 1
+        else:
+            manager.update_task(task['id'], status='failed', error='服务重启，上传文件已不存在，任务无法恢复')
+    return recovered
+
+def purge_expired_tasks_loop(ttl_seconds, interval):
+    """定期清理超过保留期的任务记录及其上传/结果文件"""
+    while True:
+        try:
+            n = get_task_manager().purge_expired(ttl_seconds, config.result_dir)
+            if n:
+                print(f"🧹 已清理 {n} 个过期任务")
+        except Exception as e:
+            print(f"❌ 清理过期任务失败: {e}")
+        time.sleep(interval)
+
 def validate_environment():
     """验证运行环境"""
     print("🔍 验证运行环境...")
@@ -297,6 +515,10 @@ def validate_environment():
     # 检查必要文件
     required_files = [
         'run_prediction_direct.py',
+        'worker_pool.py',
+        'Optimization_model_func3_1.py',
+        'catboost_numpy.py',
+        'result_store.py',
         'feature_columns.json',
         'catboost_model.cbm',
         'scaler.pkl'
@@ -320,6 +542,19 @@ if __name__ == '__main__':
     parser.add_argument('--port', type=int, default=8080, help='服务端口')
     parser.add_argument('--host', default='0.0.0.0', help='服务地址')
     parser.add_argument('--debug', action='store_true', help='调试模式')
+    parser.add_argument('--pool_size', type=int, default=int(os.environ.get('BUTP_POOL_SIZE', 2)),
+                        help='常驻预测进程数')
+    parser.add_argument('--task_timeout', type=float, default=1800, help='单个任务超时秒数')
+    parser.add_argument('--max_tasks_per_worker', type=int, default=50,
+                        help='工作进程执行多少个任务后替换')
+    parser.add_argument('--max_worker_rss_mb', type=float, default=2048,
+                        help='工作进程常驻内存超过该值(MB)时替换')
+    parser.add_argument('--task_db', default=config.task_db, help='任务状态库(SQLite)路径')
+    parser.add_argument('--max_active_tasks', type=int, default=100,
+                        help='排队+运行中任务数上限，超过时新任务返回429')
+    parser.add_argument('--task_ttl_hours', type=float, default=72,
+                        help='已结束任务及其文件的保留时长(小时)')
+    parser.add_argument('--purge_interval', type=float, default=3600, help='过期任务清理间隔(秒)')
     
     args = parser.parse_args()
     
@@ -328,15 +563,35 @@ if __name__ == '__main__':
     print(f"📁 上传目录: {config.upload_dir}")
     print(f"📁 结果目录: {config.result_dir}")
     
+    task_manager = TaskManager(args.task_db, max_active=args.max_active_tasks)
+    print(f"🗄️ 任务状态库: {task_manager.db_path}")
+    
     if not validate_environment():
         print("❌ 环境验证失败，程序退出")
         sys.exit(1)
     
+    worker_pool = PredictionWorkerPool(
+        size=args.pool_size,
+        base_dir=config.base_dir,
+        task_timeout=args.task_timeout,
+        max_tasks_per_worker=args.max_tasks_per_worker,
+        max_rss_mb=args.max_worker_rss_mb
+    ).start()
+    print(f"🔧 常驻预测进程池: {args.pool_size} 个工作进程")
+    
+    recovered = recover_interrupted_tasks()
+    if recovered:
+        print(f"♻️ 已恢复 {recovered} 个中断的任务")
+    threading.Thread(target=purge_expired_tasks_loop,
+                     args=(args.task_ttl_hours * 3600, args.purge_interval), daemon=True).start()
+    
     print(f"🌐 服务地址: http://{args.host}:{args.port}")
     print("📋 API端点:")
     print("   POST /api/task/start        - 启动预测任务")
     print("   GET  /api/task/status/<id>  - 查询任务状态")
+    print("   GET  /api/task/events/<id>  - 任务进度事件流 (SSE)")
     print("   GET  /api/task/result/<id>/<file> - 下载结果")
+    print("   GET  /api/tasks            - 分页列出任务")
     print("   GET  /api/majors           - 获取专业列表")
     print("   GET  /health               - 健康检查")
     
@@ -344,5 +599,6 @@ if __name__ == '__main__':
         host=args.host,
         port=args.port,
         debug=args.debug,
-        threaded=True
+        threaded=True,
+        use_reloader=False  # 重载器会再启动一份进程池
     )
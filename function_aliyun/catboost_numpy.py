@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CatBoost 模型的纯 NumPy 推理实现
+
+catboost_model.cbm 一次性导出为数组 (catboost_model.npz)：
+  - 每个分裂节点的特征下标 / 阈值 / 左右子节点
+  - 叶子值、scale_and_bias、各特征的量化边界 (get_borders)
+推理时不再导入 catboost 库：特征先量化为 uint8 bin 下标，再逐棵树对整批样本
+向量化地逐层查找。Task3 模型为 Lossguide 非对称树（不是 oblivious），因此按
+节点数组查找子节点，而不是按深度拼接位掩码得到叶子下标。
+
+用法:
+    python catboost_numpy.py --model_dir Model_Params/Task3_CatBoost_Model
+"""
+
+import os
+import json
+import hashlib
+import argparse
+import tempfile
+import numpy as np
+from typing import Dict, List
+
+NUMPY_MODEL_FILE = 'catboost_model.npz'
+CBM_MODEL_FILE = 'catboost_model.cbm'
+EXPORT_VERSION = 1
+
+def file_sha256(path: str)->str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _flatten_trees(trees: List[Dict]):
+    """JSON 树结构 -> 节点数组；叶子用 ~leaf_index（负数）表示。"""
+    feat, border, left, right, leaves, roots = [], [], [], [], [], []
+    max_depth = 0
+
+    def walk(node, depth):
+        nonlocal max_depth
+        if 'value' in node:
+            leaves.append(node['value'])
+            max_depth = max(max_depth, depth)
+            return ~(len(leaves) - 1)
+        split = node['split']
+        if split.get('split_type', 'FloatFeature') != 'FloatFeature':
+            raise ValueError(f"不支持的分裂类型: {split.get('split_type')}")
+        k = len(feat)
+        feat.append(int(split['float_feature_index']))
+        border.append(float(split['border']))
+        left.append(0); right.append(0)
+        left[k] = walk(node['left'], depth + 1)
+        right[k] = walk(node['right'], depth + 1)
+        return k
+
+    for t in trees:
+        roots.append(walk(t, 0))
+    return {
+        'split_feature': np.asarray(feat, dtype=np.int32),
+        'split_border': np.asarray(border, dtype=np.float32),
+        'left': np.asarray(left, dtype=np.int32),
+        'right': np.asarray(right, dtype=np.int32),
+        'roots': np.asarray(roots, dtype=np.int32),
+        'leaf_values': np.asarray(leaves, dtype=np.float64),
+        'max_depth': np.int32(max_depth),
+    }
+
+def export_catboost_model(cbm_path: str, out_path: str=None)->str:
+    """导出 .cbm 为 .npz 数组（仅导出时需要 catboost 库）。"""
+    from catboost import CatBoostClassifier
+    out_path = out_path or os.path.join(os.path.dirname(os.path.abspath(cbm_path)), NUMPY_MODEL_FILE)
+
+    model = CatBoostClassifier()
+    model.load_model(cbm_path)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, 'model.json')
+        model.save_model(json_path, format='json')
+        with open(json_path, 'r', encoding='utf-8') as f:
+            doc = json.load(f)
+
+    if doc['features_info'].get('categorical_features') or doc['features_info'].get('text_features'):
+        raise ValueError("仅支持纯数值特征的CatBoost模型")
+    arrays = _flatten_trees(doc['trees'])
+    scale, bias = doc.get('scale_and_bias', [1.0, [0.0]])
+    float_features = doc['features_info']['float_features']
+    border_lists = [np.asarray(ff.get('borders', []), dtype=np.float32) for ff in float_features]
+
+    tmp_path = out_path + '.tmp.npz'
+    np.savez(
+        tmp_path,
+        version=np.int32(EXPORT_VERSION),
+        source_sha256=np.array(file_sha256(cbm_path)),
+        loss_function=np.array(str(model.get_param('loss_function') or 'MultiClass')),
+        scale=np.float64(scale),
+        bias=np.atleast_1d(np.asarray(bias, dtype=np.float64)),
+        n_features=np.int32(len(float_features)),
+        feature_index=np.asarray([ff['flat_feature_index'] for ff in float_features], dtype=np.int32),
+        borders=np.concatenate(border_lists) if border_lists else np.zeros(0, dtype=np.float32),
+        border_offsets=np.cumsum([0] + [len(b) for b in border_lists]).astype(np.int64),
+        classes=np.asarray(model.classes_),
+        **arrays
+    )
+    os.replace(tmp_path, out_path)
+    print(f"CatBoost模型已导出为NumPy数组: {out_path} "
+          f"({len(arrays['roots'])} 棵树, {len(arrays['leaf_values'])} 个叶子)")
+    return out_path
+
+class NumpyCatBoostClassifier:
+    """
+    与 CatBoostClassifier 推理接口兼容的最小实现:
+    predict_proba / predict / get_borders / classes_ / feature_count_。
+    阈值比较与 CatBoost 一致：float32 特征值 > float32 边界 -> 右子树。
+    """
+    ALL_TREES_MAX_ROWS = 4096
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.split_feature = arrays['split_feature']
+        self.split_border = arrays['split_border']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.roots = arrays['roots']
+        self.leaf_values = arrays['leaf_values']
+        self.max_depth = int(arrays['max_depth'])
+        self.scale = float(arrays['scale'])
+        self.bias = np.asarray(arrays['bias'], dtype=np.float64)
+        self.loss_function = str(arrays['loss_function'])
+        self.feature_count_ = int(arrays['n_features'])
+        self.classes_ = np.asarray(arrays['classes'])
+        self.source_sha256 = str(arrays['source_sha256'])
+        offs = arrays['border_offsets']
+        self._borders = {int(f): arrays['borders'][offs[i]:offs[i + 1]].tolist()
+                         for i, f in enumerate(arrays['feature_index'])}
+
+        # 推理前先把特征量化为边界下标(bin)：x > border_i  <=>  bin(x) > i，
+        # 逐层查找只需比较 uint8 而不是 float32
+        self._bin_borders = [np.asarray(self._borders.get(j, []), dtype=np.float32)
+                             for j in range(self.feature_count_)]
+        max_bins = max([len(b) for b in self._bin_borders] + [0])
+        self._bin_dtype = np.uint8 if max_bins < 255 else np.uint16
+        thr = np.empty(len(self.split_feature), dtype=np.int64)
+        for k, (f, b) in enumerate(zip(self.split_feature, self.split_border)):
+            thr[k] = np.searchsorted(self._bin_borders[f], b)
+            if thr[k] >= len(self._bin_borders[f]) or self._bin_borders[f][thr[k]] != b:
+                raise ValueError(f"分裂阈值不在特征{f}的量化边界中: {b}")
+
+        # 叶子追加为自环节点(阈值取最大bin，永远走左=自身)，逐层查找无需判断是否已到叶子
+        n_inner, n_leaves = len(self.split_feature), len(self.leaf_values)
+        self._n_inner = n_inner
+        self._feat = np.concatenate([self.split_feature, np.zeros(n_leaves, dtype=np.int32)]).astype(np.int64)
+        self._thr = np.concatenate([thr, np.full(n_leaves, np.iinfo(self._bin_dtype).max)]).astype(self._bin_dtype)
+        to_id = lambda c: np.where(c >= 0, c, n_inner + ~c)
+        leaf_ids = np.arange(n_inner, n_inner + n_leaves)
+        self._child = np.empty(2 * (n_inner + n_leaves), dtype=np.int32)
+        self._child[0::2] = np.concatenate([to_id(self.left), leaf_ids])
+        self._child[1::2] = np.concatenate([to_id(self.right), leaf_ids])
+        self._root_ids = to_id(self.roots).astype(np.int32)
+
+    @classmethod
+    def load(cls, path: str)->'NumpyCatBoostClassifier':
+        with np.load(path, allow_pickle=False) as z:
+            if int(z['version']) != EXPORT_VERSION:
+                raise ValueError(f"NumPy模型版本不匹配: {path}")
+            return cls({k: z[k] for k in z.files})
+
+    def get_borders(self)->Dict[int, List[float]]:
+        return self._borders
+
+    def predict_raw(self, X, chunk_rows: int=65536)->np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        out = np.empty((X.shape[0], self.leaf_values.shape[1]), dtype=np.float64)
+        for start in range(0, X.shape[0], chunk_rows):
+            out[start:start + chunk_rows] = self._raw(X[start:start + chunk_rows])
+        return out
+
+    def quantize(self, X: np.ndarray)->np.ndarray:
+        """(n_features, n) 的 bin 下标；NaN 按 CatBoost 的 nan_mode=Min 处理为最小 bin。"""
+        n = X.shape[0]
+        Xb = np.empty((self.feature_count_, n), dtype=self._bin_dtype)
+        for j, borders in enumerate(self._bin_borders):
+            col = X[:, j]
+            Xb[j] = np.searchsorted(borders, col, side='left')
+            Xb[j][np.isnan(col)] = 0
+        return Xb
+
+    def _raw(self, X: np.ndarray)->np.ndarray:
+        n = X.shape[0]
+        flat = self.quantize(X).ravel()
+        cols = np.arange(n, dtype=np.int64)
+        offset = self._feat * n
+        raw = np.zeros((n, self.leaf_values.shape[1]), dtype=np.float64)
+        if n <= self.ALL_TREES_MAX_ROWS:
+            # 小批量：所有树同时逐层查找，numpy 调用次数只与深度有关
+            node = np.repeat(self._root_ids[:, None], n, axis=1)
+            for _ in range(self.max_depth):
+                go_right = flat.take(offset.take(node) + cols) > self._thr.take(node)
+                node = self._child.take(node * 2 + go_right)
+            leaves = node - self._n_inner
+        else:
+            # 大批量：逐棵树处理，中间数组只有 n 长，缓存友好
+            leaves = np.empty((len(self._root_ids), n), dtype=np.int32)
+            for t, root in enumerate(self._root_ids):
+                node = np.full(n, root, dtype=np.int32)
+                for _ in range(self.max_depth):
+                    go_right = flat.take(offset.take(node) + cols) > self._thr.take(node)
+                    node = self._child.take(node * 2 + go_right)
+                leaves[t] = node - self._n_inner
+        # 叶子值按树的顺序累加，与 CatBoost 的求和顺序一致
+        for t in range(leaves.shape[0]):
+            raw += self.leaf_values[leaves[t]]
+        return raw * self.scale + self.bias
+
+    def predict_proba(self, X)->np.ndarray:
+        raw = self.predict_raw(X)
+        if raw.shape[1] == 1:
+            p = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - p, p])
+        z = raw - raw.max(axis=1, keepdims=True)
+        e = np.exp(z)
+        return e / e.sum(axis=1, keepdims=True)
+
+    def predict(self, X)->np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+def load_numpy_model(model_dir: str, verify: bool=True):
+    """
+    模型目录下存在与 .cbm 内容一致的 .npz 时返回 NumpyCatBoostClassifier，
+    否则返回 None（调用方回退到 catboost 库）。
+    """
+    npz_path = os.path.join(model_dir, NUMPY_MODEL_FILE)
+    if not os.path.exists(npz_path):
+        return None
+    model = NumpyCatBoostClassifier.load(npz_path)
+    cbm_path = os.path.join(model_dir, CBM_MODEL_FILE)
+    if verify and os.path.exists(cbm_path) and file_sha256(cbm_path) != model.source_sha256:
+        print(f"警告: {npz_path} 与 {CBM_MODEL_FILE} 不一致，需重新导出")
+        return None
+    return model
+
+def main():
+    ap = argparse.ArgumentParser(description='导出CatBoost模型为NumPy数组')
+    ap.add_argument('--model_dir', action='append',
+                    help='模型目录（可重复），默认为脚本所在目录')
+    args = ap.parse_args()
+    for d in args.model_dir or [os.path.dirname(os.path.abspath(__file__))]:
+        export_catboost_model(os.path.join(d, CBM_MODEL_FILE))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+培养方案预编译
+将 education-plan{year}/*.xlsx 编译为按内容哈希命名的二进制缓存(.plan_cache)，
+预测时直接加载，无需再解析Excel；培养方案文件修改后缓存自动失效并重新编译。
+"""
+
+import os
+import sys
+import argparse
+import time
+import Optimization_model_func3_1 as opt
+
+def main():
+    parser = argparse.ArgumentParser(description='培养方案预编译')
+    parser.add_argument('--year', action='append', help='只编译指定年级，可重复，如 --year 2023 --year 2024')
+    parser.add_argument('--cache_dir', help=f'缓存目录 (默认: {opt.PLAN_CACHE_DIR})')
+    args = parser.parse_args()
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    start = time.time()
+    compiled = opt.compile_education_plans(base_dir, years=args.year, cache_dir=args.cache_dir)
+    for src, artifact in compiled.items():
+        print(f"✅ {os.path.relpath(src, base_dir)} -> {os.path.basename(artifact)}")
+    if not compiled:
+        print("❌ 未找到任何培养方案文件")
+        return 1
+    print(f"共编译 {len(compiled)} 个培养方案，用时 {time.time() - start:.2f}s")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
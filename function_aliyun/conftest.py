@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""function_aliyun 测试共用的夹具：按培养方案生成小型成绩文件"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def plan_path(year: str, major: str) -> str:
+    return os.path.join(BASE_DIR, f"education-plan{year}", f"{year}级{major}培养方案.xlsx")
+
+
+@pytest.fixture
+def make_scores_workbook(tmp_path):
+    """
+    make_scores_workbook(n_students, year='2023', majors=('物联网工程',), seed=0) -> 路径
+    每名学生随机修读约 70% 的必修课，成绩保留一位小数（含 71.8 这类无法用 float32 精确表示的值）
+    """
+    import Optimization_model_func3_1 as opt
+
+    def make(n_students=20, year='2023', majors=('物联网工程',), seed=0, name='scores.xlsx'):
+        rng = np.random.default_rng(seed)
+        rows = []
+        for major in majors:
+            courses = opt.load_course_catalog(plan_path(year, major)).columns
+            for i in range(n_students):
+                sid = f"{year}{opt.get_major_code(major)}{i:04d}"
+                for course in courses:
+                    if rng.random() < 0.7:
+                        rows.append({'SNH': sid, 'Current_Major': major, 'Course_Name': course,
+                                     'Grade': round(float(rng.uniform(55, 98)), 1),
+                                     'Course_Attribute': '必修'})
+        path = tmp_path / name
+        pd.DataFrame(rows).to_excel(path, index=False)
+        return str(path)
+
+    return make
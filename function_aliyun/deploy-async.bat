@@ -29,7 +29,7 @@ ssh "%SERVER_USER%@%SERVER_HOST%" "cd %SERVER_PATH% && if [ -f robust_api_server
 
 REM 上传异步API服务器
 echo 📤 上传异步API服务器...
-scp async_api_server.py "%SERVER_USER%@%SERVER_HOST%:%SERVER_PATH%/"
+scp async_api_server.py worker_pool.py run_prediction_direct.py Optimization_model_func3_1.py catboost_numpy.py result_store.py "%SERVER_USER%@%SERVER_HOST%:%SERVER_PATH%/"
 if errorlevel 1 (
     echo ❌ 文件上传失败
     pause
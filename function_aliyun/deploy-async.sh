@@ -37,9 +37,10 @@ ssh "$SERVER_USER@$SERVER_HOST" "
     fi
 "
 
-# 上传新的异步API服务器
+# 上传新的异步API服务器（常驻 worker 依赖新版预测脚本与算法模块，需一并上传）
 echo "📤 上传异步API服务器..."
-scp async_api_server.py "$SERVER_USER@$SERVER_HOST:$SERVER_PATH/"
+scp async_api_server.py worker_pool.py run_prediction_direct.py Optimization_model_func3_1.py \
+    catboost_numpy.py result_store.py "$SERVER_USER@$SERVER_HOST:$SERVER_PATH/"
 
 # 设置文件权限
 echo "🔐 设置文件权限..."
@@ -60,7 +61,7 @@ ssh "$SERVER_USER@$SERVER_HOST" "
     python3 -c 'import flask, pandas; print(\"✅ Flask和Pandas已安装\")'
     
     echo '检查必要文件...'
-    for file in run_prediction_direct.py feature_columns.json catboost_model.cbm scaler.pkl; do
+    for file in run_prediction_direct.py worker_pool.py Optimization_model_func3_1.py catboost_numpy.py result_store.py feature_columns.json catboost_model.cbm scaler.pkl; do
         if [ -f \"\$file\" ]; then
             echo \"✅ \$file 存在\"
         else
@@ -21,7 +21,7 @@ echo.
 
 :: 检查必需文件
 echo 步骤 1/4: 检查必需文件
-set REQUIRED_FILES=robust_api_server.py run_prediction_direct.py Optimization_model_func3_1.py feature_columns.json catboost_model.cbm scaler.pkl
+set REQUIRED_FILES=robust_api_server.py ndjson_stream.py run_prediction_direct.py Optimization_model_func3_1.py catboost_numpy.py result_store.py feature_columns.json catboost_model.cbm scaler.pkl
 for %%f in (%REQUIRED_FILES%) do (
     if not exist "%%f" (
         echo [ERROR] 缺少关键文件: %%f
@@ -124,8 +124,11 @@ log "✅ Python依赖处理完成"
 log "步骤 6/8: 验证关键文件"
 REQUIRED_FILES=(
     "robust_api_server.py"
+    "ndjson_stream.py"
     "run_prediction_direct.py"
     "Optimization_model_func3_1.py"
+    "catboost_numpy.py"
+    "result_store.py"
     "feature_columns.json"
     "catboost_model.cbm"
     "scaler.pkl"
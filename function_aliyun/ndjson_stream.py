@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+NDJSON 流式输出的公共函数（prediction_api 与 robust_api_server 共用）
+
+每行一个JSON对象；结果表按块转换为记录，不在内存中拼出整个响应体。
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterator
+
+import numpy as np
+import pandas as pd
+
+NDJSON_CHUNK_ROWS = 500
+
+def _json_default(o):
+    if isinstance(o, (np.integer, np.floating, np.bool_)):
+        return o.item()
+    if isinstance(o, (pd.Timestamp, datetime)):
+        return o.isoformat()
+    return str(o)
+
+def ndjson_line(obj: Dict[str, Any]) -> str:
+    """NaN/inf 必须事先替换为 None（allow_nan=False 保证输出是合法JSON）"""
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, default=_json_default) + '\n'
+
+def json_safe_records(df: pd.DataFrame, chunk_rows: int = NDJSON_CHUNK_ROWS) -> Iterator[Dict[str, Any]]:
+    """逐块把 DataFrame 转为记录，NaN/±inf -> None"""
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows].astype(object)
+        chunk = chunk.where(chunk.notna() & ~chunk.isin([np.inf, -np.inf]), None)
+        yield from chunk.to_dict('records')
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量预测结果库 (SQLite)
+
+每名学生的预测结果按 (年级, 专业, 学号, 模型版本, 培养方案哈希) 保存，并附带该学生
+输入成绩（及预测参数）的哈希。每学期重新上传整届成绩时，输入哈希未变化的学生直接
+复用库中结果，只重新计算成绩有变化的学生；模型或培养方案变化时键不同，自然全部重算。
+
+用法:
+    python run_prediction_direct.py --year 2024 --scores_file scores.xlsx --store prediction_store.sqlite
+    python result_store.py --store prediction_store.sqlite            # 查看统计
+    python result_store.py --store prediction_store.sqlite --vacuum   # 只保留各学生最新模型/方案的结果
+"""
+
+import os
+import pickle
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Tuple
+
+SCHEMA_VERSION = 1
+
+class ResultStore:
+    """
+    payload 为 pickle 序列化的单个学生结果 (预测行, 逆推行, 概率曲线)，
+    由 Optimization_model_func3_1.predict_students 写入和读取。
+    """
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS results (
+                year TEXT NOT NULL,
+                major TEXT NOT NULL,
+                snh TEXT NOT NULL,
+                model_version TEXT NOT NULL,
+                plan_hash TEXT NOT NULL,
+                input_hash TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (year, major, model_version, plan_hash, snh)
+            );
+        ''')
+        row = self._conn.execute("SELECT value FROM meta WHERE key='schema_version'").fetchone()
+        if row is None:
+            self._conn.execute("INSERT INTO meta VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+        elif int(row[0]) != SCHEMA_VERSION:
+            # 结构不兼容时清空重建，结果库只是缓存
+            self._conn.execute('DELETE FROM results')
+            self._conn.execute("UPDATE meta SET value=? WHERE key='schema_version'", (str(SCHEMA_VERSION),))
+        self._conn.commit()
+
+    def fetch(self, year: str, major: str, model_version: str, plan_hash: str)->Dict[str, Tuple[str, object]]:
+        """{学号: (输入哈希, 结果)}，范围为一个 (年级, 专业, 模型版本, 培养方案)"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT snh, input_hash, payload FROM results '
+                'WHERE year=? AND major=? AND model_version=? AND plan_hash=?',
+                (str(year), major, model_version, plan_hash)).fetchall()
+        return {snh: (input_hash, pickle.loads(payload)) for snh, input_hash, payload in rows}
+
+    def save(self, year: str, major: str, model_version: str, plan_hash: str,
+             items: Iterable[Tuple[str, str, object]]):
+        """items: (学号, 输入哈希, 结果)，同键覆盖"""
+        now = datetime.now().isoformat(timespec='seconds')
+        data = [(str(year), major, str(snh), model_version, plan_hash, input_hash,
+                 pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL), now)
+                for snh, input_hash, payload in items]
+        if not data:
+            return
+        with self._lock:
+            self._conn.executemany('INSERT OR REPLACE INTO results VALUES (?,?,?,?,?,?,?,?)', data)
+            self._conn.commit()
+
+    def stats(self)->Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT year, major, COUNT(*) FROM results GROUP BY year, major ORDER BY year, major').fetchall()
+        return {f'{year}/{major}': n for year, major, n in rows}
+
+    def vacuum(self)->int:
+        """删除被更新模型/培养方案取代的旧结果（每个学生只保留最新写入的一条），返回删除条数"""
+        with self._lock:
+            cur = self._conn.execute('''
+                DELETE FROM results WHERE rowid NOT IN (
+                    SELECT rowid FROM (
+                        SELECT rowid, ROW_NUMBER() OVER (
+                            PARTITION BY year, major, snh ORDER BY updated_at DESC, rowid DESC) AS rn
+                        FROM results)
+                    WHERE rn = 1)
+            ''')
+            self._conn.commit()
+            self._conn.execute('VACUUM')
+            return cur.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def main():
+    ap = argparse.ArgumentParser(description='增量预测结果库')
+    ap.add_argument('--store', required=True, help='SQLite 结果库路径')
+    ap.add_argument('--vacuum', action='store_true', help='清理旧模型/旧培养方案的结果')
+    args = ap.parse_args()
+    store = ResultStore(args.store)
+    if args.vacuum:
+        print(f"已删除 {store.vacuum()} 条过期结果")
+    for scope, n in store.stats().items():
+        print(f"{scope}: {n} 名学生")
+    store.close()
+
+if __name__ == '__main__':
+    main()
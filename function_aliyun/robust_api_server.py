@@ -8,21 +8,31 @@
 import os
 import sys
 import json
+import shutil
 import tempfile
 import subprocess
 import traceback
+import time
+import uuid
 from datetime import datetime
 import argparse
 
 # 导入依赖，如果缺少则提示
 try:
-    from flask import Flask, request, jsonify
+    from flask import Flask, request, jsonify, Response, stream_with_context
     import pandas as pd
 except ImportError as e:
     print(f"缺少依赖包: {e}")
     print("请运行: pip install flask pandas openpyxl")
     sys.exit(1)
 
+# 流式(NDJSON)输出的公共函数；缺失时只影响 NDJSON 输出
+try:
+    from ndjson_stream import ndjson_line, json_safe_records
+except ImportError as e:
+    print(f"警告: 无法导入 ndjson_stream.py，NDJSON 流式输出不可用: {e}")
+    ndjson_line = json_safe_records = None
+
 app = Flask(__name__)
 
 # 配置
@@ -85,10 +95,97 @@ def validate_environment():
     log_message("✅ 环境验证通过")
     return True
 
+def wants_ndjson():
+    return (request.form.get('output_format', 'json').lower() == 'ndjson'
+            or 'application/x-ndjson' in request.headers.get('Accept', ''))
+
+def cleanup_request_files(request_id, temp_scores_path, out_dir):
+    try:
+        if os.path.exists(temp_scores_path):
+            os.unlink(temp_scores_path)
+            log_message(f"[{request_id}] 清理临时文件: {temp_scores_path}")
+        shutil.rmtree(out_dir, ignore_errors=True)
+    except Exception as e:
+        log_message(f"[{request_id}] 清理临时文件失败: {str(e)}")
+
+def stream_prediction(request_id, cmd, year, majors_to_process, temp_scores_path, out_dir,
+                      timeout=1800, heartbeat=15):
+    """
+    NDJSON 流式预测：先发送 meta 行，算法运行期间每 heartbeat 秒发送一行 heartbeat
+    防止代理断开；完成后逐专业读取结果，每名学生一行 {"type": "row", "major", "sheet", "data"}，
+    最后一行为 end。失败时发送 error 行（HTTP 状态码已是200）。不返回算法日志全文。
+
+    注意：算法在子进程中一次处理全部专业，结果行要等子进程结束后才开始发送，
+    流式只降低了响应体的内存占用，并不能提前拿到第一个专业的结果；需要逐专业
+    增量输出时使用 prediction_api 的 NDJSON 模式（进程内逐专业预测）。
+    """
+    major_codes = {
+        "电信工程及管理": "tewm",
+        "物联网工程": "iot",
+        "智能科学与技术": "ai",
+        "电子信息工程": "ee"
+    }
+
+    def generate():
+        try:
+            yield ndjson_line({'type': 'meta', 'request_id': request_id, 'year': year,
+                               'majors': majors_to_process, 'timestamp': datetime.now().isoformat()})
+            start = time.time()
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                    text=True, cwd=config.base_dir)
+            while True:
+                try:
+                    _, stderr = proc.communicate(timeout=heartbeat)
+                    break
+                except subprocess.TimeoutExpired:
+                    if time.time() - start > timeout:
+                        proc.kill()
+                        proc.communicate()
+                        log_message(f"[{request_id}] ❌ 预测超时")
+                        yield ndjson_line({'type': 'error', 'error': f'预测算法执行超时 ({timeout}s)'})
+                        return
+                    yield ndjson_line({'type': 'heartbeat', 'elapsed': round(time.time() - start, 1)})
+            log_message(f"[{request_id}] 算法执行完成，返回码: {proc.returncode}")
+            if proc.returncode != 0:
+                log_message(f"[{request_id}] ❌ 预测失败: {stderr}")
+                yield ndjson_line({'type': 'error', 'error': '预测算法执行失败', 'details': stderr})
+                return
+
+            processed = []
+            for major_name in majors_to_process:
+                pred_file = os.path.join(out_dir, f"Cohort{year}_Predictions_{major_codes[major_name]}.xlsx")
+                if not os.path.exists(pred_file):
+                    log_message(f"[{request_id}] ⚠️ {major_name}: 预测文件不存在 - {pred_file}")
+                    continue
+                try:
+                    df = pd.read_excel(pred_file, sheet_name='Predictions')
+                except Exception as e:
+                    log_message(f"[{request_id}] ❌ {major_name}: 读取失败 - {str(e)}")
+                    yield ndjson_line({'type': 'error', 'major': major_name, 'error': str(e)})
+                    continue
+                for record in json_safe_records(df):
+                    yield ndjson_line({'type': 'row', 'major': major_name, 'sheet': 'Predictions', 'data': record})
+                yield ndjson_line({'type': 'statistics', 'major': major_name,
+                                   'statistics': {'total_students': len(df),
+                                                  'processed_time': pd.Timestamp.now().isoformat()}})
+                processed.append(major_name)
+            log_message(f"[{request_id}] 🎉 预测完成: {len(processed)}/{len(majors_to_process)} 个专业成功")
+            yield ndjson_line({'type': 'end', 'success': True, 'year': year,
+                               'processed_majors': len(processed), 'request_id': request_id})
+        finally:
+            cleanup_request_files(request_id, temp_scores_path, out_dir)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/predict', methods=['POST'])
 def predict():
-    """预测接口"""
-    request_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:17]
+    """
+    预测接口
+    output_format=ndjson（或 Accept: application/x-ndjson）时流式返回 NDJSON，
+    每名学生一行，NaN 输出为 null；默认仍返回完整JSON文档
+    """
+    request_id = f'{datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:17]}_{uuid.uuid4().hex[:6]}'
     log_message(f"[{request_id}] 开始处理预测请求")
     
     try:
@@ -132,6 +229,9 @@ def predict():
         temp_scores_path = os.path.join(config.temp_dir, f"scores_{request_id}.xlsx")
         scores_file.save(temp_scores_path)
         log_message(f"[{request_id}] 成绩文件已保存: {temp_scores_path}")
+        # 每个请求独立的输出目录，并发请求不会互相覆盖结果文件
+        out_dir = os.path.join(config.temp_dir, f"out_{request_id}")
+        streamed = False
         
         try:
             # 构建预测命令
@@ -139,7 +239,9 @@ def predict():
             cmd = [
                 sys.executable, script_path,
                 '--year', str(year),
-                '--scores_file', temp_scores_path
+                '--scores_file', temp_scores_path,
+                '--out_dir', out_dir,
+                '--task_id', request_id
             ]
             
             if major:
@@ -150,6 +252,17 @@ def predict():
             
             log_message(f"[{request_id}] 执行命令: {' '.join(cmd)}")
             
+            if wants_ndjson():
+                if ndjson_line is None:
+                    return jsonify({
+                        'success': False,
+                        'error': 'NDJSON 流式输出不可用：服务器缺少 ndjson_stream.py'
+                    }), 503
+                # 临时文件由流式响应结束时清理
+                streamed = True
+                majors_to_process = [major] if major else ["智能科学与技术", "物联网工程", "电信工程及管理", "电子信息工程"]
+                return stream_prediction(request_id, cmd, year, majors_to_process, temp_scores_path, out_dir)
+            
             # 执行预测
             result = subprocess.run(
                 cmd,
@@ -187,7 +300,7 @@ def predict():
             
             for major_name in majors_to_process:
                 code = major_codes[major_name]
-                pred_file = os.path.join(config.base_dir, f"Cohort{year}_Predictions_{code}.xlsx")
+                pred_file = os.path.join(out_dir, f"Cohort{year}_Predictions_{code}.xlsx")
                 
                 if os.path.exists(pred_file):
                     try:
@@ -233,12 +346,8 @@ def predict():
             
         finally:
             # 清理临时文件
-            try:
-                if os.path.exists(temp_scores_path):
-                    os.unlink(temp_scores_path)
-                    log_message(f"[{request_id}] 清理临时文件: {temp_scores_path}")
-            except Exception as e:
-                log_message(f"[{request_id}] 清理临时文件失败: {str(e)}")
+            if not streamed:
+                cleanup_request_files(request_id, temp_scores_path, out_dir)
                 
     except Exception as e:
         log_message(f"[{request_id}] ❌ 服务器错误: {str(e)}")
@@ -3,6 +3,7 @@
 import os, sys, argparse
 import pandas as pd
 import Optimization_model_func3_1 as opt
+from result_store import ResultStore
 from datetime import datetime
 
 class Logger:
@@ -20,14 +21,20 @@ class Logger:
     def close(self):
         self.log.close()
 
-def main():
-    # 添加命令行参数解析
+def main(argv=None, progress=None):
+    # 添加命令行参数解析；argv=None 时读取 sys.argv（常驻进程池直接传入参数列表）
+    # progress: 进度回调，接收 predict_students 的阶段事件（见 opt.report_progress）
     parser = argparse.ArgumentParser(description='学生去向预测系统 v2.0')
     parser.add_argument('--year', required=True, help='年级，如2023、2024')
     parser.add_argument('--scores_file', required=True, help='成绩Excel文件路径')
     parser.add_argument('--major', help='单个专业预测，如果不提供则预测所有专业')
     parser.add_argument('--config', help='配置参数JSON字符串')
-    args = parser.parse_args()
+    parser.add_argument('--workers', type=int, help='并行进程数，按学生分片（默认1，单进程）')
+    parser.add_argument('--store', default=os.environ.get('BUTP_RESULT_STORE'),
+                        help='增量预测结果库(SQLite)路径：只重新计算成绩有变化的学生（默认不启用）')
+    parser.add_argument('--out_dir', help='结果文件与日志的输出目录（默认为脚本所在目录；指定 --task_id 时为 runs/<task_id>）')
+    parser.add_argument('--task_id', help='任务ID：写入日志，并作为默认的独立输出目录名，便于并发执行')
+    args = parser.parse_args(argv)
     
     # 验证年级参数
     valid_years = ['2021', '2022', '2023', '2024']
@@ -36,10 +43,20 @@ def main():
         return 1
 
     base_dir = os.path.dirname(os.path.abspath(__file__))
+    # 每个任务使用独立的输出目录，同一年级的并发任务不会互相覆盖结果文件
+    if args.out_dir:
+        out_dir = os.path.abspath(args.out_dir)
+    elif args.task_id:
+        out_dir = os.path.join(base_dir, 'runs', args.task_id)
+    else:
+        out_dir = base_dir
+    os.makedirs(out_dir, exist_ok=True)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_file = os.path.join(base_dir, f"prediction_log_{timestamp}.txt")
+    log_file = os.path.join(out_dir, f"prediction_log_{timestamp}.txt")
     logger = Logger(log_file)
     sys.stdout = logger
+    default_inference_cache = opt.INFERENCE_CACHE
+    result_store = None
 
     try:
         year = args.year
@@ -49,12 +66,15 @@ def main():
         print(f"✓ 年级参数: {year}")
         print(f"✓ 成绩文件: {scores_file}")
         print(f"✓ 基础目录: {base_dir}")
+        print(f"✓ 输出目录: {out_dir}")
+        if args.task_id:
+            print(f"✓ 任务ID: {args.task_id}")
         print(f"✓ 专业参数: {args.major or '全部专业'}")
 
         # 检查成绩文件是否存在
         if not os.path.exists(scores_file):
             print(f"错误: 成绩文件不存在: {scores_file}")
-            return
+            return 1
 
         model_dir = base_dir
 
@@ -85,7 +105,7 @@ def main():
             if os.path.exists(education_plan_file):
                 print(f"✓ 使用{year}级原始培养方案: {education_plan_file}")
                 print(f"📋 这确保使用正确的{year}级课程数据")
-                print(f"💡 建议: 创建Course_Process_{year}_{code}.xlsx以提升性能")
+                print(f"💡 建议: 运行 compile_education_plans.py --year {year} 预编译培养方案以提升性能")
                 return education_plan_file
             
             raise FileNotFoundError(f"❌ 找不到{year}级{major_name}的培养方案文件\n   期望路径: {education_plan_file}")
@@ -111,13 +131,26 @@ def main():
 
         if not majors:
             print("错误: 没有找到任何可用的专业培养方案文件")
-            return
+            return 1
 
         # 解析配置参数
         config_params = {
             'with_uniform_inverse': 1,
             'min_grade': 60,
-            'max_grade': 90
+            'max_grade': 90,
+            'batched': 1,
+            'search': 'grid',
+            'grade_step': 1,
+            'workers': 1,
+            'probability_curves': 0,
+            'inference_cache_size': 0,
+            'inference_cache_decimals': 6,
+            'allocation': 0,
+            'allocation_time_budget': 5.0,
+            'monte_carlo': 0,         # 1=附带蒙特卡洛达成概率 (mc_attain_prob1/2)
+            'mc_samples': 2000,
+            'mc_seed': 0,
+            'mc_time_budget': 1.0
         }
         if args.config:
             try:
@@ -125,76 +158,98 @@ def main():
                 config_params.update(json.loads(args.config))
             except json.JSONDecodeError as e:
                 print(f"警告: 配置参数JSON解析失败: {e}")
+        if args.workers:
+            config_params['workers'] = args.workers
+        if config_params['inference_cache_size']:
+            # 仅对本任务生效：常驻工作进程中，结束后在 finally 恢复进程默认的缓存设置
+            opt.configure_inference_cache(config_params['inference_cache_size'],
+                                          config_params['inference_cache_decimals'])
+        if args.store:
+            result_store = ResultStore(args.store)
+            print(f"✓ 增量结果库: {result_store.path}")
 
         per_major_files = {}
-        for maj, cfile in majors.items():
+        out_paths = {}
+        for maj, cfile in list(majors.items()):
             if not os.path.exists(cfile):
                 print(f"警告: 课程文件不存在: {cfile}")
+                del majors[maj]
                 continue
 
             # 动态构建输出文件名
-            out = os.path.join(base_dir, f"Cohort{year}_Predictions_{opt.get_major_code(maj)}.xlsx")
-            print(f"\n开始处理专业：{maj}")
+            out_paths[maj] = os.path.join(out_dir, f"Cohort{year}_Predictions_{opt.get_major_code(maj)}.xlsx")
+            print(f"\n专业：{maj}")
             print(f"培养方案文件: {cfile}")
-            print(f"输出文件: {out}")
-
-            try:
-                pred_df, uni_df = opt.predict_students(
-                    scores_file=scores_file,
-                    course_file=cfile,
-                    major_name=maj,
-                    out_path=out,
-                    model_dir=model_dir,
-                    with_uniform_inverse=config_params['with_uniform_inverse'],
-                    min_grade=config_params['min_grade'],
-                    max_grade=config_params['max_grade']
-                )
-                per_major_files[maj] = out
-                print(f"完成专业 {maj}: {len(pred_df)} 名学生")
-
-                if not uni_df.empty:
-                    print("算法统计:")
-                    policy_1 = uni_df['s_min_for_1_policy'].fillna('-')
-                    policy_2 = uni_df['s_min_for_2_policy'].fillna('-')
-                    print(f"  保研阈值=60占比: {(uni_df['s_min_for_1'] == 60).sum() / len(uni_df):.1%}")
-                    print(f"  出国阈值=60占比: {(uni_df['s_min_for_2'] == 60).sum() / len(uni_df):.1%}")
-                    print(f"  被去向1支配占比: {uni_df['DominatedBy1'].sum() / len(uni_df):.1%}")
-                    print(f"  多区间占比(保研): {uni_df['MultipleIntervalsFlag_1'].sum() / len(uni_df):.1%}")
-                    print(f"  多区间占比(出国): {uni_df['MultipleIntervalsFlag_2'].sum() / len(uni_df):.1%}")
-
-            except Exception as e:
-                print(f"专业 {maj} 处理失败: {e}")
-                import traceback; traceback.print_exc()
-                continue
+            print(f"输出文件: {out_paths[maj]}")
+
+        # 成绩文件只解析一次，所有专业共享同一份成绩矩阵与模型
+        results = opt.predict_majors(
+            scores_file=scores_file,
+            majors=majors,
+            out_paths=out_paths,
+            model_dir=model_dir,
+            with_uniform_inverse=config_params['with_uniform_inverse'],
+            min_grade=config_params['min_grade'],
+            max_grade=config_params['max_grade'],
+            batched=config_params['batched'],
+            search=config_params['search'],
+            grade_step=config_params['grade_step'],
+            workers=config_params['workers'],
+            probability_curves=config_params['probability_curves'],
+            result_store=result_store,
+            cohort=year,
+            allocation=config_params['allocation'],
+            allocation_time_budget=config_params['allocation_time_budget'],
+            monte_carlo=config_params['monte_carlo'],
+            mc_samples=config_params['mc_samples'],
+            mc_seed=config_params['mc_seed'],
+            mc_time_budget=config_params['mc_time_budget'],
+            progress=progress
+        )
+
+        for maj, (pred_df, uni_df) in results.items():
+            per_major_files[maj] = out_paths[maj]
+            print(f"完成专业 {maj}: {len(pred_df)} 名学生")
+
+            if not uni_df.empty:
+                print("算法统计:")
+                print(f"  保研阈值=60占比: {(uni_df['s_min_for_1'] == 60).sum() / len(uni_df):.1%}")
+                print(f"  出国阈值=60占比: {(uni_df['s_min_for_2'] == 60).sum() / len(uni_df):.1%}")
+                print(f"  被去向1支配占比: {uni_df['DominatedBy1'].sum() / len(uni_df):.1%}")
+                print(f"  多区间占比(保研): {uni_df['MultipleIntervalsFlag_1'].sum() / len(uni_df):.1%}")
+                print(f"  多区间占比(出国): {uni_df['MultipleIntervalsFlag_2'].sum() / len(uni_df):.1%}")
 
         if per_major_files:
             print("\n=== 生成汇总总表 ===")
             frames=[]
-            for maj, f in per_major_files.items():
-                try:
-                    df = pd.read_excel(f, sheet_name="Predictions")
-                    df['Major'] = maj
-                    frames.append(df)
-                    print(f"读取 {maj}: {len(df)} 条记录")
-                except Exception as e:
-                    print(f"读取 {maj} 失败: {e}")
-                    continue
+            for maj in per_major_files:
+                # 直接使用内存中的预测结果，无需回读各专业文件
+                df = results[maj][0].copy()
+                df['Major'] = maj
+                frames.append(df)
+                print(f"汇总 {maj}: {len(df)} 条记录")
             if frames:
                 total = pd.concat(frames, ignore_index=True)
                 # 动态构建汇总文件名
-                total_out = os.path.join(base_dir, f"Cohort{year}_Predictions_All.xlsx")
-                total.to_excel(total_out, index=False)
+                total_out = os.path.join(out_dir, f"Cohort{year}_Predictions_All.xlsx")
+                opt.write_result_tables({'Sheet1': total}, total_out)
                 print(f"汇总总表已保存: {total_out}")
                 print(f"总计 {len(total)} 条预测记录")
             else:
                 print("无可汇总的数据")
         else:
             print("没有成功处理的专业")
+            return 1
+        return 0
 
     finally:
+        # 失败的任务同样要关闭结果库连接，避免常驻工作进程泄漏 SQLite 连接
+        if result_store is not None:
+            result_store.close()
+        opt.INFERENCE_CACHE = default_inference_cache
         sys.stdout = logger.terminal
         logger.close()
         print(f"日志已保存到: {log_file}")
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
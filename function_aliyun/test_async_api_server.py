@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+async_api_server 任务状态库测试：重启后任务状态保留、中断任务恢复、过期清理
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+
+import pytest
+
+import async_api_server as server
+from async_api_server import TaskManager
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    m = TaskManager(str(tmp_path / 'tasks.sqlite'), max_active=3)
+    monkeypatch.setattr(server, 'task_manager', m)
+    return m
+
+
+def test_import_does_not_open_default_db(tmp_path):
+    """导入模块不创建默认任务库；任务库在首次使用时才打开"""
+    db = tmp_path / 'default.sqlite'
+    code = ('import async_api_server as s, os; '
+            'assert s.task_manager is None and not os.path.exists(s.config.task_db); '
+            's.get_task_manager(); assert os.path.exists(s.config.task_db)')
+    env = dict(os.environ, BUTP_TASK_DB=str(db))
+    subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                   env=env, check=True)
+
+
+def test_tasks_survive_restart(tmp_path):
+    db = str(tmp_path / 'tasks.sqlite')
+    m = TaskManager(db)
+    done = m.create_task('/tmp/a.xlsx', '2023')
+    m.update_task(done, status='completed', progress=100, result_files=['x.xlsx'])
+    running = m.create_task('/tmp/b.xlsx', '2024')
+    m.update_task(running, status='running', progress=40, message='预测学生')
+    m.conn.close()
+
+    reopened = TaskManager(db)
+    task = reopened.get_task(done)
+    assert task['status'] == 'completed' and task['result_files'] == ['x.xlsx']
+    assert [t['id'] for t in reopened.interrupted_tasks()] == [running]
+    assert reopened.count_by_status() == {'completed': 1, 'running': 1}
+    tasks, total = reopened.list_tasks(limit=1)
+    assert total == 2 and len(tasks) == 1
+
+
+def test_max_active_rejects_new_tasks(manager):
+    ids = [manager.create_task(f'/tmp/{i}.xlsx', '2023') for i in range(3)]
+    assert None not in ids
+    assert manager.create_task('/tmp/extra.xlsx', '2023') is None
+    manager.update_task(ids[0], status='failed', error='x')
+    assert manager.create_task('/tmp/extra.xlsx', '2023') is not None
+
+
+def test_recover_interrupted_tasks(manager, tmp_path, monkeypatch):
+    upload = tmp_path / 'scores.xlsx'
+    upload.write_bytes(b'')
+    kept = manager.create_task(str(upload), '2023')
+    manager.update_task(kept, status='running', progress=30)
+    lost = manager.create_task(str(tmp_path / 'gone.xlsx'), '2023')
+
+    submitted = []
+    monkeypatch.setattr(server, 'submit_prediction_task', lambda *args: submitted.append(args))
+    assert server.recover_interrupted_tasks() == 1
+    assert submitted == [(kept, str(upload), '2023')]
+    assert manager.get_task(kept)['status'] == 'pending'
+    assert manager.get_task(lost)['status'] == 'failed'
+
+
+def test_purge_expired_removes_files(manager, tmp_path):
+    upload = tmp_path / 'scores.xlsx'
+    upload.write_bytes(b'')
+    result_dir = tmp_path / 'results'
+    result_dir.mkdir()
+    task_id = manager.create_task(str(upload), '2023')
+    (result_dir / f'{task_id}_out.xlsx').write_bytes(b'')
+    manager.update_task(task_id, status='completed', result_files=[f'{task_id}_out.xlsx'])
+    active = manager.create_task(str(upload), '2023')
+
+    assert manager.purge_expired(3600, str(result_dir)) == 0
+    time.sleep(0.01)
+    assert manager.purge_expired(0, str(result_dir)) == 1
+    assert manager.get_task(task_id) is None and manager.get_task(active) is not None
+    assert not upload.exists() and not (result_dir / f'{task_id}_out.xlsx').exists()
+
+
+def test_watch_ignores_other_tasks(manager):
+    """等待某任务的客户端不会被其他任务的更新唤醒"""
+    a = manager.create_task('/tmp/a.xlsx', '2023')
+    b = manager.create_task('/tmp/b.xlsx', '2023')
+    with manager.watch(a) as watch:
+        manager.update_task(b, progress=50)
+        assert watch.wait(0, 0.05) == 0
+        manager.update_task(a, progress=20)
+        assert watch.wait(0, 0.05) == 1
+    assert manager._watches == {}
+
+
+def test_task_events_stream(manager):
+    """SSE：状态变化时发送 progress 事件，任务结束时发送 end 事件并关闭"""
+    task_id = manager.create_task('/tmp/a.xlsx', '2023')
+
+    def advance():
+        # 等 SSE 客户端开始等待后再更新任务
+        while not manager._watches:
+            time.sleep(0.01)
+        manager.update_task(task_id, status='running', progress=40, message='预测学生')
+        time.sleep(0.2)
+        manager.update_task(task_id, status='completed', progress=100, result_files=['r.xlsx'])
+
+    threading.Thread(target=advance, daemon=True).start()
+    resp = server.app.test_client().get(f'/api/task/events/{task_id}')
+    assert resp.mimetype == 'text/event-stream'
+    events = []
+    for block in resp.get_data(as_text=True).split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if lines:
+            events.append((lines['event'], json.loads(lines['data'])))
+    assert events[0][0] == 'progress' and events[0][1]['status'] == 'pending'
+    assert ('progress', 'running') in [(e, d.get('status')) for e, d in events]
+    assert events[-2][1]['status'] == 'completed' and events[-2][1]['result_files'] == ['r.xlsx']
+    assert events[-1] == ('end', {'status': 'completed'})
+    assert server.app.test_client().get('/api/task/events/missing').status_code == 404
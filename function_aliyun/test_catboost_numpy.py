@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+catboost_numpy 测试：NumPy 推理与 CatBoost 输出一致；.cbm 变化后不再使用过期的 .npz
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+import catboost_numpy
+from catboost_numpy import NumpyCatBoostClassifier, NUMPY_MODEL_FILE, CBM_MODEL_FILE
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIRS = [BASE_DIR, os.path.join(BASE_DIR, 'Model_Params', 'Task3_CatBoost_Model')]
+
+
+@pytest.mark.parametrize('model_dir', MODEL_DIRS)
+def test_committed_npz_is_current(model_dir):
+    assert catboost_numpy.load_numpy_model(model_dir) is not None
+
+
+@pytest.mark.parametrize('model_dir', MODEL_DIRS)
+def test_predict_proba_matches_catboost(model_dir):
+    catboost = pytest.importorskip('catboost')
+    reference = catboost.CatBoostClassifier()
+    reference.load_model(os.path.join(model_dir, CBM_MODEL_FILE))
+    model = NumpyCatBoostClassifier.load(os.path.join(model_dir, NUMPY_MODEL_FILE))
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(0, 1.5, size=(5000, model.feature_count_))
+    # 恰好落在分裂边界上的值：比较方向 (>) 必须与 CatBoost 一致
+    for j, borders in model.get_borders().items():
+        if borders:
+            X[:len(borders), j] = borders[:len(X)]
+    np.testing.assert_allclose(model.predict_proba(X), reference.predict_proba(X), rtol=1e-9, atol=1e-12)
+    np.testing.assert_array_equal(model.predict(X), reference.predict(X).ravel())
+    # 大批量路径（逐棵树）与小批量路径（所有树同时）结果相同
+    small = np.vstack([model.predict_raw(X[i:i + 1000]) for i in range(0, len(X), 1000)])
+    np.testing.assert_array_equal(model.predict_raw(X), small)
+
+
+def test_stale_npz_is_ignored(tmp_path):
+    shutil.copy(os.path.join(BASE_DIR, NUMPY_MODEL_FILE), tmp_path / NUMPY_MODEL_FILE)
+    cbm = tmp_path / CBM_MODEL_FILE
+    cbm.write_bytes(open(os.path.join(BASE_DIR, CBM_MODEL_FILE), 'rb').read() + b'retrained')
+    assert catboost_numpy.load_numpy_model(str(tmp_path)) is None
+    assert catboost_numpy.load_numpy_model(str(tmp_path), verify=False) is not None
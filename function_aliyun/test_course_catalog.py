@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CourseCatalog 测试：类别成绩与原逐课程循环在浮点容差内一致；
+传入普通 course_info dict 时按内容复用已编译的目录
+"""
+
+import os
+
+import numpy as np
+
+import Optimization_model_func3_1 as opt
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PLAN = os.path.join(BASE_DIR, 'education-plan2023', '2023级物联网工程培养方案.xlsx')
+
+
+def reference_category_score(student_scores, course_info):
+    """原 calculate_category_score 的逐课程实现"""
+    agg = {k: {'tot': 0.0, 'cred': 0.0} for k in opt.BASE_FEATURES}
+    for i, cname in enumerate(course_info['Course_Name']):
+        cat = opt.map_course_category(course_info['Course_Type'][i])
+        if cat == 'unknown' or cname not in student_scores:
+            continue
+        g = student_scores[cname]
+        if 0 <= g <= 100:
+            cr = float(course_info['Credit'][i])
+            agg[cat]['tot'] += g*cr
+            agg[cat]['cred'] += cr
+    return {k: (v['tot']/v['cred']) if v['cred'] > 0 else np.nan for k, v in agg.items()}
+
+
+def test_category_scores_match_course_loop():
+    info = opt.load_course_info_from_file(PLAN)
+    rng = np.random.default_rng(4)
+    for _ in range(20):
+        scores = {c: float(rng.uniform(-5, 105)) for c in info['Course_Name'] if rng.random() < 0.7}
+        got = opt.calculate_category_score(scores, info, 'iot')
+        expected = reference_category_score(scores, info)
+        for k, v in expected.items():
+            np.testing.assert_allclose(got[k], v, rtol=1e-12, equal_nan=True)
+
+
+def test_plain_dict_catalog_is_reused_by_content():
+    info = opt.load_course_info_from_file(PLAN)
+    catalog = opt.as_course_catalog(info)
+    assert opt.as_course_catalog(info) is catalog
+    assert opt.as_course_catalog({k: list(v) for k, v in info.items()}) is catalog
+
+    # 修改学分后按新内容重新编译，已缓存的目录不受调用方修改影响
+    credits = list(catalog.credits)
+    info['Credit'][0] = float(info['Credit'][0]) + 1
+    changed = opt.as_course_catalog(info)
+    assert changed is not catalog
+    assert changed.credits[0] == credits[0] + 1
+    np.testing.assert_array_equal(catalog.credits, credits)
+    assert catalog['Credit'][0] == credits[0]
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+credit_allocation_search 测试：time_budget 是真正的时间上限；努力值按课程计一次
+"""
+
+import os
+import time
+
+import numpy as np
+import pytest
+
+import Optimization_model_func3_1 as opt
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MAJOR = '物联网工程'
+
+
+@pytest.fixture(scope='module')
+def setup():
+    catalog = opt.load_course_catalog(os.path.join(BASE_DIR, 'education-plan2023', f'2023级{MAJOR}培养方案.xlsx'))
+    model, scaler, feature_cols, mparams = opt.get_artifacts(BASE_DIR)
+    rng = np.random.default_rng(1)
+    G = rng.uniform(55, 95, size=(12, len(catalog)))
+    G[rng.random(G.shape) < 0.4] = np.nan
+    return catalog, G, (model, scaler, mparams, feature_cols)
+
+
+def _search(setup, **kwargs):
+    catalog, G, (model, scaler, mparams, feature_cols) = setup
+    return opt.credit_allocation_search(G, catalog, MAJOR, model, scaler, mparams, feature_cols, **kwargs)
+
+
+def test_effort_counts_each_course_once(setup):
+    catalog, G, _ = setup
+    credit = catalog.weights.max(axis=1)
+    for i, res in enumerate(_search(setup)):
+        for r in res.values():
+            assert r['complete']
+            if not r['feasible']:
+                continue
+            expected = sum(credit[catalog.index[c]]*(g - 60) for c, g in r['course_scores'].items())
+            assert r['effort'] == pytest.approx(expected)
+            assert r['effort'] <= r['uniform_effort'] + 1e-9 or np.isnan(r['uniform_effort'])
+
+
+def test_time_budget_bounds_seeding_and_descent(setup, monkeypatch):
+    real = opt.classes_of_rows
+    calls = []
+
+    def slow(X, *args):
+        calls.append(len(X))
+        if len(calls) > 1:      # 第一次为统一分数打分，不计入预算
+            time.sleep(0.2)
+        return real(X, *args)
+
+    monkeypatch.setattr(opt, 'classes_of_rows', slow)
+    start = time.monotonic()
+    results = _search(setup, time_budget=0.3, chunk_states=2)
+    elapsed = time.monotonic() - start
+    # 预算之后最多再完成一个正在打分的块
+    assert elapsed < 0.3 + 0.2 + 0.5
+    assert any(not r['complete'] for res in results for r in res.values())
+    table = opt.allocation_table([str(i) for i in range(len(results))], MAJOR, results)
+    assert set(table['complete']) <= {0, 1}
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+monte_carlo_attainment 测试：各类频率之和为 1；采样次数小于 1 时报错而不是输出 NaN
+"""
+
+import os
+import argparse
+
+import numpy as np
+import pytest
+
+import Optimization_model_func3_1 as opt
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MAJOR = '物联网工程'
+PLAN = os.path.join(BASE_DIR, 'education-plan2023', f'2023级{MAJOR}培养方案.xlsx')
+
+
+def _attainment(n_samples, n_students=4):
+    catalog = opt.load_course_catalog(PLAN)
+    model, scaler, feature_cols, mparams = opt.get_artifacts(BASE_DIR)
+    rng = np.random.default_rng(3)
+    G = rng.uniform(55, 95, size=(n_students, len(catalog)))
+    G[rng.random(G.shape) < 0.3] = np.nan
+    sids = [f'S{i}' for i in range(n_students)]
+    return opt.monte_carlo_attainment(G, sids, catalog, MAJOR, model, scaler, mparams, feature_cols,
+                                      n_samples=n_samples, time_budget=10.0, chunk=50)
+
+
+def test_frequencies_are_probabilities():
+    P, used = _attainment(120)
+    assert (used == 120).all()
+    np.testing.assert_allclose(P.sum(axis=1), 1.0)
+
+
+def test_rejects_non_positive_samples(make_scores_workbook):
+    with pytest.raises(ValueError):
+        _attainment(0)
+    with pytest.raises(ValueError):
+        opt.predict_students(scores_file=make_scores_workbook(3), course_file=PLAN, major_name=MAJOR,
+                             out_path=None, model_dir=BASE_DIR, monte_carlo=1, mc_samples=0)
+
+
+def test_cli_rejects_non_positive_samples():
+    assert opt.positive_int('5') == 5
+    with pytest.raises(argparse.ArgumentTypeError):
+        opt.positive_int('0')
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+培养方案编译缓存测试：编译结果与直接读取 Excel 相同；工作簿修改后缓存失效并重新编译
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import Optimization_model_func3_1 as opt
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PLAN = os.path.join(BASE_DIR, 'education-plan2023', '2023级物联网工程培养方案.xlsx')
+
+
+def _assert_catalog_equal(catalog, info):
+    expected = opt.CourseCatalog(info)
+    assert catalog.columns == expected.columns
+    assert list(catalog['Course_Type']) == list(info['Course_Type'])
+    np.testing.assert_array_equal(catalog.credits, expected.credits)
+    np.testing.assert_array_equal(catalog.category_ids, expected.category_ids)
+    np.testing.assert_array_equal(catalog.weights, expected.weights)
+
+
+def test_compiled_plan_matches_workbook_and_tracks_edits(tmp_path, monkeypatch):
+    cache_dir = tmp_path / 'cache'
+    monkeypatch.setattr(opt, 'PLAN_CACHE_DIR', str(cache_dir))
+    plan = tmp_path / os.path.basename(PLAN)
+    shutil.copy(PLAN, plan)
+
+    catalog = opt.load_course_catalog(str(plan))
+    _assert_catalog_equal(catalog, opt.load_course_info_from_file(str(plan)))
+    first_artifacts = os.listdir(cache_dir)
+    assert len(first_artifacts) == 1
+    assert opt.load_course_catalog(str(plan)) is catalog
+
+    # 删除一门必修课后重新保存：内存缓存与编译缓存都应失效
+    df = pd.read_excel(plan)
+    required = df[df.columns[8]].astype(str).str.contains('必修', na=False)
+    df.drop(index=df.index[required][0]).to_excel(plan, index=False)
+    st = os.stat(plan)
+    os.utime(plan, (st.st_atime, st.st_mtime + 10))
+
+    edited = opt.load_course_catalog(str(plan))
+    assert edited is not catalog
+    _assert_catalog_equal(edited, opt.load_course_info_from_file(str(plan)))
+    assert len(edited['Course_Name']) == len(catalog['Course_Name']) - 1
+    artifacts = os.listdir(cache_dir)
+    assert len(artifacts) == 1 and artifacts != first_artifacts
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量预测测试：结果库命中的学生不重新计算，合并结果与不使用结果库的全量计算一致
+"""
+
+import os
+
+import pandas as pd
+
+import Optimization_model_func3_1 as opt
+from result_store import ResultStore
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MAJOR = '物联网工程'
+PLAN = os.path.join(BASE_DIR, 'education-plan2023', f'2023级{MAJOR}培养方案.xlsx')
+
+
+def _predict(scores, store=None, **kwargs):
+    pred_df, uni_df = opt.predict_students(scores_file=scores, course_file=PLAN, major_name=MAJOR,
+                                           out_path=None, model_dir=BASE_DIR, result_store=store,
+                                           cohort='2023', **kwargs)
+    return pred_df, uni_df
+
+
+def test_incremental_rerun(tmp_path, make_scores_workbook, monkeypatch):
+    scores = make_scores_workbook(8, seed=2)
+    computed = []
+    real_shard = opt._predict_shard
+
+    def counting_shard(sids, ctx):
+        computed.append(list(sids))
+        return real_shard(sids, ctx)
+
+    monkeypatch.setattr(opt, '_predict_shard', counting_shard)
+
+    store = ResultStore(str(tmp_path / 'store.sqlite'))
+    first = _predict(scores, store)
+    assert len(computed[-1]) == 8
+
+    # 成绩未变：全部复用，不调用模型
+    n_calls = len(computed)
+    second = _predict(scores, store)
+    assert len(computed) == n_calls
+    for a, b in zip(first, second):
+        pd.testing.assert_frame_equal(a, b)
+
+    # 修改一名学生的一门成绩：只重新计算该学生
+    df = pd.read_excel(scores)
+    changed_sid = df.loc[0, 'SNH']
+    df.loc[0, 'Grade'] = 99.5 if df.loc[0, 'Grade'] != 99.5 else 61.0
+    updated = str(tmp_path / 'updated.xlsx')
+    df.to_excel(updated, index=False)
+    third = _predict(updated, store)
+    assert computed[-1] == [changed_sid]
+    for a, b in zip(third, _predict(updated)):
+        pd.testing.assert_frame_equal(a, b)
+
+    # 预测参数变化时不复用旧结果
+    _predict(updated, store, max_grade=85)
+    assert len(computed[-1]) == 8
+    store.close()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+StudentGradeMatrix 回归测试：列式加载结果与原先逐行 (iterrows) 加载完全一致，
+成绩值按解析结果原样保留（不经 float32 舍入）
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+import Optimization_model_func3_1 as opt
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def reference_load_student_scores(scores_path):
+    """原 load_student_scores 的逐行实现（仅保留与列识别无关的部分）"""
+    df = pd.read_excel(scores_path)
+    student_scores, student_majors = {}, {}
+    for _, row in df.iterrows():
+        sid = str(row['SNH']).strip()
+        cname = str(row['Course_Name']).strip()
+        if not sid or not cname or pd.isna(row.get('Grade', np.nan)):
+            continue
+        if '任选课' in str(row['Course_Attribute']).strip():
+            continue
+        raw = row['Grade']
+        g = opt.CN_GRADE_MAP[raw] if isinstance(raw, str) and opt.is_cn_grade(raw) else opt.safe_float(raw)
+        if np.isnan(g) or not (0 <= g <= 100):
+            continue
+        student_scores.setdefault(sid, {})[cname] = g
+        if sid not in student_majors:
+            student_majors[sid] = str(row['Current_Major']).strip()
+    return student_scores, student_majors
+
+
+def _edge_case_workbook(path):
+    rows = [
+        ('s1', '物联网工程', '高等数学', 71.8, '必修'),
+        ('s1', '物联网工程', '线性代数', '良', '必修'),
+        ('s1', '物联网工程', '线性代数', 66.6, '必修'),       # 重修：最后一行生效
+        ('s1', '物联网工程', '体育', '88.3', '必修'),         # 数字字符串
+        ('s2', '智能科学与技术', '高等数学', 120, '必修'),     # 超出范围
+        ('s2', '智能科学与技术', '摄影', 99.9, '任选课'),
+        ('s2', '智能科学与技术', '线性代数', None, '必修'),
+        ('s2', '智能科学与技术', '大学英语', '不及格', '必修'),
+        ('s3', '物联网工程', '高等数学', 'abc', '必修'),       # 无法解析，整名学生无有效成绩
+    ]
+    pd.DataFrame(rows, columns=['SNH', 'Current_Major', 'Course_Name', 'Grade', 'Course_Attribute']) \
+        .to_excel(path, index=False)
+    return str(path)
+
+
+def _assert_same(path):
+    expected_scores, expected_majors = reference_load_student_scores(path)
+    scores, majors = opt.load_student_scores(path)
+    assert list(scores) == list(expected_scores)
+    for sid, expected in expected_scores.items():
+        assert scores[sid] == expected
+        # 值严格相等（不是近似），导出的 current_* 与原实现一致
+        assert all(type(v) is float and v == expected[c] for c, v in scores[sid].items())
+    assert majors == expected_majors
+
+
+def test_edge_cases_match_row_loader(tmp_path):
+    path = _edge_case_workbook(tmp_path / 'edge.xlsx')
+    _assert_same(path)
+    scores, _ = opt.load_student_scores(path)
+    assert scores['s1']['高等数学'] == 71.8
+    assert scores['s1']['线性代数'] == 66.6
+
+
+def test_random_cohort_matches_row_loader(make_scores_workbook):
+    path = make_scores_workbook(30, majors=('物联网工程', '智能科学与技术'), seed=3)
+    _assert_same(path)
+
+
+def test_aligned_features_match_dict_path(make_scores_workbook):
+    """按培养方案对齐的成绩矩阵与由字典构建的矩阵逐元素相同"""
+    path = make_scores_workbook(10, seed=5)
+    catalog = opt.load_course_catalog(os.path.join(BASE_DIR, 'education-plan2023', '2023级物联网工程培养方案.xlsx'))
+    matrix = opt.load_student_grade_matrix(path)
+    expected_scores, _ = reference_load_student_scores(path)
+    G_dict = catalog.grade_matrix([expected_scores[sid] for sid in matrix.snh])
+    np.testing.assert_array_equal(matrix.aligned(catalog.columns), G_dict)
+    np.testing.assert_array_equal(catalog.category_scores(matrix.aligned(catalog.columns)),
+                                  catalog.category_scores(G_dict))
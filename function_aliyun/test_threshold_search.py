@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+逆推搜索等价性测试：整届批量搜索 (grid / breakpoints) 与逐名学生的 uniform_threshold_search 结果完全相同
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import Optimization_model_func3_1 as opt
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MAJOR = '物联网工程'
+
+
+@pytest.fixture(scope='module')
+def cohort(tmp_path_factory):
+    catalog = opt.load_course_catalog(os.path.join(BASE_DIR, 'education-plan2023', f'2023级{MAJOR}培养方案.xlsx'))
+    rng = np.random.default_rng(7)
+    scores = {}
+    for i in range(25):
+        taken = rng.random(len(catalog)) < rng.uniform(0.3, 0.95)
+        scores[f's{i}'] = {c: round(float(rng.uniform(50, 99)), 1)
+                           for c, t in zip(catalog.columns, taken) if t}
+    # 同一缺课集合的学生（按缺课签名分组共享计算）
+    scores['dup'] = dict(list(scores['s0'].items())[:-1]) | {list(scores['s0'])[-1]: 88.0}
+    model, scaler, feature_cols, mparams = opt.get_artifacts(BASE_DIR)
+    return scores, catalog, (model, scaler, mparams, feature_cols)
+
+
+def _frame(results):
+    return pd.DataFrame.from_dict(results, orient='index').sort_index()
+
+
+@pytest.mark.parametrize('grade_step', [1, 0.5])
+def test_batch_matches_per_student(cohort, grade_step):
+    scores, catalog, (model, scaler, mparams, feature_cols) = cohort
+    expected = {sid: opt.uniform_threshold_search(sc, catalog, MAJOR, model, scaler, mparams, feature_cols,
+                                                  grade_step=grade_step)
+                for sid, sc in scores.items()}
+    for search in ('grid', 'breakpoints'):
+        got = opt.uniform_threshold_search_batch(scores, catalog, MAJOR, model, scaler, mparams, feature_cols,
+                                                 search=search, grade_step=grade_step)
+        pd.testing.assert_frame_equal(_frame(got), _frame(expected), check_exact=True)
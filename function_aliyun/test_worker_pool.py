@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻预测进程池与 run_prediction_direct.main 的返回码测试
+"""
+
+import os
+import threading
+
+import pytest
+
+import Optimization_model_func3_1 as opt
+import run_prediction_direct
+from worker_pool import PredictionWorkerPool
+
+
+def _argv(scores_file, out_dir, *extra):
+    return ['--year', '2023', '--scores_file', scores_file, '--major', '物联网工程',
+            '--out_dir', str(out_dir), *extra]
+
+
+def test_main_returns_nonzero_without_output(tmp_path):
+    """成绩文件不存在、没有可用培养方案时返回非零状态码"""
+    assert run_prediction_direct.main(_argv(str(tmp_path / 'missing.xlsx'), tmp_path)) == 1
+    argv = ['--year', '2023', '--scores_file', __file__, '--major', '不存在的专业', '--out_dir', str(tmp_path)]
+    assert run_prediction_direct.main(argv) == 1
+
+
+def test_inference_cache_is_scoped_to_task(tmp_path, make_scores_workbook):
+    """任务内启用的推理缓存在任务结束后恢复为进程默认设置"""
+    before = opt.INFERENCE_CACHE
+    scores = make_scores_workbook(5)
+    code = run_prediction_direct.main(_argv(scores, tmp_path, '--config', '{"inference_cache_size": 1000}'))
+    assert code == 0
+    assert opt.INFERENCE_CACHE is before
+
+
+def test_result_store_closed_when_task_fails(tmp_path, make_scores_workbook, monkeypatch):
+    """预测失败时同样关闭结果库连接（常驻进程中不泄漏 SQLite 连接）"""
+    opened = []
+
+    class RecordingStore(run_prediction_direct.ResultStore):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.closed = False
+            opened.append(self)
+
+        def close(self):
+            self.closed = True
+            super().close()
+
+    def failing_predict(**kwargs):
+        raise RuntimeError('预测失败')
+
+    monkeypatch.setattr(run_prediction_direct, 'ResultStore', RecordingStore)
+    monkeypatch.setattr(opt, 'predict_majors', failing_predict)
+    scores = make_scores_workbook(3)
+    with pytest.raises(RuntimeError):
+        run_prediction_direct.main(_argv(scores, tmp_path, '--store', str(tmp_path / 'store.sqlite')))
+    assert len(opened) == 1 and opened[0].closed
+
+
+def test_pool_reports_failures_and_outputs(tmp_path, make_scores_workbook):
+    results = {}
+    done = threading.Event()
+
+    def on_done(task_id, result):
+        results[task_id] = result
+        if len(results) == 2:
+            done.set()
+
+    pool = PredictionWorkerPool(size=1, preload_years=['2023'], task_timeout=300).start()
+    try:
+        pool.submit('missing', _argv(str(tmp_path / 'missing.xlsx'), tmp_path / 'missing'), on_done=on_done)
+        pool.submit('ok', _argv(make_scores_workbook(5), tmp_path / 'ok'), on_done=on_done)
+        assert done.wait(300)
+    finally:
+        pool.shutdown()
+
+    assert results['missing']['returncode'] != 0
+    assert results['ok']['returncode'] == 0 and results['ok']['error'] is None
+    assert os.path.exists(tmp_path / 'ok' / 'Cohort2023_Predictions_iot.xlsx')
+    info = pool.info()
+    assert info['completed'] == 1 and info['failed'] == 1
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+write_result_tables 测试：流式写出的工作簿读回后与 DataFrame.to_excel(index=False) 相同
+"""
+
+import numpy as np
+import pandas as pd
+
+import Optimization_model_func3_1 as opt
+
+
+def _tables():
+    n = 12
+    rng = np.random.default_rng(0)
+    pred = pd.DataFrame({
+        'SNH': [f'2023{i:04d}' for i in range(n)],
+        'Major': ['物联网工程'] * n,
+        'current_public': np.round(rng.uniform(60, 95, n), 3),
+        'Pred': rng.integers(0, 3, n),
+        'Prob': rng.random(n).astype(np.float32),
+        'flag': rng.random(n) > 0.5,
+    })
+    pred.loc[2, 'current_public'] = np.nan
+    pred.loc[3, 'current_public'] = 71.8
+    uni = pd.DataFrame({'SNH': pred['SNH'], 's_min_for_1': [60, np.nan] * (n // 2),
+                        'ranges': ['[(60, 90)]'] * n, 'big': [np.inf, -np.inf] + [1.5] * (n - 2)})
+    return {'Predictions': pred, 'UniformInverse': uni, 'Empty': pd.DataFrame(columns=['a', 'b'])}
+
+
+def test_reads_back_like_to_excel(tmp_path):
+    tables = _tables()
+    streamed = tmp_path / 'streamed.xlsx'
+    reference = tmp_path / 'reference.xlsx'
+    opt.write_result_tables(tables, streamed, chunk_rows=5)
+    with pd.ExcelWriter(reference) as writer:
+        for name, df in tables.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+
+    got = pd.read_excel(streamed, sheet_name=None)
+    expected = pd.read_excel(reference, sheet_name=None)
+    assert list(got) == list(expected) == list(tables)
+    for name in tables:
+        pd.testing.assert_frame_equal(got[name], expected[name], check_exact=True)
+    assert got['Predictions'].loc[3, 'current_public'] == 71.8
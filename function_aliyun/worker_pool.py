@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻预测进程池
+
+固定数量的长驻工作进程，启动时预加载模型与全部培养方案，之后通过任务队列
+依次执行 run_prediction_direct.main(argv)，不再为每个任务启动新的 python3
+子进程（解释器启动、pandas/sklearn/catboost 导入、模型加载只在进程启动时发生一次）。
+
+- 每个工作进程由一个调度线程负责：从队列取任务、发送给进程、等待结果
+- 单任务超时：强制结束该进程，任务失败，随后启动新的进程补位
+- 崩溃隔离：进程异常退出只影响它正在执行的任务
+- 内存泄漏：任务完成后常驻内存超过 max_rss_mb，或执行任务数达到
+  max_tasks_per_worker 时，该进程退役并由新进程替换
+"""
+
+import os
+import sys
+import time
+import queue
+import threading
+import traceback
+import multiprocessing as mp
+from typing import Callable, Dict, List, Optional
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def rss_mb()->float:
+    """当前进程常驻内存 (MB)"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _worker_main(conn, base_dir: str, preload_years: Optional[List[str]]):
+    """工作进程入口：预加载后循环执行 (task_id, argv)，收到 None 时退出"""
+    os.chdir(base_dir)
+    if base_dir not in sys.path:
+        sys.path.insert(0, base_dir)
+    import Optimization_model_func3_1 as opt
+    import run_prediction_direct
+    try:
+        opt.MODEL_REGISTRY.preload([base_dir])
+        for src in opt.compile_education_plans(base_dir, years=preload_years):
+            opt.load_course_catalog(src)
+    except Exception as e:
+        # 预加载失败不影响任务执行，首次预测时再加载
+        print(f"⚠️ 工作进程预加载失败: {e}")
+    conn.send(('ready', os.getpid(), rss_mb()))
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        task_id, argv = job
+        try:
+            code = run_prediction_direct.main(
+                argv, progress=lambda event: conn.send(('progress', task_id, event)))
+            if code is None:
+                # main 的所有正常结束路径都返回状态码；None 视为未产出结果
+                conn.send(('done', task_id, 1, "run_prediction_direct.main 未返回状态码", rss_mb()))
+            else:
+                conn.send(('done', task_id, code, None, rss_mb()))
+        except BaseException as e:  # 包括 argparse 的 SystemExit
+            conn.send(('done', task_id, 1, f"{type(e).__name__}: {e}\n{traceback.format_exc()}", rss_mb()))
+
+class PredictionWorkerPool:
+    """
+    submit(task_id, argv, on_start, on_done, on_progress)：任务入队后立即返回。
+    on_start(task_id) 在任务开始执行时调用；on_progress(task_id, event) 转发工作进程中
+    predict_students 的进度事件；on_done(task_id, result) 在结束时调用，
+    result = {'returncode', 'error', 'elapsed', 'pid'}。回调都在调度线程中执行。
+    """
+    def __init__(self, size: int=2, base_dir: str=BASE_DIR, task_timeout: float=1800,
+                 max_tasks_per_worker: int=50, max_rss_mb: float=2048,
+                 preload_years: Optional[List[str]]=None, startup_timeout: float=300):
+        self.size = max(int(size), 1)
+        self.base_dir = base_dir
+        self.task_timeout = task_timeout
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.max_rss_mb = max_rss_mb
+        self.preload_years = preload_years
+        self.startup_timeout = startup_timeout
+        # 父进程是多线程的 Flask 服务，用 spawn 避免 fork 继承其他线程持有的锁
+        self._ctx = mp.get_context('spawn')
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._workers = [{'slot': i, 'pid': None, 'tasks': 0, 'rss_mb': None, 'task_id': None}
+                         for i in range(self.size)]
+        self.restarts = 0
+        self.completed = 0
+        self.failed = 0
+
+    def start(self)->'PredictionWorkerPool':
+        for slot in range(self.size):
+            t = threading.Thread(target=self._run_slot, args=(slot,), daemon=True,
+                                 name=f'prediction-worker-{slot}')
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def submit(self, task_id: str, argv: List[str], on_start: Callable=None, on_done: Callable=None,
+               on_progress: Callable=None):
+        self._queue.put((task_id, list(argv), on_start, on_done, on_progress))
+
+    def shutdown(self, wait: float=10):
+        for _ in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join(wait)
+
+    def info(self)->Dict:
+        with self._lock:
+            return {
+                'size': self.size,
+                'queued': self._queue.qsize(),
+                'busy': sum(w['task_id'] is not None for w in self._workers),
+                'completed': self.completed,
+                'failed': self.failed,
+                'restarts': self.restarts,
+                'workers': [dict(w) for w in self._workers],
+            }
+
+    # ---------- 调度线程 ----------
+    def _spawn(self, slot: int):
+        parent, child = self._ctx.Pipe()
+        # 非守护进程：run_prediction_direct --workers>1 时工作进程还需派生分片子进程
+        proc = self._ctx.Process(target=_worker_main, args=(child, self.base_dir, self.preload_years),
+                                 name=f'prediction-worker-{slot}')
+        proc.start()
+        child.close()
+        if not parent.poll(self.startup_timeout):
+            self._stop(proc, parent, graceful=False)
+            raise RuntimeError(f"工作进程启动超时 ({self.startup_timeout}s)")
+        try:
+            _, pid, mem = parent.recv()
+        except EOFError:
+            self._stop(proc, parent, graceful=False)
+            raise RuntimeError(f"工作进程启动失败 (exitcode={proc.exitcode})")
+        with self._lock:
+            self._workers[slot].update(pid=pid, tasks=0, rss_mb=round(mem, 1))
+        print(f"🔧 工作进程 {slot} 已就绪: pid={pid}, 内存 {mem:.0f}MB")
+        return proc, parent
+
+    @staticmethod
+    def _stop(proc, conn, graceful: bool=True):
+        if graceful and proc.is_alive():
+            try:
+                conn.send(None)
+            except (OSError, ValueError):
+                pass
+            proc.join(10)
+        if proc.is_alive():
+            proc.kill()
+        proc.join()
+        conn.close()
+
+    def _run_slot(self, slot: int):
+        proc = conn = None
+        try:
+            proc, conn = self._spawn(slot)
+        except Exception as e:
+            print(f"❌ 工作进程 {slot} 启动失败: {e}")
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            task_id, argv, on_start, on_done, on_progress = job
+            start = time.time()
+            result = {'returncode': 1, 'error': None, 'elapsed': 0.0, 'pid': None}
+            retire = False
+            try:
+                if proc is None or not proc.is_alive():
+                    if proc is not None:
+                        self._stop(proc, conn, graceful=False)
+                        with self._lock:
+                            self.restarts += 1
+                    proc = conn = None
+                    proc, conn = self._spawn(slot)
+                with self._lock:
+                    self._workers[slot]['task_id'] = task_id
+                result['pid'] = proc.pid
+                if on_start:
+                    on_start(task_id)
+                conn.send((task_id, argv))
+                deadline = start + self.task_timeout
+                while True:
+                    remaining = deadline - time.time()
+                    if remaining <= 0 or not conn.poll(remaining):
+                        result['error'] = f"任务超时 ({self.task_timeout}s)，已终止工作进程"
+                        retire = True
+                        break
+                    try:
+                        msg = conn.recv()
+                    except EOFError:
+                        proc.join(5)
+                        result['error'] = f"工作进程异常退出 (exitcode={proc.exitcode})"
+                        retire = True
+                        break
+                    if msg[0] == 'progress':
+                        if on_progress:
+                            try:
+                                on_progress(task_id, msg[2])
+                            except Exception:
+                                print(traceback.format_exc())
+                        continue
+                    _, _, code, error, mem = msg
+                    result.update(returncode=code, error=error)
+                    with self._lock:
+                        w = self._workers[slot]
+                        w['tasks'] += 1
+                        w['rss_mb'] = round(mem, 1)
+                        if mem > self.max_rss_mb or w['tasks'] >= self.max_tasks_per_worker:
+                            print(f"♻️ 工作进程 {slot} 退役: 内存 {mem:.0f}MB, 已执行 {w['tasks']} 个任务")
+                            retire = True
+                    break
+            except Exception as e:
+                result['error'] = f"调度失败: {e}"
+                retire = proc is not None
+            result['elapsed'] = round(time.time() - start, 3)
+            with self._lock:
+                self._workers[slot]['task_id'] = None
+                if result['returncode'] == 0 and not result['error']:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+            if retire:
+                self._stop(proc, conn, graceful=result['error'] is None)
+                proc = conn = None
+            if on_done:
+                try:
+                    on_done(task_id, result)
+                except Exception:
+                    print(traceback.format_exc())
+            if retire:
+                # 立即补位，下一个任务不必等待进程启动与预加载
+                with self._lock:
+                    self.restarts += 1
+                try:
+                    proc, conn = self._spawn(slot)
+                except Exception as e:
+                    print(f"❌ 工作进程 {slot} 重启失败: {e}")
+        if proc is not None:
+            self._stop(proc, conn)
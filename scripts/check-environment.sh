@@ -133,6 +133,9 @@ PROJECT_FILES=(
     "nginx/nginx.conf"
     "nginx/conf.d/prediction-api.conf"
     "function/Optimization_model_func3_1.py"
+    "function/catboost_numpy.py"
+    "function/result_store.py"
+    "function/ndjson_stream.py"
     "function/Model_Params/Task3_CatBoost_Model/catboost_model.cbm"
 )
 
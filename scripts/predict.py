@@ -3,40 +3,19 @@
 
 import sys
 import json
-import pickle
+import argparse
 import numpy as np
-import pandas as pd
 from pathlib import Path
 
+from xgb_numpy import NumpyXGBClassifier
+
 def load_model():
-    """加载XGBoost模型和相关文件"""
+    """加载XGBoost模型（纯NumPy推理，标准化器与标签编码器已并入模型数组）"""
     # 获取模型文件路径
     model_dir = Path(__file__).parent.parent / 'public' / 'algorithms' / 'Task3_XGBoost_Model'
     
-    # 加载模型文件
-    model_path = model_dir / 'xgb_model.pkl'
-    scaler_path = model_dir / 'scaler.pkl'
-    label_encoder_path = model_dir / 'label_encoder.pkl'
-    feature_columns_path = model_dir / 'feature_columns.json'
-    
     try:
-        # 加载模型
-        with open(model_path, 'rb') as f:
-            model = pickle.load(f)
-        
-        # 加载标准化器
-        with open(scaler_path, 'rb') as f:
-            scaler = pickle.load(f)
-        
-        # 加载标签编码器
-        with open(label_encoder_path, 'rb') as f:
-            label_encoder = pickle.load(f)
-        
-        # 加载特征列名
-        with open(feature_columns_path, 'r', encoding='utf-8') as f:
-            feature_columns = json.load(f)
-        
-        return model, scaler, label_encoder, feature_columns
+        return NumpyXGBClassifier.load(model_dir)
         
     except Exception as e:
         print(f"Error loading model: {e}", file=sys.stderr)
@@ -46,25 +25,22 @@ def predict(feature_values):
     """使用XGBoost模型进行预测"""
     try:
         # 加载模型
-        model, scaler, label_encoder, feature_columns = load_model()
+        model = load_model()
         
         # 准备特征数据
         features = []
-        for col in feature_columns:
+        for col in model.feature_columns:
             features.append(feature_values[col])
         
-        # 转换为numpy数组
-        X = np.array(features).reshape(1, -1)
-        
-        # 标准化特征
-        X_scaled = scaler.transform(X)
+        # 转换为numpy数组（标准化在模型内完成）
+        X = np.array(features, dtype=float).reshape(1, -1)
         
         # 进行预测
-        probabilities = model.predict_proba(X_scaled)[0]
-        predicted_class = model.predict(X_scaled)[0]
+        probabilities = model.predict_proba(X)[0]
+        predicted_class = model.predict(X)[0]
         
         # 解码预测的类别
-        predicted_class_decoded = label_encoder.inverse_transform([predicted_class])[0]
+        predicted_class_decoded = model.classes_[predicted_class]
         
         # 返回结果
         result = {
@@ -79,13 +55,85 @@ def predict(feature_values):
         print(f"Error during prediction: {e}", file=sys.stderr)
         sys.exit(1)
 
+def _bulk_flush(model, chunk, out):
+    """对一个分块的合法记录做一次向量化推理，并按输入顺序写出 JSONL"""
+    rows = [r for r in chunk if 'error' not in r]
+    if rows:
+        X = np.array([r['row'] for r in rows], dtype=float)
+        probabilities = model.predict_proba(X)
+        predicted = model.classes_[np.argmax(probabilities, axis=1)]
+        for r, probs, cls in zip(rows, probabilities, predicted):
+            r['result'] = {
+                'probabilities': probs.tolist(),
+                'predictedClass': int(cls),
+                'featureValues': r['featureValues']
+            }
+    for r in chunk:
+        res = r.get('result') or {'error': r['error'], 'line': r['line']}
+        if r.get('id') is not None:
+            res = {'id': r['id'], **res}
+        out.write(json.dumps(res, ensure_ascii=False) + '\n')
+    out.flush()
+
+def predict_bulk(lines, out, chunk_size=1024):
+    """
+    批量模式：逐行读取 JSONL（每行 {"featureValues": {...}}，可带 "id"），
+    模型只加载一次，按 chunk_size 分块向量化推理并即时写出，内存占用与总行数无关
+    """
+    model = load_model()
+    chunk, total, failed = [], 0, 0
+    for line_no, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        rec = {'line': line_no}
+        try:
+            data = json.loads(line)
+            rec['id'] = data.get('id') if isinstance(data, dict) else None
+            feature_values = data['featureValues']
+            rec['featureValues'] = feature_values
+            rec['row'] = [float(feature_values[col]) for col in model.feature_columns]
+        except Exception as e:
+            rec['error'] = f"{type(e).__name__}: {e}"
+            failed += 1
+        chunk.append(rec)
+        total += 1
+        if len(chunk) >= chunk_size:
+            _bulk_flush(model, chunk, out)
+            chunk = []
+    if chunk:
+        _bulk_flush(model, chunk, out)
+    print(f"Scored {total - failed} records ({failed} invalid)", file=sys.stderr)
+
 def main():
     """主函数"""
-    if len(sys.argv) != 2:
-        print("Usage: python predict.py <input_data_path>", file=sys.stderr)
+    parser = argparse.ArgumentParser(description='Task3 XGBoost 预测')
+    parser.add_argument('input_data_path', nargs='?', help='单条预测的输入JSON文件')
+    parser.add_argument('--bulk', metavar='JSONL', help="批量模式：JSONL文件路径，'-' 表示stdin")
+    parser.add_argument('--output', help='批量模式输出JSONL路径（默认stdout）')
+    parser.add_argument('--chunk_size', type=int, default=1024, help='批量模式每次向量化推理的行数')
+    args = parser.parse_args()
+
+    if args.bulk:
+        try:
+            src = sys.stdin if args.bulk == '-' else open(args.bulk, 'r', encoding='utf-8')
+            dst = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+            try:
+                predict_bulk(src, dst, max(1, args.chunk_size))
+            finally:
+                if src is not sys.stdin:
+                    src.close()
+                if dst is not sys.stdout:
+                    dst.close()
+        except Exception as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    if not args.input_data_path:
+        print("Usage: python predict.py <input_data_path> | --bulk <records.jsonl|-> [--chunk_size N]", file=sys.stderr)
         sys.exit(1)
     
-    input_data_path = sys.argv[1]
+    input_data_path = args.input_data_path
     
     try:
         # 读取输入数据
@@ -105,4 +153,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+xgb_numpy 回归测试：
+- NumPy 推理结果与 xgboost + scikit-learn 原始流水线一致
+- 模型源文件变化后，过期的 xgb_model_numpy.npz 会被重新导出而不是继续使用
+"""
+
+import os
+import sys
+import json
+import shutil
+import pickle
+import subprocess
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import xgb_numpy
+from xgb_numpy import NumpyXGBClassifier, NUMPY_MODEL_FILE, SOURCE_FILES
+
+
+def _random_features(model, n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(40, 100, size=(n, len(model.feature_columns)))
+    X[rng.random(X.shape) < 0.05] = 0.0
+    return X
+
+
+def test_predict_proba_matches_xgboost():
+    """与 scaler.transform + XGBClassifier.predict_proba 的输出逐元素一致"""
+    xgb = pytest.importorskip('xgboost')
+    model_dir = xgb_numpy.default_model_dir()
+    model = NumpyXGBClassifier.load(model_dir)
+    with open(model_dir / 'scaler.pkl', 'rb') as f:
+        scaler = pickle.load(f)
+    booster = xgb.XGBClassifier()
+    booster.load_model(str(model_dir / 'xgb_model.json'))
+
+    X = _random_features(model)
+    expected = booster.predict_proba(scaler.transform(X))
+    np.testing.assert_allclose(model.predict_proba(X), expected, rtol=1e-6, atol=1e-7)
+    np.testing.assert_array_equal(model.predict(X), np.argmax(expected, axis=1))
+
+
+def test_stale_npz_is_rebuilt(tmp_path):
+    """npz 记录的 source_sha256 与源文件不符时，从源文件重建并覆盖 npz"""
+    model_dir = xgb_numpy.default_model_dir()
+    for name in SOURCE_FILES:
+        shutil.copy(model_dir / name, tmp_path / name)
+    arrays = xgb_numpy.build_arrays(tmp_path)
+    fresh_sha = str(arrays['source_sha256'])
+    arrays['source_sha256'] = np.array('0' * 64)
+    # 过期的 npz：叶子值被篡改，若被误用则概率会改变
+    arrays['split_condition'] = arrays['split_condition'] + np.float32(1.0)
+    np.savez(tmp_path / NUMPY_MODEL_FILE, **arrays)
+
+    model = NumpyXGBClassifier.load(tmp_path)
+    assert model.source_sha256 == fresh_sha
+    with np.load(tmp_path / NUMPY_MODEL_FILE) as z:
+        assert str(z['source_sha256']) == fresh_sha
+
+    reference = NumpyXGBClassifier(xgb_numpy.build_arrays(tmp_path))
+    X = _random_features(model, n=50)
+    np.testing.assert_array_equal(model.predict_proba(X), reference.predict_proba(X))
+
+
+def test_missing_npz_is_exported(tmp_path):
+    """只有源文件时解析源文件并导出 npz，下次加载不再解析 pkl"""
+    model_dir = xgb_numpy.default_model_dir()
+    for name in SOURCE_FILES:
+        shutil.copy(model_dir / name, tmp_path / name)
+    model = NumpyXGBClassifier.load(tmp_path)
+    with np.load(tmp_path / NUMPY_MODEL_FILE) as z:
+        assert str(z['source_sha256']) == model.source_sha256
+
+
+def test_predict_script_runs_without_sklearn():
+    """test_model/predict_script.py 使用导出的 npz，不导入 scikit-learn"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'test_model', 'predict_script.py')
+    code = ("import sys, runpy; sys.modules['sklearn'] = None; "
+            f"sys.argv = [{script!r}, '[80, 80, 80, 80, 80, 80, 80, 80, 80]']; "
+            f"runpy.run_path({script!r}, run_name='__main__')")
+    proc = subprocess.run([sys.executable, '-c', code], capture_output=True, timeout=60)
+    result = json.loads(proc.stdout)
+    assert result.get('success'), result
+    assert abs(sum(result['probabilities'].values()) - 100) < 1e-4
+
+
+def test_npz_only_deployment(tmp_path):
+    """只部署 npz（没有源文件）时直接使用 npz"""
+    model_dir = xgb_numpy.default_model_dir()
+    shutil.copy(model_dir / NUMPY_MODEL_FILE, tmp_path / NUMPY_MODEL_FILE)
+    model = NumpyXGBClassifier.load(tmp_path)
+    with open(model_dir / 'feature_columns.json', 'r', encoding='utf-8') as f:
+        assert model.feature_columns == json.load(f)
+
+
+def test_committed_npz_is_current():
+    """仓库中的 xgb_model_numpy.npz 与源文件一致（否则需重新运行 xgb_numpy.py 导出）"""
+    model_dir = xgb_numpy.default_model_dir()
+    with np.load(model_dir / NUMPY_MODEL_FILE) as z:
+        assert str(z['source_sha256']) == xgb_numpy._sources_sha256(model_dir)
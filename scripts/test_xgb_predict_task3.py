@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+xgb_predict_task3 常驻模式测试：逐行协议、id 回传、单个连接出错或不读取结果时
+不影响其他连接
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import struct
+import threading
+import subprocess
+
+import pytest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'xgb_predict_task3.py')
+MODEL_DIR = os.path.join(os.path.dirname(SCRIPT), '..', 'public', 'algorithms', 'Task3_XGBoost_Model')
+
+
+def _request(req_id):
+    with open(os.path.join(MODEL_DIR, 'feature_columns.json'), 'r', encoding='utf-8') as f:
+        columns = json.load(f)
+    return json.dumps({'id': req_id, 'featureValues': {c: 80.0 for c in columns}}) + '\n'
+
+
+def _readline(sock):
+    buf = b''
+    while not buf.endswith(b'\n'):
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        buf += chunk
+    return json.loads(buf)
+
+
+def test_stdin_serve_answers_each_line():
+    lines = _request(1) + '{"featureValues": 1}\n' + _request('x').rstrip('\n')
+    proc = subprocess.run([sys.executable, SCRIPT, '--serve'], input=lines.encode(),
+                          capture_output=True, timeout=60)
+    out = [json.loads(line) for line in proc.stdout.decode().splitlines()]
+    assert len(out) == 3
+    assert out[0]['id'] == 1 and abs(sum(out[0]['probabilities']) - 1) < 1e-6
+    assert 'error' in out[1]
+    assert out[2]['id'] == 'x'
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    if not hasattr(socket, 'AF_UNIX'):
+        pytest.skip('需要 Unix 域套接字')
+    path = str(tmp_path / 'xgb.sock')
+    proc = subprocess.Popen([sys.executable, SCRIPT, '--socket', path], stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while not os.path.exists(path):
+        assert proc.poll() is None and time.time() < deadline
+        time.sleep(0.05)
+    yield path
+    proc.terminate()
+    proc.wait(timeout=10)
+
+
+def _connect(path):
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    s.settimeout(20)
+    s.connect(path)
+    return s
+
+
+def test_reset_and_slow_clients_do_not_stop_daemon(daemon):
+    # 不读取结果的慢客户端：大量请求把它的发送缓冲区填满
+    slow = _connect(daemon)
+    slow.sendall(''.join(_request(i) for i in range(5000)).encode())
+
+    # 发送请求后立即以 RST 断开的客户端
+    reset = _connect(daemon)
+    reset.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+    reset.sendall(_request('gone').encode())
+    reset.close()
+
+    ok = _connect(daemon)
+    ok.sendall(_request('ok').encode())
+    assert _readline(ok)['id'] == 'ok'
+    ok.close()
+    slow.close()
+
+    again = _connect(daemon)
+    again.sendall(_request('again').encode())
+    assert _readline(again)['id'] == 'again'
+    again.close()
+
+
+def test_oversized_line_gets_error_and_disconnect(daemon):
+    # 持续发送没有换行的数据：超过上限后收到错误记录并被断开，守护进程继续服务
+    flood = _connect(daemon)
+    sender = threading.Thread(target=lambda: _send_quietly(flood, b'x' * (3 << 20)), daemon=True)
+    sender.start()
+    error = _readline(flood)
+    assert 'exceeds' in error['error']
+    # 未读完的数据仍在排队时关闭，对端可能看到 RST 而不是 EOF
+    try:
+        assert flood.recv(65536) == b''
+    except ConnectionResetError:
+        pass
+    flood.close()
+
+    ok = _connect(daemon)
+    ok.sendall(_request('ok').encode())
+    assert _readline(ok)['id'] == 'ok'
+    ok.close()
+
+
+def _send_quietly(sock, data):
+    try:
+        sock.sendall(data)
+    except OSError:
+        pass
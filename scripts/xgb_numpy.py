@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Task3 XGBoost 模型的纯 NumPy 推理实现
+- 读取 xgb_model.json 树结构（XGBoost save_model 的 JSON 格式），无需导入 xgboost
+- 标准化器 (scaler.pkl) 的 mean_/scale_ 与标签编码器 (label_encoder.pkl) 的 classes_
+  一并导出到 xgb_model_numpy.npz，推理时只依赖 numpy
+- 比较与累加规则与 XGBoost 一致：float32 特征值 < float32 阈值 -> 左子树，
+  缺失值走 default_left；叶子值按树的顺序以 float32 累加，再做 softmax
+
+用法（导出，需 scikit-learn 读取 pkl）：
+    python scripts/xgb_numpy.py [--model_dir public/algorithms/Task3_XGBoost_Model]
+"""
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+import pickle
+from pathlib import Path
+import numpy as np
+
+NUMPY_MODEL_FILE = 'xgb_model_numpy.npz'
+SOURCE_FILES = ['xgb_model.json', 'scaler.pkl', 'label_encoder.pkl', 'feature_columns.json']
+EXPORT_VERSION = 1
+
+
+def default_model_dir() -> Path:
+    return (Path(__file__).parent.parent / 'public' / 'algorithms' / 'Task3_XGBoost_Model').resolve()
+
+
+def _sources_sha256(model_dir: Path) -> str:
+    h = hashlib.sha256()
+    for name in SOURCE_FILES:
+        h.update((model_dir / name).read_bytes())
+    return h.hexdigest()
+
+
+def _parse_trees(doc: dict) -> dict:
+    """xgb_model.json -> 拼接后的节点数组；叶子节点左右子节点都指向自身。"""
+    learner = doc['learner']
+    booster = learner['gradient_booster']
+    if booster.get('name') != 'gbtree':
+        raise ValueError(f"仅支持 gbtree 模型: {booster.get('name')}")
+    model = booster['model']
+    num_class = max(int(learner['learner_model_param'].get('num_class', '0')), 1)
+
+    feat, thr, left, right, default_left, roots = [], [], [], [], [], []
+    max_depth = 0
+    offset = 0
+    for tree in model['trees']:
+        if any(tree.get('split_type', [])):
+            raise ValueError('不支持类别特征分裂')
+        lc = np.asarray(tree['left_children'], dtype=np.int64)
+        rc = np.asarray(tree['right_children'], dtype=np.int64)
+        leaf = lc < 0
+        ids = np.arange(len(lc)) + offset
+        left.append(np.where(leaf, ids, lc + offset))
+        right.append(np.where(leaf, ids, rc + offset))
+        feat.append(np.where(leaf, 0, tree['split_indices']))
+        # 叶子节点的 split_conditions 即叶子值
+        thr.append(np.asarray(tree['split_conditions'], dtype=np.float32))
+        default_left.append(np.asarray(tree['default_left'], dtype=bool))
+        roots.append(offset)
+
+        depth = np.zeros(len(lc), dtype=np.int64)
+        for k in range(len(lc)):
+            if not leaf[k]:
+                depth[lc[k]] = depth[rc[k]] = depth[k] + 1
+        max_depth = max(max_depth, int(depth.max()))
+        offset += len(lc)
+
+    left = np.concatenate(left)
+    return {
+        'split_feature': np.concatenate(feat).astype(np.int32),
+        'split_condition': np.concatenate(thr),
+        'left': left.astype(np.int32),
+        'right': np.concatenate(right).astype(np.int32),
+        'default_left': np.concatenate(default_left),
+        'is_leaf': left == np.arange(len(left)),
+        'roots': np.asarray(roots, dtype=np.int32),
+        'tree_class': np.asarray(model.get('tree_info', [0] * len(roots)), dtype=np.int32),
+        'max_depth': np.int32(max_depth),
+        'num_class': np.int32(num_class),
+        'base_score': np.float32(float(learner['learner_model_param'].get('base_score', '0.5'))),
+        'objective': np.array(learner['objective']['name']),
+    }
+
+
+def build_arrays(model_dir) -> dict:
+    """从原始文件构建全部数组（读取 pkl 需要 scikit-learn，不需要 xgboost）。"""
+    model_dir = Path(model_dir)
+    with open(model_dir / 'xgb_model.json', 'r', encoding='utf-8') as f:
+        arrays = _parse_trees(json.load(f))
+    with open(model_dir / 'scaler.pkl', 'rb') as f:
+        scaler = pickle.load(f)
+    with open(model_dir / 'label_encoder.pkl', 'rb') as f:
+        label_encoder = pickle.load(f)
+    with open(model_dir / 'feature_columns.json', 'r', encoding='utf-8') as f:
+        feature_columns = json.load(f)
+    arrays.update({
+        'version': np.int32(EXPORT_VERSION),
+        'source_sha256': np.array(_sources_sha256(model_dir)),
+        'scaler_mean': np.asarray(getattr(scaler, 'mean_', None) if scaler.with_mean else np.zeros(len(feature_columns)), dtype=np.float64),
+        'scaler_scale': np.asarray(scaler.scale_ if scaler.with_std else np.ones(len(feature_columns)), dtype=np.float64),
+        'classes': np.asarray(getattr(label_encoder, 'classes_', [0, 1, 2])),
+        'feature_columns': np.asarray(feature_columns),
+    })
+    return arrays
+
+
+def _save_arrays(arrays: dict, out_path: str) -> None:
+    tmp_path = out_path + '.tmp.npz'
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, out_path)
+
+
+def export_xgb_model(model_dir=None, out_path=None) -> str:
+    model_dir = Path(model_dir or default_model_dir())
+    out_path = str(out_path or model_dir / NUMPY_MODEL_FILE)
+    arrays = build_arrays(model_dir)
+    _save_arrays(arrays, out_path)
+    print(f"XGBoost模型已导出为NumPy数组: {out_path} ({len(arrays['roots'])} 棵树)", file=sys.stderr)
+    return out_path
+
+
+class NumpyXGBClassifier:
+    """
+    标准化 + 树模型 + 标签编码的一体化推理：
+      predict_proba(X) / predict(X) 接收原始（未标准化）特征，列顺序为 feature_columns。
+    """
+
+    def __init__(self, arrays: dict):
+        self.feature_columns = [str(c) for c in arrays['feature_columns']]
+        self.classes_ = np.asarray(arrays['classes'])
+        self.num_class = int(arrays['num_class'])
+        self.objective = str(arrays['objective'])
+        self.base_score = np.float32(arrays['base_score'])
+        self.max_depth = int(arrays['max_depth'])
+        self._mean = np.asarray(arrays['scaler_mean'], dtype=np.float64)
+        self._scale = np.asarray(arrays['scaler_scale'], dtype=np.float64)
+        self._feat = arrays['split_feature'].astype(np.int64)
+        self._cond = arrays['split_condition']
+        self._left = arrays['left']
+        self._right = arrays['right']
+        self._default_left = arrays['default_left']
+        self._is_leaf = arrays['is_leaf']
+        self._roots = arrays['roots']
+        self._tree_class = arrays['tree_class']
+        self.source_sha256 = str(arrays['source_sha256'])
+
+    @classmethod
+    def load(cls, model_dir=None) -> 'NumpyXGBClassifier':
+        """
+        优先加载导出的 npz；npz 不存在、版本不符或与源文件（xgb_model.json / pkl）
+        内容不一致时，直接解析源文件并尝试重新导出。
+        """
+        model_dir = Path(model_dir or default_model_dir())
+        npz_path = model_dir / NUMPY_MODEL_FILE
+        have_sources = all((model_dir / name).exists() for name in SOURCE_FILES)
+        if npz_path.exists():
+            with np.load(npz_path, allow_pickle=False) as z:
+                arrays = {k: z[k] for k in z.files}
+            if int(arrays['version']) == EXPORT_VERSION:
+                # 仅部署了 npz（没有源文件）时无从校验，直接使用
+                if not have_sources or str(arrays['source_sha256']) == _sources_sha256(model_dir):
+                    return cls(arrays)
+            print(f"警告: {npz_path} 与模型源文件不一致，重新导出", file=sys.stderr)
+        arrays = build_arrays(model_dir)
+        # 目录不可写时仍可用源文件推理，只是下次加载还需重新解析
+        try:
+            _save_arrays(arrays, str(npz_path))
+        except OSError as e:
+            print(f"警告: 无法导出 {npz_path}: {e}", file=sys.stderr)
+        return cls(arrays)
+
+    def transform(self, X) -> np.ndarray:
+        """StandardScaler.transform 等价计算，结果按 XGBoost 的输入精度转为 float32。"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return ((X - self._mean) / self._scale).astype(np.float32)
+
+    def predict_margin(self, X) -> np.ndarray:
+        Xs = self.transform(X)
+        n, n_feat = Xs.shape
+        flat = Xs.ravel()
+        cols = (np.arange(n, dtype=np.int64) * n_feat)[None, :]
+        node = np.repeat(self._roots[:, None], n, axis=1)
+        for _ in range(self.max_depth):
+            x = flat.take(self._feat.take(node) + cols)
+            go_left = np.where(np.isnan(x), self._default_left.take(node), x < self._cond.take(node))
+            node = np.where(go_left, self._left.take(node), self._right.take(node))
+        leaf_values = self._cond.take(node)
+        margin = np.full((n, self.num_class), self.base_score, dtype=np.float32)
+        for t, k in enumerate(self._tree_class):
+            margin[:, k] += leaf_values[t]
+        return margin
+
+    def predict_proba(self, X) -> np.ndarray:
+        margin = self.predict_margin(X)
+        if self.num_class == 1:
+            p = (1.0 / (1.0 + np.exp(-margin[:, 0]))).astype(np.float32)
+            return np.column_stack([1 - p, p])
+        # 与 XGBoost 的 Softmax 相同：float32 的 exp，double 累加分母，再按 float32 相除
+        z = margin - margin.max(axis=1, keepdims=True)
+        e = np.exp(z.astype(np.float64)).astype(np.float32)
+        wsum = np.zeros(len(e), dtype=np.float64)
+        for k in range(e.shape[1]):
+            wsum += e[:, k]
+        return e / wsum.astype(np.float32)[:, None]
+
+    def predict(self, X) -> np.ndarray:
+        """编码后的类别下标（与 XGBClassifier.predict 一致）；原始标签见 classes_[下标]。"""
+        return np.argmax(self.predict_proba(X), axis=1)
+
+    def rows_from_dicts(self, feature_dicts) -> np.ndarray:
+        return np.array([[float(d[c]) for c in self.feature_columns] for d in feature_dicts], dtype=np.float64)
+
+
+def main():
+    ap = argparse.ArgumentParser(description='导出Task3 XGBoost模型为NumPy数组')
+    ap.add_argument('--model_dir', action='append', help='模型目录（可重复）')
+    args = ap.parse_args()
+    for d in args.model_dir or [default_model_dir()]:
+        export_xgb_model(d)
+
+
+if __name__ == '__main__':
+    main()
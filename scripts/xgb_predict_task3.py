@@ -4,24 +4,37 @@
 """
 XGBoost 推理脚本（Task3）
 - 从 butp/public/algorithms/Task3_XGBoost_Model 加载模型与预处理器
+  （经 xgb_numpy 以纯 NumPy 推理，不导入 xgboost / scikit-learn）
 - 从 stdin 读取 JSON：{"featureValues": {<name>: <number>, ...}}
 - 按 feature_columns.json 的顺序取值与标准化
 - 输出 JSON：{"probabilities": [p0, p1, p2], "classes": [..]}
 
 说明：
 - 概率为 0-1 小数，和为 1；前端再转百分比与格式化
+
+常驻模式（模型只加载一次）：
+- --serve：从 stdin 逐行读取 NDJSON 请求，每个请求输出一行 JSON 结果
+- --serve --socket /tmp/xgb_task3.sock：在 Unix 域套接字上提供同样的逐行协议
+- 请求行格式同上，可附带 "id" 字段，结果中原样返回；同一时刻到达的多行请求
+  合并为一次 predict_proba 调用（每批最多 --max_batch 行）
+- 套接字上单行超过 MAX_LINE_BYTES（1 MiB）时回写错误记录并断开该连接
 """
 
+import os
 import sys
 import json
-import pickle
+import socket
+import argparse
+import selectors
+import signal
 from pathlib import Path
 import numpy as np
 
+from xgb_numpy import NumpyXGBClassifier
+
 _MODEL = None
-_SCALER = None
-_LABEL_ENCODER = None
-_FEATURE_COLUMNS = None
+# 单行请求的最大字节数：超过后回写错误并断开该连接，避免无换行的输入耗尽内存
+MAX_LINE_BYTES = 1 << 20
 
 
 def _model_dir() -> Path:
@@ -29,46 +42,236 @@ def _model_dir() -> Path:
 
 
 def _lazy_load():
-    global _MODEL, _SCALER, _LABEL_ENCODER, _FEATURE_COLUMNS
+    global _MODEL
     if _MODEL is not None:
         return
-    md = _model_dir()
-    with open(md / 'xgb_model.pkl', 'rb') as f:
-        _MODEL = pickle.load(f)
-    with open(md / 'scaler.pkl', 'rb') as f:
-        _SCALER = pickle.load(f)
-    with open(md / 'label_encoder.pkl', 'rb') as f:
-        _LABEL_ENCODER = pickle.load(f)
-    with open(md / 'feature_columns.json', 'r', encoding='utf-8') as f:
-        _FEATURE_COLUMNS = json.load(f)
-
+    # 标准化与标签编码已并入 NumPy 模型数组
+    _MODEL = NumpyXGBClassifier.load(_model_dir())
 
-def _predict(feature_values: dict) -> dict:
-    _lazy_load()
 
+def _feature_row(feature_values: dict) -> list:
     # 按列顺序取值并校验为数字
     features = []
-    for col in _FEATURE_COLUMNS:
+    for col in _MODEL.feature_columns:
         if col not in feature_values:
             raise ValueError(f'Missing feature: {col}')
         value = feature_values[col]
         if not isinstance(value, (int, float)):
             raise ValueError(f'Invalid feature type for {col}, expected number')
         features.append(float(value))
+    return features
+
+
+def _predict_batch(rows: list) -> list:
+    _lazy_load()
+    probabilities = _MODEL.predict_proba(np.array(rows, dtype=float).reshape(len(rows), -1))
+    classes = [int(c) for c in list(_MODEL.classes_)]
+    return [
+        {'probabilities': [float(p) for p in probs.tolist()], 'classes': classes}
+        for probs in probabilities
+    ]
+
+
+def _predict(feature_values: dict) -> dict:
+    _lazy_load()
+    return _predict_batch([_feature_row(feature_values)])[0]
+
+
+def _answer_lines(lines: list) -> list:
+    """一批 NDJSON 请求行 -> 等长的结果行；合法请求合并为一次 predict_proba。"""
+    _lazy_load()
+    results = [None] * len(lines)
+    ids = [None] * len(lines)
+    rows, row_pos = [], []
+    for i, line in enumerate(lines):
+        try:
+            data = json.loads(line)
+            if isinstance(data, dict):
+                ids[i] = data.get('id')
+            fv = data.get('featureValues') if isinstance(data, dict) else None
+            if not isinstance(fv, dict):
+                results[i] = {'error': 'featureValues is required as object'}
+                continue
+            rows.append(_feature_row(fv))
+            row_pos.append(i)
+        except Exception as e:
+            results[i] = {'error': str(e)}
+    if rows:
+        try:
+            for i, res in zip(row_pos, _predict_batch(rows)):
+                results[i] = res
+        except Exception as e:
+            for i in row_pos:
+                results[i] = {'error': str(e)}
+    out = []
+    for i, res in enumerate(results):
+        if ids[i] is not None:
+            res = {'id': ids[i], **res}
+        out.append(json.dumps(res, ensure_ascii=False))
+    return out
+
+
+class _Client:
+    """套接字连接的读写缓冲；写入经 EVENT_WRITE 分段发送，慢读端不阻塞其他连接。"""
 
-    X = np.array(features, dtype=float).reshape(1, -1)
-    X_scaled = _SCALER.transform(X)
+    def __init__(self, conn):
+        self.conn = conn
+        self.inbuf = b''
+        self.outbuf = bytearray()
+        self.eof = False
+        self.overflow = False
 
-    probabilities = _MODEL.predict_proba(X_scaled)[0]
-    classes = getattr(_LABEL_ENCODER, 'classes_', [0, 1, 2])
 
-    return {
-        'probabilities': [float(p) for p in probabilities.tolist()],
-        'classes': [int(c) for c in list(classes)],
-    }
+def serve(socket_path: str = None, max_batch: int = 256):
+    """常驻推理循环：stdin 或 Unix 域套接字上的逐行 JSON 协议。"""
+    _lazy_load()
+    # 被 kill 时同样走 finally，清理套接字文件
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    sel = selectors.DefaultSelector()
+    clients = {}
+    stdin_fd = sys.stdin.fileno()
+    stdin_buf = b''
+    listener = None
+
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(socket_path)
+        listener.listen()
+        listener.setblocking(False)
+        sel.register(listener, selectors.EVENT_READ)
+        print(f'xgb_predict_task3 listening on {socket_path}', file=sys.stderr, flush=True)
+    else:
+        sel.register(stdin_fd, selectors.EVENT_READ)
+
+    def drop(client):
+        # 只关闭出错/结束的这一个连接，其余连接不受影响
+        clients.pop(client.conn, None)
+        try:
+            sel.unregister(client.conn)
+        except (KeyError, ValueError):
+            pass
+        client.conn.close()
+
+    def flush(client):
+        try:
+            sent = client.conn.send(client.outbuf)
+            del client.outbuf[:sent]
+        except BlockingIOError:
+            pass
+        except OSError:
+            drop(client)
+
+    def update_events(client):
+        if client.conn not in clients:
+            return
+        events = (0 if client.eof else selectors.EVENT_READ) | (selectors.EVENT_WRITE if client.outbuf else 0)
+        if not events:
+            drop(client)
+        else:
+            sel.modify(client.conn, events)
+
+    def split_lines(buf, chunk):
+        *complete, buf = (buf + chunk).split(b'\n')
+        if not chunk:
+            # 对端关闭：最后一行可以没有换行符
+            complete.append(buf)
+            buf = b''
+        return [line for line in complete if line.strip()], buf
+
+    try:
+        while sel.get_map():
+            pending = []   # (回写目标, 请求行)，按到达顺序；目标为 None 表示 stdout
+            touched = set()
+            stdin_closed = False
+            for key, mask in sel.select():
+                if key.fileobj is listener:
+                    try:
+                        conn, _ = listener.accept()
+                    except OSError:
+                        continue
+                    conn.setblocking(False)
+                    clients[conn] = _Client(conn)
+                    sel.register(conn, selectors.EVENT_READ)
+                    continue
+                if key.fileobj == stdin_fd and not socket_path:
+                    try:
+                        chunk = os.read(stdin_fd, 65536)
+                    except OSError:
+                        chunk = b''
+                    lines, stdin_buf = split_lines(stdin_buf, chunk)
+                    pending.extend((None, line) for line in lines)
+                    stdin_closed = not chunk
+                    continue
+
+                client = clients.get(key.fileobj)
+                if client is None:
+                    continue
+                if mask & selectors.EVENT_WRITE:
+                    flush(client)
+                    touched.add(client)
+                if mask & selectors.EVENT_READ and client.conn in clients:
+                    try:
+                        chunk = client.conn.recv(65536)
+                    except BlockingIOError:
+                        continue
+                    except OSError:
+                        drop(client)
+                        continue
+                    lines, client.inbuf = split_lines(client.inbuf, chunk)
+                    client.eof = not chunk
+                    if len(client.inbuf) > MAX_LINE_BYTES:
+                        # 不再读取：已完整的行照常回答，随后回写错误并在发送完毕后断开
+                        client.inbuf = b''
+                        client.eof = client.overflow = True
+                    pending.extend((client, line) for line in lines)
+                    touched.add(client)
+
+            for start in range(0, len(pending), max_batch):
+                batch = pending[start:start + max_batch]
+                answers = _answer_lines([line.decode('utf-8', 'replace') for _, line in batch])
+                for (target, _), answer in zip(batch, answers):
+                    data = (answer + '\n').encode('utf-8')
+                    if target is None:
+                        sys.stdout.buffer.write(data)
+                    elif target.conn in clients:
+                        target.outbuf += data
+                if not socket_path:
+                    sys.stdout.buffer.flush()
+
+            for client in touched:
+                if client.overflow and client.conn in clients:
+                    client.overflow = False
+                    error = {'error': f'request line exceeds {MAX_LINE_BYTES} bytes'}
+                    client.outbuf += (json.dumps(error) + '\n').encode('utf-8')
+                if client.conn in clients and client.outbuf:
+                    flush(client)
+                update_events(client)
+
+            if stdin_closed:
+                return
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for client in list(clients.values()):
+            drop(client)
+        if listener is not None:
+            listener.close()
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
 
 
 def main():
+    ap = argparse.ArgumentParser(description='Task3 XGBoost 推理脚本')
+    ap.add_argument('--serve', action='store_true', help='常驻模式：逐行读取 NDJSON 请求')
+    ap.add_argument('--socket', help='常驻模式下监听的 Unix 域套接字路径（默认使用 stdin/stdout）')
+    ap.add_argument('--max_batch', type=int, default=256, help='单次合并推理的最大请求数')
+    args = ap.parse_args()
+    if args.serve or args.socket:
+        serve(args.socket, max(1, args.max_batch))
+        return
+
     try:
         raw = sys.stdin.read() or '{}'
         data = json.loads(raw)
@@ -85,5 +288,3 @@ def main():
 
 if __name__ == '__main__':
     main()
-
-
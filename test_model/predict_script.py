@@ -4,43 +4,32 @@
 import sys
 import json
 import numpy as np
-import joblib
 import os
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from xgb_numpy import NumpyXGBClassifier
+
 def load_model_and_predict(features):
     """加载模型并进行预测"""
     try:
         # 获取模型文件路径
         model_dir = os.path.dirname(os.path.abspath(__file__))
-        model_path = os.path.join(model_dir, '..', 'public', 'algorithms')
-        
-        # 加载模型文件
-        model_file = os.path.join(model_path, 'xgb_model.pkl')
-        scaler_file = os.path.join(model_path, 'scaler.pkl')
-        encoder_file = os.path.join(model_path, 'label_encoder.pkl')
+        model_path = os.path.join(model_dir, '..', 'public', 'algorithms', 'Task3_XGBoost_Model')
         
-        # 检查文件是否存在
-        if not os.path.exists(model_file):
+        # 检查文件是否存在（使用导出的 NumPy 模型数组，标准化与编码器已并入其中）
+        model_file = os.path.join(model_path, 'xgb_model_numpy.npz')
+        if not os.path.exists(model_file) and not os.path.exists(os.path.join(model_path, 'xgb_model.json')):
             return {"error": "模型文件不存在"}
-        if not os.path.exists(scaler_file):
-            return {"error": "标准化文件不存在"}
-        if not os.path.exists(encoder_file):
-            return {"error": "编码器文件不存在"}
         
-        # 加载模型和预处理组件
-        model = joblib.load(model_file)
-        scaler = joblib.load(scaler_file)
-        encoder = joblib.load(encoder_file)
+        # 加载模型（纯NumPy推理，不导入xgboost / scikit-learn）
+        model = NumpyXGBClassifier.load(model_path)
         
         # 准备特征数据
-        X = np.array(features).reshape(1, -1)
-        
-        # 数据预处理
-        X_scaled = scaler.transform(X)
+        X = np.array(features, dtype=float).reshape(1, -1)
         
-        # 模型预测
-        prediction = model.predict(X_scaled)  # 输出类别标签 (0, 1, 或 2)
-        proba = model.predict_proba(X_scaled)  # 输出每个类别的概率
+        # 模型预测（标准化在模型内完成）
+        prediction = model.predict(X)  # 输出类别标签 (0, 1, 或 2)
+        proba = model.predict_proba(X)  # 输出每个类别的概率
         
         # 转换为百分比
         percentages = proba[0] * 100
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+prediction_api 测试：NDJSON 流式输出的分帧（meta/row/statistics/error/end），
+批量 JSON 与 NDJSON 返回相同的统计信息，以及缺少 ndjson_stream.py 时只停用 NDJSON 输出
+"""
+
+import os
+import io
+import sys
+import json
+import importlib
+import subprocess
+
+import numpy as np
+import pandas as pd
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FUNCTION_DIR = os.path.join(BASE_DIR, 'function_aliyun')
+MAJOR = '物联网工程'
+PLAN = os.path.join(FUNCTION_DIR, 'education-plan2023', f'2023级{MAJOR}培养方案.xlsx')
+
+
+@pytest.fixture(scope='module')
+def api(tmp_path_factory):
+    # prediction_api 在当前目录创建日志文件，并从 function 目录导入预测模块
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('api'))
+    sys.path.insert(0, FUNCTION_DIR)
+    try:
+        module = importlib.import_module('prediction_api')
+    finally:
+        os.chdir(cwd)
+    return module
+
+
+@pytest.fixture
+def client(api, monkeypatch):
+    monkeypatch.setitem(api.MAJORS_MAPPING, MAJOR, {'code': 'iot', 'course_file': PLAN})
+    monkeypatch.setitem(api.DEFAULT_CONFIG, 'model_dir',
+                        os.path.join(FUNCTION_DIR, 'Model_Params', 'Task3_CatBoost_Model'))
+    return api.app.test_client()
+
+
+def _scores_bytes(n_students=8, seed=0):
+    import Optimization_model_func3_1 as opt
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n_students):
+        for course in opt.load_course_catalog(PLAN).columns:
+            if rng.random() < 0.7:
+                rows.append({'SNH': f'2023iot{i:04d}', 'Current_Major': MAJOR, 'Course_Name': course,
+                             'Grade': round(float(rng.uniform(55, 98)), 1), 'Course_Attribute': '必修'})
+    buf = io.BytesIO()
+    pd.DataFrame(rows).to_excel(buf, index=False)
+    return buf.getvalue()
+
+
+def _post_batch(client, output_format):
+    data = {'scores_file': (io.BytesIO(_scores_bytes()), 'scores.xlsx'),
+            'majors': json.dumps([MAJOR]), 'output_format': output_format}
+    return client.post('/api/predict/batch', data=data, content_type='multipart/form-data')
+
+
+def test_batch_json_and_ndjson_statistics_match(client):
+    resp = _post_batch(client, 'json')
+    assert resp.status_code == 200
+    json_stats = resp.get_json()['data']['results'][MAJOR]['statistics']
+
+    resp = _post_batch(client, 'ndjson')
+    lines = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert lines[0]['type'] == 'meta' and lines[-1]['type'] == 'end'
+    assert lines[-1]['success'] and lines[-1]['processed_majors'] == [MAJOR]
+    (stats_line,) = [line for line in lines if line['type'] == 'statistics']
+    assert stats_line['statistics'] == json_stats
+    assert json_stats['total_students'] == 8
+    rows = [line for line in lines if line['type'] == 'row' and line['sheet'] == 'Predictions']
+    assert len(rows) == 8
+
+
+def test_stream_reports_serialization_failure(api, client, monkeypatch):
+    """结果输出中途失败时仍输出 error 行与 end 行"""
+    real_lines = api.ndjson_table_lines
+
+    def failing_lines(major, tables):
+        lines = real_lines(major, tables)
+        yield next(lines)
+        raise TypeError('cannot serialize')
+
+    monkeypatch.setattr(api, 'ndjson_table_lines', failing_lines)
+    resp = _post_batch(client, 'ndjson')
+    lines = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert [line['type'] for line in lines] == ['meta', 'row', 'error', 'end']
+    assert lines[2]['major'] == MAJOR and lines[2]['code'] == 'SERIALIZATION_FAILED'
+    assert lines[3]['success'] is False and lines[3]['failed_majors'] == [MAJOR]
+
+
+def test_missing_ndjson_helpers_only_disable_streaming(api, client, monkeypatch, tmp_path):
+    """缺少 ndjson_stream.py 时服务仍能启动，JSON 输出正常，NDJSON 请求返回 503"""
+    code = (f"import sys; sys.path.insert(0, {FUNCTION_DIR!r}); sys.path.insert(0, {BASE_DIR!r}); "
+            "sys.modules['ndjson_stream'] = None; import prediction_api; "
+            "assert prediction_api.ndjson_line is None")
+    proc = subprocess.run([sys.executable, '-c', code], cwd=str(tmp_path), capture_output=True, timeout=120)
+    assert proc.returncode == 0, proc.stderr.decode(errors='replace')
+    assert 'ndjson_stream.py' in proc.stdout.decode()
+
+    monkeypatch.setattr(api, 'ndjson_line', None)
+    resp = _post_batch(client, 'ndjson')
+    assert resp.status_code == 503 and resp.get_json()['code'] == 'NDJSON_UNAVAILABLE'
+    assert _post_batch(client, 'json').status_code == 200
+
+
+def test_ndjson_line_is_strict_json():
+    from ndjson_stream import ndjson_line, json_safe_records
+    df = pd.DataFrame({'a': [1.5, np.nan, np.inf], 'b': [np.int64(2), None, 'x']})
+    records = list(json_safe_records(df, chunk_rows=2))
+    assert records == [{'a': 1.5, 'b': 2}, {'a': None, 'b': None}, {'a': None, 'b': 'x'}]
+    line = ndjson_line({'type': 'row', 'data': records[0], 't': pd.Timestamp('2024-01-01')})
+    assert line.endswith('\n') and json.loads(line)['t'] == '2024-01-01T00:00:00'
+    with pytest.raises(ValueError):
+        ndjson_line({'v': float('nan')})